@@ -0,0 +1,63 @@
+"""Composite and partial indexes for auth and project lookups
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "002"
+down_revision = "001"
+branch_labels = None
+depends_on = None
+
+
+def _columns(table: str) -> set:
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade() -> None:
+    """Replace single-column indexes with composite/partial ones"""
+    # 001 predates the Session model (token, no is_active/last_used_at).
+    # Bring the table in line first; databases built by create_all already match.
+    if "access_token" not in _columns("sessions"):
+        op.alter_column("sessions", "token", new_column_name="access_token")
+    op.execute("ALTER TABLE sessions ADD COLUMN IF NOT EXISTS is_active boolean NOT NULL DEFAULT true")
+    op.execute("ALTER TABLE sessions ADD COLUMN IF NOT EXISTS last_used_at timestamp")
+
+    # Active-session token lookups only ever touch active rows
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_sessions_token_active "
+        "ON sessions (access_token) WHERE is_active"
+    )
+    # get_active_sessions: WHERE user_id = ? AND is_active
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_sessions_user_active_expires "
+        "ON sessions (user_id, is_active, expires_at DESC)"
+    )
+    # Project dashboard: WHERE user_id = ? AND status = ? ORDER BY updated_at DESC
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS idx_projects_user_status_updated "
+        "ON projects (user_id, status, updated_at DESC) INCLUDE (name, slug)"
+    )
+
+    # Superseded by the indexes above (absent on databases built by create_all)
+    op.execute("DROP INDEX IF EXISTS idx_sessions_token")
+    op.execute("DROP INDEX IF EXISTS idx_projects_status")
+
+
+def downgrade() -> None:
+    """Restore the single-column indexes and the 001 sessions columns"""
+    op.execute("DROP INDEX IF EXISTS idx_projects_user_status_updated")
+    op.execute("DROP INDEX IF EXISTS idx_sessions_user_active_expires")
+    op.execute("DROP INDEX IF EXISTS idx_sessions_token_active")
+
+    op.drop_column("sessions", "last_used_at")
+    op.drop_column("sessions", "is_active")
+    op.alter_column("sessions", "access_token", new_column_name="token")
+
+    op.create_index("idx_projects_status", "projects", ["status"])
+    op.create_index("idx_sessions_token", "sessions", ["token"])
@@ -0,0 +1,58 @@
+"""Store timestamps as timestamptz
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "003"
+down_revision = "002"
+branch_labels = None
+depends_on = None
+
+TABLES = ["users", "sessions", "projects"]
+
+
+def _timestamp_columns(table: str, timezone: bool) -> list:
+    """Timestamp columns of the table as it actually exists, by time zone awareness"""
+    return [
+        column["name"]
+        for column in sa.inspect(op.get_bind()).get_columns(table)
+        if isinstance(column["type"], sa.DateTime) and bool(column["type"].timezone) == timezone
+    ]
+
+
+def upgrade() -> None:
+    """Convert timestamp columns to timestamp with time zone"""
+    # 001 named the column last_login; the User model reads last_login_at
+    if "last_login" in {column["name"] for column in sa.inspect(op.get_bind()).get_columns("users")}:
+        op.alter_column("users", "last_login", new_column_name="last_login_at")
+
+    # Existing naive values were written as UTC; columns already aware are left alone
+    for table in TABLES:
+        for column in _timestamp_columns(table, timezone=False):
+            op.alter_column(
+                table,
+                column,
+                type_=sa.DateTime(timezone=True),
+                existing_type=sa.DateTime(),
+                postgresql_using=f"{column} AT TIME ZONE 'UTC'",
+            )
+
+
+def downgrade() -> None:
+    """Convert timestamp columns back to naive UTC timestamps"""
+    for table in TABLES:
+        for column in _timestamp_columns(table, timezone=True):
+            op.alter_column(
+                table,
+                column,
+                type_=sa.DateTime(),
+                existing_type=sa.DateTime(timezone=True),
+                postgresql_using=f"{column} AT TIME ZONE 'UTC'",
+            )
+    op.alter_column("users", "last_login_at", new_column_name="last_login")
@@ -0,0 +1,31 @@
+"""Generate primary keys server-side with gen_random_uuid()
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+TABLES = ["users", "sessions", "projects"]
+
+
+def upgrade() -> None:
+    """Add gen_random_uuid() defaults to primary keys"""
+    # gen_random_uuid() is built in from PostgreSQL 13; older servers need pgcrypto
+    op.execute("CREATE EXTENSION IF NOT EXISTS pgcrypto")
+    for table in TABLES:
+        op.alter_column(table, "id", server_default=sa.text("gen_random_uuid()"))
+
+
+def downgrade() -> None:
+    """Drop server-side primary key defaults"""
+    for table in TABLES:
+        op.alter_column(table, "id", server_default=None)
@@ -0,0 +1,74 @@
+"""Store primary and foreign keys as native uuid
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "005"
+down_revision = "004"
+branch_labels = None
+depends_on = None
+
+PRIMARY_KEYS = ["users", "sessions", "projects"]
+FOREIGN_KEYS = ["sessions", "projects"]  # <table>.user_id -> users.id
+
+
+def _alter_keys(type_, existing_type, using: str, server_default) -> None:
+    # Foreign keys must go before the referenced column can change type
+    for table in FOREIGN_KEYS:
+        op.drop_constraint(f"{table}_user_id_fkey", table, type_="foreignkey")
+
+    for table in PRIMARY_KEYS:
+        # The old default would have to be cast along with the column
+        op.alter_column(table, "id", server_default=None)
+        op.alter_column(
+            table,
+            "id",
+            type_=type_,
+            existing_type=existing_type,
+            postgresql_using=f"id{using}",
+        )
+        op.alter_column(table, "id", server_default=server_default)
+
+    for table in FOREIGN_KEYS:
+        op.alter_column(
+            table,
+            "user_id",
+            type_=type_,
+            existing_type=existing_type,
+            postgresql_using=f"user_id{using}",
+        )
+        op.create_foreign_key(
+            f"{table}_user_id_fkey",
+            table,
+            "users",
+            ["user_id"],
+            ["id"],
+            ondelete="CASCADE",
+        )
+
+
+def upgrade() -> None:
+    """Convert String(36) keys to uuid"""
+    _alter_keys(
+        postgresql.UUID(as_uuid=True),
+        sa.String(36),
+        "::uuid",
+        sa.text("gen_random_uuid()"),
+    )
+
+
+def downgrade() -> None:
+    """Convert uuid keys back to String(36)"""
+    _alter_keys(
+        sa.String(36),
+        postgresql.UUID(as_uuid=True),
+        "::text",
+        sa.text("gen_random_uuid()::text"),
+    )
@@ -0,0 +1,36 @@
+"""Hash index for session access-token lookups
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "006"
+down_revision = "005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Replace the B-tree token index with a hash index, without blocking writes"""
+    # Token lookups are exact-match only; a hash index stores a 4-byte hash
+    # per row instead of the full JWT text. Hash indexes can't be UNIQUE.
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sessions_access_token_hash "
+            "ON sessions USING hash (access_token) WHERE is_active"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_sessions_token_active")
+
+
+def downgrade() -> None:
+    """Restore the partial B-tree token index"""
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sessions_token_active "
+            "ON sessions (access_token) WHERE is_active"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_sessions_access_token_hash")
@@ -0,0 +1,36 @@
+"""Indexes for keyset pagination of projects and users
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "007"
+down_revision = "006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """Index the (created_at, id) sort keys used by list cursors"""
+    with op.get_context().autocommit_block():
+        # list_projects: WHERE user_id = ? AND (created_at, id) < (?, ?)
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_projects_user_created "
+            "ON projects (user_id, created_at DESC, id DESC)"
+        )
+        # list_users: WHERE (created_at, id) < (?, ?)
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_created "
+            "ON users (created_at DESC, id DESC)"
+        )
+
+
+def downgrade() -> None:
+    """Drop the keyset pagination indexes"""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_users_created")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_projects_user_created")
@@ -0,0 +1,34 @@
+"""Trigram indexes for substring user search
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "008"
+down_revision = "007"
+branch_labels = None
+depends_on = None
+
+_SEARCH_COLUMNS = ("email", "first_name", "last_name")
+
+
+def upgrade() -> None:
+    """Index the columns search_users matches with ILIKE '%q%'"""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for column in _SEARCH_COLUMNS:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_{column}_trgm "
+                f"ON users USING gin ({column} gin_trgm_ops)"
+            )
+
+
+def downgrade() -> None:
+    """Drop the trigram indexes (the extension is left installed)"""
+    with op.get_context().autocommit_block():
+        for column in reversed(_SEARCH_COLUMNS):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS idx_users_{column}_trgm")
@@ -0,0 +1,79 @@
+"""Covering index for login lookups by email
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "009"
+down_revision = "008"
+branch_labels = None
+depends_on = None
+
+_INDEX_NAME = "idx_users_email_login"
+
+
+def _index_valid(bind) -> bool | None:
+    """Whether the covering index is valid, or None when it doesn't exist"""
+    return bind.scalar(
+        sa.text(
+            "SELECT i.indisvalid FROM pg_index i "
+            "JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name"
+        ),
+        {"name": _INDEX_NAME},
+    )
+
+
+def _email_unique_constraints(bind) -> list[str]:
+    """Names of the unique constraints on exactly users (email)"""
+    # 001 declares uniqueness twice (column unique=True and a table
+    # UniqueConstraint), so there can be users_email_key and users_email_key1
+    return list(
+        bind.scalars(
+            sa.text(
+                "SELECT con.conname FROM pg_constraint con "
+                "JOIN pg_attribute a ON a.attrelid = con.conrelid AND a.attname = 'email' "
+                "WHERE con.conrelid = 'users'::regclass AND con.contype = 'u' "
+                "AND con.conkey = ARRAY[a.attnum]"
+            )
+        )
+    )
+
+
+def upgrade() -> None:
+    """Make one covering unique index the only index on users.email"""
+    # Login reads exactly these columns (AuthService.login's load_only), so
+    # it becomes an index-only scan. last_login_at is written on every login
+    # and is left out so that UPDATE can stay HOT.
+    bind = op.get_bind()
+    with op.get_context().autocommit_block():
+        # IF NOT EXISTS would keep an INVALID index left by a failed build
+        if _index_valid(bind) is False:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {_INDEX_NAME}")
+        op.execute(
+            f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {_INDEX_NAME} "
+            "ON users (email) INCLUDE (id, password_hash, is_active, is_admin)"
+        )
+    if not _index_valid(bind):
+        raise RuntimeError(f"{_INDEX_NAME} is not valid; keeping the email constraints")
+
+    # The index enforces uniqueness; drop 001's constraints and plain index
+    # and the unique index create_all built from the old column definition
+    for name in _email_unique_constraints(bind):
+        op.execute(f'ALTER TABLE users DROP CONSTRAINT "{name}"')
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_users_email")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_users_email")
+
+
+def downgrade() -> None:
+    """Restore the email unique constraint and plain index"""
+    op.execute("ALTER TABLE users ADD CONSTRAINT users_email_key UNIQUE (email)")
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_email ON users (email)")
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {_INDEX_NAME}")
@@ -0,0 +1,92 @@
+"""
+Redis connection and cache helpers
+"""
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from typing import List, Optional
+from config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Create client (connections are opened lazily from its pool)
+redis_client: Optional[Redis] = (
+    Redis.from_url(
+        settings.REDIS_URL,
+        socket_connect_timeout=0.5,
+        socket_timeout=0.5,
+    )
+    if settings.REDIS_URL
+    else None
+)
+
+
+async def cache_get(key: str) -> Optional[bytes]:
+    """
+    Get a value, treating Redis errors as a cache miss
+    """
+    if redis_client is None:
+        return None
+    try:
+        return await redis_client.get(key)
+    except (RedisError, OSError) as e:
+        logger.debug("Redis GET failed for %s: %s", key, e)
+        return None
+
+
+async def cache_get_many(*keys: str) -> List[Optional[bytes]]:
+    """
+    Get several values in one round trip, treating Redis errors as misses
+    """
+    if redis_client is None:
+        return [None] * len(keys)
+    try:
+        return await redis_client.mget(keys)
+    except (RedisError, OSError) as e:
+        logger.debug("Redis MGET failed for %s: %s", keys, e)
+        return [None] * len(keys)
+
+
+async def cache_incr(key: str, ttl: int) -> None:
+    """
+    Increment a counter and refresh its TTL, ignoring Redis errors
+    """
+    if redis_client is None:
+        return
+    try:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            await pipe.incr(key).expire(key, ttl).execute()
+    except (RedisError, OSError) as e:
+        logger.debug("Redis INCR failed for %s: %s", key, e)
+
+
+async def cache_set(key: str, value: bytes | str, ttl: int) -> None:
+    """
+    Set a value with a TTL in seconds, ignoring Redis errors
+    """
+    if redis_client is None:
+        return
+    try:
+        await redis_client.setex(key, ttl, value)
+    except (RedisError, OSError) as e:
+        logger.debug("Redis SETEX failed for %s: %s", key, e)
+
+
+async def cache_delete(*keys: str) -> None:
+    """
+    Delete keys, ignoring Redis errors
+    """
+    if redis_client is None or not keys:
+        return
+    try:
+        await redis_client.delete(*keys)
+    except (RedisError, OSError) as e:
+        logger.debug("Redis DEL failed for %s: %s", keys, e)
+
+
+async def close_cache() -> None:
+    """
+    Close the Redis connection pool
+    """
+    if redis_client is not None:
+        await redis_client.aclose()
@@ -1,64 +1,147 @@
 """
 Database connection and session management
 """
-from sqlalchemy import create_engine
+from sqlalchemy import text, TypeDecorator, Uuid
+from sqlalchemy.engine import make_url, URL
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 from config import settings
+import asyncio
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
+
+def get_async_database_url(database_url: str) -> URL:
+    """
+    Normalize a database URL to its asyncio driver
+
+    Hosting providers (Railway, docker-compose) hand out plain
+    ``postgresql://`` URLs, which would otherwise select psycopg2.
+    """
+    url = make_url(database_url)
+    if url.drivername in ("postgres", "postgresql", "postgresql+psycopg2"):
+        url = url.set(drivername="postgresql+asyncpg")
+    return url
+
+
+def get_connect_args(url: URL) -> dict:
+    """
+    Driver connect arguments for the database URL
+    """
+    if url.drivername != "postgresql+asyncpg":
+        return {}
+    if settings.DB_USE_PGBOUNCER:
+        # Transaction pooling hands each transaction a different server
+        # connection, so named prepared statements cannot be reused
+        return {"prepared_statement_cache_size": 0, "statement_cache_size": 0}
+    # JIT compilation costs more than short OLTP queries take to run.
+    # Not sent through PgBouncer, which rejects unknown startup parameters.
+    return {"server_settings": {"jit": "off"}}
+
+
+DATABASE_URL = get_async_database_url(settings.DATABASE_URL)
+
 # Create engine
-engine = create_engine(
-    settings.DATABASE_URL,
+engine = create_async_engine(
+    DATABASE_URL,
     echo=settings.DEBUG,
+    poolclass=AsyncAdaptedQueuePool,
     pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    connect_args=get_connect_args(DATABASE_URL),
 )
 
 # Create session factory
-SessionLocal = sessionmaker(
-    autocommit=False,
-    autoflush=False,
+SessionLocal = async_sessionmaker(
     bind=engine,
+    class_=AsyncSession,
+    autoflush=False,
+    # Attribute access after commit must not trigger implicit (sync) IO
+    expire_on_commit=False,
 )
 
 # Create base class for models
 Base = declarative_base()
 
 
-def get_db() -> Session:
+class UUIDType(TypeDecorator):
+    """
+    UUID column type: native uuid on PostgreSQL, CHAR(32) on SQLite
+
+    Accepts UUID strings (token subjects, path parameters) as well as UUID
+    objects, as asyncpg does, so queries behave the same on both backends.
+    """
+    impl = Uuid
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if isinstance(value, str):
+            return uuid.UUID(value)
+        return value
+
+
+# Serializes schema creation between tasks in this process
+_SCHEMA_LOCK = asyncio.Lock()
+
+# Arbitrary key for the Postgres advisory lock that serializes schema
+# creation across uvicorn workers / processes
+_SCHEMA_ADVISORY_LOCK_ID = 0x76697669
+
+
+async def get_db() -> AsyncIterator[AsyncSession]:
     """
     Dependency to get database session
     """
-    db = SessionLocal()
-    try:
+    async with SessionLocal() as db:
+        yield db
+
+
+@asynccontextmanager
+async def get_db_session() -> AsyncIterator[AsyncSession]:
+    """
+    Open a database session outside of dependency injection
+
+    For code paths that only sometimes need the database, so the pool
+    isn't touched when they don't.
+    """
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
-def init_db():
+async def init_db():
     """
     Initialize database tables
     """
     try:
-        Base.metadata.create_all(bind=engine)
+        async with _SCHEMA_LOCK, engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                # Released automatically when the transaction commits
+                await conn.execute(
+                    text("SELECT pg_advisory_xact_lock(:id)"),
+                    {"id": _SCHEMA_ADVISORY_LOCK_ID},
+                )
+            await conn.run_sync(Base.metadata.create_all)
         logger.info("Database tables created successfully")
     except Exception as e:
-        logger.error(f"Error creating database tables: {e}")
+        logger.error("Error creating database tables: %s", e)
         raise
 
 
-def drop_db():
+async def drop_db():
     """
     Drop all database tables (use with caution!)
     """
     try:
-        Base.metadata.drop_all(bind=engine)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
         logger.warning("All database tables dropped")
     except Exception as e:
-        logger.error(f"Error dropping database tables: {e}")
+        logger.error("Error dropping database tables: %s", e)
         raise
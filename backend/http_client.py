@@ -0,0 +1,18 @@
+"""
+Shared HTTP client for outbound API calls
+"""
+import httpx
+
+# One pooled client keeps TCP/TLS connections to OAuth providers alive
+# between requests instead of handshaking on every call
+http_client = httpx.AsyncClient(
+    timeout=10,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=40),
+)
+
+
+async def close_http_client() -> None:
+    """
+    Close the shared HTTP client and its connections
+    """
+    await http_client.aclose()
@@ -2,31 +2,75 @@
 Vividly Backend - Main Application
 """
 from fastapi import FastAPI, Depends
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from config import settings
 from database import init_db, get_db
+from cache import close_cache
+from http_client import close_http_client
+from services.gemini_service import GeminiService
+from schemas import build_deferred_schemas
+from utils.generation_cache import generation_cache_stats
+from utils.security import warm_password_hashing, shutdown_password_hashing
+from middleware import FastCORSMiddleware
+from contextlib import asynccontextmanager
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
+
+# Hot settings resolved once at import
+APP_NAME = settings.APP_NAME
+APP_VERSION = settings.APP_VERSION
+ENVIRONMENT = settings.ENVIRONMENT
 
 # Configure logging
 logging.basicConfig(
     level=settings.LOG_LEVEL,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
+# The format uses none of these; skip collecting them for every record
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
 logger = logging.getLogger(__name__)
 
+UTC = timezone.utc
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize database, Gemini and password hashing; clean up on shutdown"""
+    logger.info("Starting %s v%s", APP_NAME, APP_VERSION)
+    logger.info("Environment: %s", ENVIRONMENT)
+    # Clients and pools are released even when a startup step fails
+    try:
+        try:
+            await init_db()
+            logger.info("Database initialized successfully")
+        except Exception as e:
+            logger.error("Failed to initialize database: %s", e)
+        GeminiService.initialize()
+        build_deferred_schemas()
+        await warm_password_hashing()
+        yield
+    finally:
+        logger.info("Shutting down %s", APP_NAME)
+        await close_cache()
+        await close_http_client()
+        shutdown_password_hashing()
+
+
 # Create FastAPI app
 app = FastAPI(
-    title=settings.APP_NAME,
-    version=settings.APP_VERSION,
+    title=APP_NAME,
+    version=APP_VERSION,
     description="Vividly - AI Website Builder Backend API",
     debug=settings.DEBUG,
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
 app.add_middleware(
-    CORSMiddleware,
+    FastCORSMiddleware,
     allow_origins=settings.CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
@@ -34,35 +78,17 @@ app.add_middleware(
 )
 
 
-# Events
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database on startup"""
-    logger.info(f"Starting {settings.APP_NAME} v{settings.APP_VERSION}")
-    logger.info(f"Environment: {settings.ENVIRONMENT}")
-    try:
-        init_db()
-        logger.info("Database initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize database: {e}")
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Cleanup on shutdown"""
-    logger.info(f"Shutting down {settings.APP_NAME}")
-
-
 # Health check endpoint
 @app.get("/health", tags=["Health"])
 async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "service": settings.APP_NAME,
-        "version": settings.APP_VERSION,
-        "timestamp": datetime.utcnow().isoformat(),
-        "environment": settings.ENVIRONMENT,
+        "service": APP_NAME,
+        "version": APP_VERSION,
+        "timestamp": datetime.now(UTC).isoformat(),
+        "environment": ENVIRONMENT,
+        "generation_cache": generation_cache_stats(),
     }
 
 
@@ -71,8 +97,8 @@ async def health_check():
 async def root():
     """Root endpoint"""
     return {
-        "message": f"Welcome to {settings.APP_NAME}",
-        "version": settings.APP_VERSION,
+        "message": f"Welcome to {APP_NAME}",
+        "version": APP_VERSION,
         "docs": "/docs",
         "openapi": "/openapi.json",
     }
@@ -92,8 +118,8 @@ app.include_router(codegen_router)
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
     """General exception handler"""
-    logger.error(f"Unhandled exception: {exc}")
-    return JSONResponse(
+    logger.error("Unhandled exception: %s", exc)
+    return ORJSONResponse(
         status_code=500,
         content={"detail": "Internal server error"},
     )
@@ -3,12 +3,18 @@ Middleware modules
 """
 from middleware.auth_middleware import (
     get_current_user,
+    get_current_claims,
     get_current_admin,
     get_optional_user,
+    CurrentUser,
 )
+from middleware.cors_middleware import FastCORSMiddleware
 
 __all__ = [
     "get_current_user",
+    "get_current_claims",
     "get_current_admin",
     "get_optional_user",
+    "CurrentUser",
+    "FastCORSMiddleware",
 ]
@@ -3,15 +3,18 @@ Authentication middleware
 """
 from fastapi import HTTPException, status, Depends, Request
 from fastapi.security import HTTPBearer
-from utils.security import verify_token
-from database import get_db
+from utils.security import verify_token_cached, parse_user_id
+from utils.user_cache import UserSnapshot, get_cached_user, cache_user, is_token_revoked
+from database import get_db, get_db_session
 from models import User
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Annotated, Any, Dict
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
-security = HTTPBearer()
+security = HTTPBearer(auto_error=False)
 
 
 async def get_token_from_request(request: Request) -> str | None:
@@ -19,25 +22,102 @@ async def get_token_from_request(request: Request) -> str | None:
     Extract token from Authorization header
     """
     auth_header = request.headers.get("Authorization")
-    if not auth_header:
+    # Prefix check and slice instead of splitting the whole header
+    if not auth_header or auth_header[:7].lower() != "bearer ":
         return None
-    
-    try:
-        scheme, token = auth_header.split()
-        if scheme.lower() != "bearer":
-            return None
-        return token
-    except ValueError:
+
+    token = auth_header[7:].strip()
+    if not token:
+        return None
+    request.state.token = token
+    return token
+
+
+async def get_current_claims(request: Request) -> Dict[str, Any]:
+    """
+    Get verified token claims without loading the user row
+
+    Claims are as fresh as the token, so use this only for authorization
+    checks that tolerate that; use get_current_user for user data.
+    """
+    cached = getattr(request.state, "claims", None)
+    if cached is not None:
+        return cached
+
+    token = await get_token_from_request(request)
+
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Missing credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    payload = verify_token_cached(token)
+    if payload is None or payload.get("sub") is None or payload.get("type") == "refresh":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if await is_token_revoked(payload["sub"], payload.get("iat")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # Tokens issued before claims were embedded lack "active"
+    if payload.get("active") is False:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User account is inactive",
+        )
+
+    request.state.claims = payload
+    return payload
+
+
+async def load_user(db: AsyncSession | None, user_id: str) -> UserSnapshot | None:
+    """
+    Load a user by ID as an immutable snapshot, reusing the Redis user cache
+
+    Without a session, one is opened only on a cache miss.
+    """
+    user, version = await get_cached_user(user_id)
+    if user is not None:
+        return user
+
+    user_uuid = parse_user_id(user_id)
+    if user_uuid is None:
+        return None
+
+    if db is None:
+        async with get_db_session() as session:
+            return await _fetch_user(session, user_uuid, version)
+    return await _fetch_user(db, user_uuid, version)
+
+
+async def _fetch_user(db: AsyncSession, user_uuid: uuid.UUID, version: int) -> UserSnapshot | None:
+    # Primary-key lookup hits the identity map before issuing a SELECT
+    user = await db.get(User, user_uuid)
+    if user is None:
         return None
+    return await cache_user(user, version)
 
 
 async def get_current_user(
     request: Request,
-    db: Session = Depends(get_db),
-) -> User:
+    db: AsyncSession = Depends(get_db),
+) -> UserSnapshot:
     """
     Get current user from token
     """
+    cached = getattr(request.state, "user", None)
+    if cached is not None:
+        return cached
+
     token = await get_token_from_request(request)
     
     if not token:
@@ -48,7 +128,7 @@ async def get_current_user(
         )
 
     # Verify token
-    payload = verify_token(token)
+    payload = verify_token_cached(token)
     if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -65,8 +145,15 @@ async def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    # Get user from database
-    user = db.query(User).filter(User.id == user_id).first()
+    if await is_token_revoked(user_id, payload.get("iat")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # Get user from cache or database
+    user = await load_user(db, user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -81,12 +168,17 @@ async def get_current_user(
             detail="User account is inactive",
         )
 
+    request.state.user = user
     return user
 
 
+# Shared annotation so every route resolves the same dependency callable
+CurrentUser = Annotated[UserSnapshot, Depends(get_current_user)]
+
+
 async def get_current_admin(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: UserSnapshot = Depends(get_current_user),
+) -> UserSnapshot:
     """
     Get current admin user
     """
@@ -98,25 +190,31 @@ async def get_current_admin(
     return current_user
 
 
-async def get_optional_user(
-    request: Request,
-    db: Session = Depends(get_db),
-) -> User | None:
+async def get_optional_user(request: Request) -> UserSnapshot | None:
     """
     Get optional current user (doesn't fail if not authenticated)
     """
+    cached = getattr(request.state, "user", None)
+    if cached is not None:
+        return cached
+
     token = await get_token_from_request(request)
     
     if not token:
         return None
 
-    payload = verify_token(token)
+    payload = verify_token_cached(token)
     if payload is None:
         return None
 
     user_id = payload.get("sub")
-    if user_id is None:
+    if user_id is None or await is_token_revoked(user_id, payload.get("iat")):
         return None
 
-    user = db.query(User).filter(User.id == user_id).first()
-    return user if user and user.is_active else None
+    # Anonymous and cached requests never check out a pooled connection
+    user = await load_user(None, user_id)
+    if user is None or not user.is_active:
+        return None
+
+    request.state.user = user
+    return user
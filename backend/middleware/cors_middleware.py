@@ -0,0 +1,27 @@
+"""
+CORS middleware
+"""
+from starlette.middleware.cors import CORSMiddleware
+from starlette.types import ASGIApp
+from typing import Sequence
+
+
+class FastCORSMiddleware(CORSMiddleware):
+    """
+    CORSMiddleware with set-based origin checks
+
+    Starlette scans the allow_origins list for every cross-origin request;
+    exact origins are checked against a frozenset before the regex.
+    """
+
+    def __init__(self, app: ASGIApp, allow_origins: Sequence[str] = (), **kwargs) -> None:
+        super().__init__(app, allow_origins=allow_origins, **kwargs)
+        self.allow_origins_set = frozenset(allow_origins)
+
+    def is_allowed_origin(self, origin: str) -> bool:
+        if self.allow_all_origins or origin in self.allow_origins_set:
+            return True
+
+        return self.allow_origin_regex is not None and bool(
+            self.allow_origin_regex.fullmatch(origin)
+        )
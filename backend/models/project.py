@@ -1,22 +1,38 @@
 """
 Project model
 """
-from sqlalchemy import Column, String, Text, DateTime, Boolean, Integer, JSON, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
-from database import Base
-from datetime import datetime
-import uuid
+from sqlalchemy import Column, String, Text, DateTime, Boolean, Integer, JSON, ForeignKey, Index, text, func
+from sqlalchemy.orm import relationship
+from database import Base, UUIDType
+from datetime import datetime, timezone
+
+UTC = timezone.utc
 
 
 class Project(Base):
     """Project model"""
     __tablename__ = "projects"
+    __table_args__ = (
+        Index(
+            "idx_projects_user_status_updated",
+            "user_id",
+            "status",
+            text("updated_at DESC"),
+            postgresql_include=["name", "slug"],
+        ),
+        Index(
+            "idx_projects_user_created",
+            "user_id",
+            text("created_at DESC"),
+            text("id DESC"),
+        ),
+    )
 
     # Primary Key
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUIDType, primary_key=True, server_default=func.gen_random_uuid())
 
     # Foreign Key
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False, index=True)
+    user_id = Column(UUIDType, ForeignKey("users.id"), nullable=False, index=True)
 
     # Basic Information
     name = Column(String(200), nullable=False)
@@ -42,39 +58,18 @@ class Project(Base):
     comments_count = Column(Integer, default=0, nullable=False)
 
     # Publishing
-    published_at = Column(DateTime, nullable=True)
+    published_at = Column(DateTime(timezone=True), nullable=True)
     is_public = Column(Boolean, default=False, nullable=False)
     enable_analytics = Column(Boolean, default=True, nullable=False)
 
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC), nullable=False)
+
+    # Relationships
+    # Not serialized by ProjectOut; list queries that need the owner must
+    # selectinload it rather than lazy-load one user per project.
+    owner = relationship("User", lazy="raise_on_sql")
 
     def __repr__(self):
         return f"<Project {self.name}>"
-
-    def to_dict(self):
-        return {
-            "id": str(self.id),
-            "user_id": str(self.user_id),
-            "name": self.name,
-            "description": self.description,
-            "slug": self.slug,
-            "vibe_description": self.vibe_description,
-            "status": self.status,
-            "generated_code": self.generated_code,
-            "preview_url": self.preview_url,
-            "live_url": self.live_url,
-            "language": self.language,
-            "framework": self.framework,
-            "tags": self.tags,
-            "collaborators": self.collaborators,
-            "views_count": self.views_count,
-            "likes_count": self.likes_count,
-            "comments_count": self.comments_count,
-            "published_at": self.published_at.isoformat() if self.published_at else None,
-            "is_public": self.is_public,
-            "enable_analytics": self.enable_analytics,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
-        }
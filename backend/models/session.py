@@ -1,23 +1,32 @@
 """
 Session model for user sessions and tokens
 """
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Text
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
-from database import Base
-from datetime import datetime
-import uuid
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Text, Index, text, func
+from sqlalchemy.orm import relationship, backref
+from database import Base, UUIDType
+from datetime import datetime, timezone
+
+UTC = timezone.utc
 
 
 class Session(Base):
     """Session model for managing user sessions"""
     __tablename__ = "sessions"
+    __table_args__ = (
+        Index(
+            "idx_sessions_access_token_hash",
+            "access_token",
+            postgresql_using="hash",
+            postgresql_where=text("is_active"),
+        ),
+        Index("idx_sessions_user_active_expires", "user_id", "is_active", text("expires_at DESC")),
+    )
 
     # Primary Key
-    id = Column(String(255), primary_key=True, default=lambda: str(uuid.uuid4()))
+    id = Column(UUIDType, primary_key=True, server_default=func.gen_random_uuid())
 
     # Foreign Key
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    user_id = Column(UUIDType, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
 
     # Tokens
     access_token = Column(Text, nullable=False)
@@ -31,28 +40,22 @@ class Session(Base):
     is_active = Column(Boolean, default=True)
 
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    expires_at = Column(DateTime, nullable=False)
-    last_used_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    last_used_at = Column(DateTime(timezone=True), nullable=True)
 
     # Relationships
-    user = relationship("User", backref="sessions")
+    # Let ON DELETE CASCADE remove sessions instead of lazy-loading them.
+    # Query sessions explicitly (AuthService.get_active_sessions); an
+    # implicit lazy load here would be an N+1 and can't run under asyncio.
+    user = relationship(
+        "User",
+        backref=backref("sessions", passive_deletes=True, lazy="raise_on_sql"),
+    )
 
     def __repr__(self):
         return f"<Session {self.id}>"
 
     def is_expired(self) -> bool:
         """Check if session is expired"""
-        return datetime.utcnow() > self.expires_at
-
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "user_id": str(self.user_id),
-            "user_agent": self.user_agent,
-            "ip_address": self.ip_address,
-            "is_active": self.is_active,
-            "created_at": self.created_at.isoformat(),
-            "expires_at": self.expires_at.isoformat(),
-            "last_used_at": self.last_used_at.isoformat() if self.last_used_at else None,
-        }
+        return datetime.now(UTC) > self.expires_at
@@ -1,22 +1,34 @@
 """
 User model
 """
-from sqlalchemy import Column, String, Boolean, DateTime, Text, JSON
-from sqlalchemy.dialects.postgresql import UUID
-from database import Base
-from datetime import datetime
-import uuid
+from sqlalchemy import Column, String, Boolean, DateTime, Text, JSON, Index, text, func
+from database import Base, UUIDType
+from datetime import datetime, timezone
+
+UTC = timezone.utc
 
 
 class User(Base):
     """User model"""
     __tablename__ = "users"
+    __table_args__ = (
+        Index("idx_users_created", text("created_at DESC"), text("id DESC")),
+        # The only email index: enforces uniqueness and covers what login reads,
+        # so the lookup never visits the heap. last_login_at is left out so the
+        # per-login UPDATE doesn't touch this index.
+        Index(
+            "idx_users_email_login",
+            "email",
+            unique=True,
+            postgresql_include=["id", "password_hash", "is_active", "is_admin"],
+        ),
+    )
 
     # Primary Key
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUIDType, primary_key=True, server_default=func.gen_random_uuid())
 
     # Basic Information
-    email = Column(String(255), unique=True, nullable=False, index=True)
+    email = Column(String(255), nullable=False)  # unique via idx_users_email_login
     password_hash = Column(String(255), nullable=True)
     first_name = Column(String(100), nullable=True)
     last_name = Column(String(100), nullable=True)
@@ -42,31 +54,12 @@ class User(Base):
     language = Column(String(10), default="en")
 
     # Timestamps
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
-    last_login_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False)
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC), nullable=False)
+    last_login_at = Column(DateTime(timezone=True), nullable=True)
 
     # Metadata
     user_metadata = Column(JSON, default={})
 
     def __repr__(self):
         return f"<User {self.email}>"
-
-    def to_dict(self):
-        return {
-            "id": str(self.id),
-            "email": self.email,
-            "first_name": self.first_name,
-            "last_name": self.last_name,
-            "avatar_url": self.avatar_url,
-            "email_verified": self.email_verified,
-            "is_active": self.is_active,
-            "phone": self.phone,
-            "country": self.country,
-            "timezone": self.timezone,
-            "language": self.language,
-            "created_at": self.created_at.isoformat(),
-            "updated_at": self.updated_at.isoformat(),
-            "last_login_at": self.last_login_at.isoformat() if self.last_login_at else None,
-            "user_metadata": self.user_metadata,
-        }
@@ -2,7 +2,7 @@
 Authentication routes
 """
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
 from schemas import (
     LoginRequest,
@@ -11,23 +11,25 @@ from schemas import (
     TokenResponse,
     AuthResponse,
     UserResponse,
+    UserOut,
+    SessionOut,
 )
 from services import AuthService
-from middleware import get_current_user
-from models import User
+from middleware import CurrentUser
+from utils.routing import ORJSONRoute
 import logging
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api/auth", tags=["Authentication"])
+router = APIRouter(prefix="/api/auth", tags=["Authentication"], route_class=ORJSONRoute)
 
 
 @router.post("/register", response_model=AuthResponse)
-async def register(request: RegisterRequest, db: Session = Depends(get_db)):
+async def register(request: RegisterRequest, db: AsyncSession = Depends(get_db)):
     """
     Register a new user
     """
-    success, message, user = AuthService.register(db, request)
+    success, message, user = await AuthService.register(db, request)
     
     if not success:
         raise HTTPException(
@@ -38,7 +40,7 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
     return AuthResponse(
         success=True,
         message=message,
-        data={"user": user.to_dict()} if user else None,
+        data={"user": UserOut.from_row(user)} if user else None,
     )
 
 
@@ -46,7 +48,7 @@ async def register(request: RegisterRequest, db: Session = Depends(get_db)):
 async def login(
     request: LoginRequest,
     req: Request,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Login user
@@ -55,7 +57,7 @@ async def login(
     user_agent = req.headers.get("user-agent")
     client_host = req.client.host if req.client else None
 
-    success, message, token_response = AuthService.login(
+    success, message, token_response = await AuthService.login(
         db,
         request,
         user_agent=user_agent,
@@ -81,11 +83,11 @@ async def login(
 
 
 @router.post("/refresh", response_model=AuthResponse)
-async def refresh_token(request: TokenRefreshRequest, db: Session = Depends(get_db)):
+async def refresh_token(request: TokenRefreshRequest, db: AsyncSession = Depends(get_db)):
     """
     Refresh access token
     """
-    success, message, token_response = AuthService.refresh_token(db, request.refresh_token)
+    success, message, token_response = await AuthService.refresh_token(db, request.refresh_token)
 
     if not success:
         raise HTTPException(
@@ -107,23 +109,19 @@ async def refresh_token(request: TokenRefreshRequest, db: Session = Depends(get_
 
 @router.post("/logout", response_model=AuthResponse)
 async def logout(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Logout user
     """
-    # Get active sessions
-    sessions = AuthService.get_active_sessions(db, str(current_user.id))
-    
-    if sessions:
-        # Logout all sessions
-        success, message = AuthService.revoke_all_sessions(db, str(current_user.id))
-        if not success:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=message,
-            )
+    # Logout all sessions (a no-op UPDATE when none are active)
+    success, message = await AuthService.revoke_all_sessions(db, str(current_user.id))
+    if not success:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=message,
+        )
     
     return AuthResponse(
         success=True,
@@ -132,43 +130,45 @@ async def logout(
 
 
 @router.get("/me", response_model=AuthResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: CurrentUser):
     """
     Get current user information
     """
+    # Served from the user row (via the user cache), not the token claims,
+    # so email and role changes show up before the token is reissued
     return AuthResponse(
         success=True,
         message="User information retrieved",
-        data={"user": current_user.to_dict()},
+        data={"user": UserOut.from_row(current_user)},
     )
 
 
 @router.get("/sessions", response_model=AuthResponse)
 async def get_sessions(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Get all active sessions for current user
     """
-    sessions = AuthService.get_active_sessions(db, str(current_user.id))
+    sessions = await AuthService.get_active_sessions(db, str(current_user.id))
     
     return AuthResponse(
         success=True,
         message="Sessions retrieved",
-        data={"sessions": [session.to_dict() for session in sessions]},
+        data={"sessions": [SessionOut.from_row(session) for session in sessions]},
     )
 
 
 @router.post("/revoke-all-sessions", response_model=AuthResponse)
 async def revoke_all_sessions(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Revoke all sessions for current user
     """
-    success, message = AuthService.revoke_all_sessions(db, str(current_user.id))
+    success, message = await AuthService.revoke_all_sessions(db, str(current_user.id))
     
     if not success:
         raise HTTPException(
@@ -2,70 +2,333 @@
 Code generation API routes using Google Gemini
 """
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
 from services.gemini_service import GeminiService
 from services.project_service import ProjectService
-from middleware.auth_middleware import get_current_user
-from models import User
+from middleware import CurrentUser
 from schemas import ProjectGenerateCodeRequest, ProjectGenerateCodeResponse
+from utils.generation_cache import generation_key, get_cached_generation, cache_generation
+from utils.routing import ORJSONRoute
+from config import settings
+from typing import List
+from functools import partial
+import asyncio
 import logging
+import orjson
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api/codegen", tags=["code-generation"])
+router = APIRouter(prefix="/api/codegen", tags=["code-generation"], route_class=ORJSONRoute)
 
-# Initialize Gemini
-GeminiService.initialize()
+
+async def _generate_cached(kind: str, generate, *inputs: str):
+    """
+    Run a generation, serving repeated inputs from the generation cache
+
+    Returns (success, message, result, cached).
+    """
+    key = generation_key(kind, *inputs)
+    result = await get_cached_generation(key)
+    if result is not None:
+        return True, "Served from cache", result, True
+
+    success, message, result = await generate(*inputs)
+    if success:
+        await cache_generation(key, result)
+    return success, message, result, False
+
+
+async def _run_limited(generate, *inputs: str):
+    """Run an async generation while holding a concurrency slot"""
+    async with _gemini_semaphore:
+        return await generate(*inputs)
+
+
+# Shared by concurrent generations so batches stay within Gemini rate limits
+_gemini_semaphore = asyncio.Semaphore(settings.GEMINI_MAX_CONCURRENCY)
+
+MAX_BATCH_SIZE = 20
+
+_ASYNC_GENERATORS = {
+    "html": GeminiService.agenerate_html_code,
+    "react": GeminiService.agenerate_react_code,
+}
+
+# Everything a new project starts from, generated side by side
+_BUNDLE_GENERATORS = {
+    **_ASYNC_GENERATORS,
+    "css": GeminiService.agenerate_css_from_vibe,
+    "structure": GeminiService.agenerate_project_structure,
+}
+
+
+# Follow-ups users commonly ask for right after a first generation
+PREFETCH_VARIANTS = ("minimal version", "dark mode version")
+
+# Prefetches only ever hold two of the shared Gemini slots
+_prefetch_semaphore = asyncio.Semaphore(2)
+_prefetch_tasks: set = set()
+
+
+async def _prefetch_variants(kind: str, generate, vibe_description: str) -> None:
+    """
+    Warm the generation cache for variants of a description
+
+    Each variant is generated and stored under its own exact key, so a
+    follow-up request for "<description>, <variant>" is a cache hit.
+    """
+    for variant in PREFETCH_VARIANTS:
+        async with _prefetch_semaphore:
+            try:
+                await _generate_cached(
+                    kind, partial(_run_limited, generate), f"{vibe_description}, {variant}"
+                )
+            except Exception as e:
+                logger.warning("Prefetching %s variant failed: %s", kind, e)
+
+
+def _schedule_prefetch(kind: str, generate, vibe_description: str) -> None:
+    """Start prefetching variants in the background when enabled"""
+    if not settings.GEMINI_PREFETCH_VARIANTS:
+        return
+    task = asyncio.create_task(_prefetch_variants(kind, generate, vibe_description))
+    # The loop only keeps weak references to tasks
+    _prefetch_tasks.add(task)
+    task.add_done_callback(_prefetch_tasks.discard)
+
+
+async def _generate_limited(request: ProjectGenerateCodeRequest):
+    """Generate code for one batch item; cache hits skip the semaphore"""
+    generate = _ASYNC_GENERATORS.get(request.language)
+    if generate is None:
+        return False, "Unsupported language", None, False
+
+    return await _generate_cached(
+        request.language,
+        partial(_run_limited, generate),
+        request.vibe_description,
+    )
 
 
 @router.post("/html", response_model=ProjectGenerateCodeResponse)
 async def generate_html_code(
     request: ProjectGenerateCodeRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
 ):
     """Generate HTML code from vibe description"""
-    success, message, code = GeminiService.generate_html_code(request.vibe_description)
+    success, message, code, cached = await _generate_cached(
+        "html", GeminiService.agenerate_html_code, request.vibe_description
+    )
     
     if not success:
         raise HTTPException(status_code=400, detail=message)
+
+    if not cached:
+        _schedule_prefetch("html", GeminiService.agenerate_html_code, request.vibe_description)
     
     return ProjectGenerateCodeResponse(
         project_id="",
         status="generated",
         generated_code=code,
         preview_url=None,
-        estimated_time=2.5,
+        estimated_time=0.0 if cached else 2.5,
+    )
+
+
+def _sse(data: dict, event: str | None = None) -> bytes:
+    """Encode one server-sent event"""
+    prefix = f"event: {event}\n".encode() if event else b""
+    return prefix + b"data: " + orjson.dumps(data) + b"\n\n"
+
+
+def _stream_generation(kind: str, stream, clean, vibe_description: str) -> StreamingResponse:
+    """Stream a generation as server-sent events, caching the finished code"""
+    if not settings.GOOGLE_GEMINI_API_KEY:
+        raise HTTPException(status_code=400, detail="Gemini API key not configured")
+
+    key = generation_key(kind, vibe_description)
+
+    async def event_stream():
+        cached = await get_cached_generation(key)
+        if cached is not None:
+            yield _sse({"chunk": cached})
+            yield _sse({"cached": True}, event="done")
+            return
+
+        chunks = []
+        try:
+            async for text in stream(vibe_description):
+                chunks.append(text)
+                yield _sse({"chunk": text})
+        except Exception as e:
+            logger.error("Error streaming %s code: %s", kind, e)
+            yield _sse({"detail": "Error generating code"}, event="error")
+            return
+
+        await cache_generation(key, clean("".join(chunks)))
+        yield _sse({"cached": False}, event="done")
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@router.post("/html/stream")
+async def stream_html_code(
+    request: ProjectGenerateCodeRequest,
+    current_user: CurrentUser,
+):
+    """Stream HTML code from vibe description as server-sent events"""
+    return _stream_generation(
+        "html",
+        GeminiService.stream_html_code,
+        GeminiService.clean_html_code,
+        request.vibe_description,
+    )
+
+
+@router.post("/react/stream")
+async def stream_react_code(
+    request: ProjectGenerateCodeRequest,
+    current_user: CurrentUser,
+):
+    """Stream React component code from vibe description as server-sent events"""
+    return _stream_generation(
+        "react",
+        GeminiService.stream_react_code,
+        GeminiService.clean_react_code,
+        request.vibe_description,
     )
 
 
 @router.post("/react", response_model=ProjectGenerateCodeResponse)
 async def generate_react_code(
     request: ProjectGenerateCodeRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
 ):
     """Generate React component code from vibe description"""
-    success, message, code = GeminiService.generate_react_code(request.vibe_description)
+    success, message, code, cached = await _generate_cached(
+        "react", GeminiService.agenerate_react_code, request.vibe_description
+    )
     
     if not success:
         raise HTTPException(status_code=400, detail=message)
+
+    if not cached:
+        _schedule_prefetch("react", GeminiService.agenerate_react_code, request.vibe_description)
     
     return ProjectGenerateCodeResponse(
         project_id="",
         status="generated",
         generated_code=code,
         preview_url=None,
-        estimated_time=2.5,
+        estimated_time=0.0 if cached else 2.5,
+    )
+
+
+@router.post("/multi")
+async def generate_multi_code(
+    request: ProjectGenerateCodeRequest,
+    current_user: CurrentUser,
+):
+    """Generate HTML and React code concurrently from one vibe description"""
+    (html_ok, html_message, html_code, _), (react_ok, react_message, react_code, _) = await asyncio.gather(
+        _generate_cached("html", GeminiService.agenerate_html_code, request.vibe_description),
+        _generate_cached("react", GeminiService.agenerate_react_code, request.vibe_description),
     )
 
+    if not html_ok:
+        raise HTTPException(status_code=400, detail=html_message)
+    if not react_ok:
+        raise HTTPException(status_code=400, detail=react_message)
+
+    return {
+        "status": "generated",
+        "html": html_code,
+        "react": react_code,
+    }
+
+
+@router.post("/bundle")
+async def generate_bundle(
+    request: ProjectGenerateCodeRequest,
+    current_user: CurrentUser,
+):
+    """Generate HTML, React, CSS and project structure concurrently"""
+    results = await asyncio.gather(
+        *(
+            _generate_cached(kind, partial(_run_limited, generate), request.vibe_description)
+            for kind, generate in _BUNDLE_GENERATORS.items()
+        ),
+        return_exceptions=True,
+    )
+
+    bundle, errors = {}, {}
+    for kind, result in zip(_BUNDLE_GENERATORS, results):
+        if isinstance(result, Exception):
+            logger.error("Bundle generation of %s failed: %s", kind, result)
+            result = (False, "Error generating code", None, False)
+        success, message, generated, _ = result
+        if success:
+            bundle[kind] = generated
+        else:
+            errors[kind] = message
+
+    if not bundle:
+        raise HTTPException(status_code=400, detail=next(iter(errors.values())))
+
+    return {
+        "status": "partial" if errors else "generated",
+        **bundle,
+        "errors": errors,
+    }
+
+
+@router.post("/batch", response_model=List[ProjectGenerateCodeResponse])
+async def generate_batch(
+    requests: List[ProjectGenerateCodeRequest],
+    current_user: CurrentUser,
+):
+    """Generate code for several vibe descriptions in one call"""
+    if len(requests) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch size exceeds limit of {MAX_BATCH_SIZE}",
+        )
+
+    results = await asyncio.gather(
+        *(_generate_limited(r) for r in requests),
+        return_exceptions=True,
+    )
+
+    responses = []
+    for result in results:
+        if isinstance(result, Exception):
+            logger.error("Batch generation failed: %s", result)
+            result = (False, "Error generating code", None, False)
+        success, message, code, cached = result
+        responses.append(
+            ProjectGenerateCodeResponse(
+                project_id="",
+                status="generated" if success else "failed",
+                generated_code=code or "",
+                preview_url=None,
+                estimated_time=0.0 if cached else 2.5,
+                error=None if success else message,
+            )
+        )
+    return responses
+
 
 @router.post("/css")
 async def generate_css_code(
     vibe_description: str,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
 ):
     """Generate CSS from vibe description"""
-    success, message, code = GeminiService.generate_css_from_vibe(vibe_description)
+    success, message, code, _ = await _generate_cached(
+        "css", GeminiService.agenerate_css_from_vibe, vibe_description
+    )
     
     if not success:
         raise HTTPException(status_code=400, detail=message)
@@ -79,10 +342,12 @@ async def generate_css_code(
 @router.post("/project-structure")
 async def generate_project_structure(
     vibe_description: str,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
 ):
     """Generate project structure from vibe description"""
-    success, message, structure = GeminiService.generate_project_structure(vibe_description)
+    success, message, structure, _ = await _generate_cached(
+        "structure", GeminiService.agenerate_project_structure, vibe_description
+    )
     
     if not success:
         raise HTTPException(status_code=400, detail=message)
@@ -96,11 +361,13 @@ async def generate_project_structure(
 @router.post("/optimize")
 async def optimize_code(
     code: str,
+    current_user: CurrentUser,
     language: str = "html",
-    current_user: User = Depends(get_current_user),
 ):
     """Optimize generated code"""
-    success, message, optimized_code = GeminiService.optimize_code(code, language)
+    success, message, optimized_code, _ = await _generate_cached(
+        "optimize", GeminiService.aoptimize_code, code, language
+    )
     
     if not success:
         raise HTTPException(status_code=400, detail=message)
@@ -114,34 +381,34 @@ async def optimize_code(
 @router.post("/project/{project_id}/generate")
 async def generate_code_for_project(
     project_id: str,
+    current_user: CurrentUser,
     language: str = "html",
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
     """Generate code for a specific project"""
-    project = ProjectService.get_project_by_id(db, project_id)
-    
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
+    success, message, project = await ProjectService.get_project_authorized(
+        db, project_id, current_user.id, current_user.is_admin
+    )
     
-    if project.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Unauthorized")
+    if not success:
+        raise HTTPException(status_code=404 if message == "Project not found" else 403, detail=message)
     
-    # Generate code based on language
-    if language == "html":
-        success, message, code = GeminiService.generate_html_code(project.vibe_description)
-    elif language == "react":
-        success, message, code = GeminiService.generate_react_code(project.vibe_description)
-    else:
+    # Generate code based on language; the key follows the current description
+    generate = _ASYNC_GENERATORS.get(language)
+    if generate is None:
         raise HTTPException(status_code=400, detail="Unsupported language")
+
+    success, message, code, _ = await _generate_cached(language, generate, project.vibe_description)
     
     if not success:
         raise HTTPException(status_code=400, detail=message)
     
     # Update project with generated code
-    success, message, updated_project = ProjectService.update_project(
+    success, message, updated_project = await ProjectService.update_project_authorized(
         db,
         project_id,
+        current_user.id,
+        current_user.is_admin,
         {"generated_code": code, "status": "generated"},
     )
     
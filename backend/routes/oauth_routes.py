@@ -2,10 +2,13 @@
 OAuth authentication routes for GitHub and Google
 """
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
 from services.oauth_service import OAuthService
-from config import settings
+from config import Settings, get_settings
+from utils.security import create_oauth_state, verify_oauth_state
+from functools import lru_cache
+from urllib.parse import urlencode, quote
 import logging
 
 logger = logging.getLogger(__name__)
@@ -13,16 +16,41 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/auth/oauth", tags=["oauth"])
 
 
+@lru_cache(maxsize=8)
+def build_github_authorize_url(client_id: str, redirect_uri: str) -> str:
+    """Build the GitHub authorization URL (without state) once per client configuration"""
+    query = urlencode(
+        {
+            "client_id": client_id,
+            "redirect_uri": redirect_uri,
+            "scope": "user:email",
+        },
+        quote_via=quote,
+    )
+    return f"https://github.com/login/oauth/authorize?{query}"
+
+
+@lru_cache(maxsize=8)
+def build_google_authorize_url(client_id: str, redirect_uri: str) -> str:
+    """Build the Google authorization URL (without state) once per client configuration"""
+    query = urlencode(
+        {
+            "client_id": client_id,
+            "redirect_uri": redirect_uri,
+            "response_type": "code",
+            "scope": "openid email profile",
+        },
+        quote_via=quote,
+    )
+    return f"https://accounts.google.com/o/oauth2/v2/auth?{query}"
+
+
 @router.get("/github/authorize")
-async def github_authorize():
+async def github_authorize(settings: Settings = Depends(get_settings)):
     """Redirect to GitHub OAuth authorization"""
-    github_auth_url = (
-        f"https://github.com/login/oauth/authorize?"
-        f"client_id={settings.GITHUB_CLIENT_ID}&"
-        f"redirect_uri={settings.GITHUB_REDIRECT_URI}&"
-        f"scope=user:email&"
-        f"state=vividly_github_oauth"
-    )
+    github_auth_url = build_github_authorize_url(
+        settings.GITHUB_CLIENT_ID, settings.GITHUB_REDIRECT_URI
+    ) + f"&state={create_oauth_state('github')}"
     return {"authorization_url": github_auth_url}
 
 
@@ -31,10 +59,10 @@ async def github_callback(
     code: str = Query(...),
     state: str = Query(...),
     request: Request = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """GitHub OAuth callback"""
-    if state != "vividly_github_oauth":
+    if not verify_oauth_state(state, "github"):
         raise HTTPException(status_code=400, detail="Invalid state parameter")
 
     ip_address = request.client.host if request else None
@@ -58,16 +86,11 @@ async def github_callback(
 
 
 @router.get("/google/authorize")
-async def google_authorize():
+async def google_authorize(settings: Settings = Depends(get_settings)):
     """Redirect to Google OAuth authorization"""
-    google_auth_url = (
-        f"https://accounts.google.com/o/oauth2/v2/auth?"
-        f"client_id={settings.GOOGLE_CLIENT_ID}&"
-        f"redirect_uri={settings.GOOGLE_REDIRECT_URI}&"
-        f"response_type=code&"
-        f"scope=openid%20email%20profile&"
-        f"state=vividly_google_oauth"
-    )
+    google_auth_url = build_google_authorize_url(
+        settings.GOOGLE_CLIENT_ID, settings.GOOGLE_REDIRECT_URI
+    ) + f"&state={create_oauth_state('google')}"
     return {"authorization_url": google_auth_url}
 
 
@@ -76,10 +99,10 @@ async def google_callback(
     code: str = Query(...),
     state: str = Query(...),
     request: Request = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     """Google OAuth callback"""
-    if state != "vividly_google_oauth":
+    if not verify_oauth_state(state, "google"):
         raise HTTPException(status_code=400, detail="Invalid state parameter")
 
     ip_address = request.client.host if request else None
@@ -1,13 +1,13 @@
 """
 Project management API routes
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
 from services import UserService
 from services.project_service import ProjectService
 from schemas import (
-    ProjectResponse,
+    ProjectOut,
     ProjectListResponse,
     ProjectDetailResponse,
     ProjectCreate,
@@ -29,23 +29,69 @@ from schemas import (
     ProjectRemoveCollaboratorRequest,
     ProjectUpdateCollaboratorRoleRequest,
 )
-from middleware.auth_middleware import get_current_user
-from models import User
+from middleware import CurrentUser
+from models import Project
+from utils.user_cache import UserSnapshot
+from utils.pagination import encode_cursor, decode_cursor
+from utils.http_cache import weak_etag, check_not_modified
+from utils.responses import model_response
+from utils.routing import ORJSONRoute
+from typing import Optional
+from uuid import UUID
 import logging
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api/projects", tags=["projects"])
+router = APIRouter(prefix="/api/projects", tags=["projects"], route_class=ORJSONRoute)
 
+# Ownership is enforced in the SQL statement; map its failures back
+_ERROR_STATUS = {"Project not found": 404, "Unauthorized": 403}
 
-@router.post("", response_model=ProjectResponse)
+
+def _raise_project_error(message: str) -> None:
+    """Raise the HTTP error for a failed project lookup or mutation"""
+    raise HTTPException(status_code=_ERROR_STATUS.get(message, 400), detail=message)
+
+
+async def _load_owned(db: AsyncSession, project_id: str, user: UserSnapshot) -> Project:
+    """Load a project the user owns (or any project for admins), or raise"""
+    success, message, project = await ProjectService.get_project_authorized(
+        db, project_id, user.id, user.is_admin
+    )
+    if not success:
+        _raise_project_error(message)
+    return project
+
+
+async def _check_project_etag(
+    db: AsyncSession,
+    project_id: str,
+    user: UserSnapshot,
+    request: Request,
+    response: Response,
+) -> Optional[Response]:
+    """
+    Answer If-None-Match for a project from its updated_at alone
+
+    Returns a 304 when the client's copy is current; otherwise attaches the
+    ETag and returns None, and the caller loads whatever it needs.
+    """
+    success, message, updated_at = await ProjectService.get_project_updated_at(
+        db, project_id, user.id, user.is_admin
+    )
+    if not success:
+        _raise_project_error(message)
+    return check_not_modified(request, response, weak_etag(UUID(project_id), updated_at))
+
+
+@router.post("", response_model=ProjectOut)
 async def create_project(
     project_data: ProjectCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """Create a new project"""
-    success, message, project = ProjectService.create_project(
+    success, message, project = await ProjectService.create_project(
         db, current_user.id, project_data
     )
     if not success:
@@ -55,61 +101,71 @@ async def create_project(
 
 @router.get("", response_model=ProjectListResponse)
 async def list_projects(
+    current_user: CurrentUser,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    after: Optional[str] = Query(None, description="Cursor from the previous page"),
+    db: AsyncSession = Depends(get_db),
 ):
-    """List user's projects"""
-    projects = ProjectService.get_user_projects(db, current_user.id, skip, limit)
-    total = ProjectService.count_user_projects(db, current_user.id)
-
-    return ProjectListResponse(
+    """List user's projects (newest first), by offset or by cursor"""
+    if after is None:
+        projects, total = await ProjectService.get_user_projects_with_count(
+            db, current_user.id, skip, limit
+        )
+        page = skip // limit + 1
+    else:
+        cursor = decode_cursor(after)
+        if cursor is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        projects = await ProjectService.get_user_projects_after(
+            db, current_user.id, cursor, limit
+        )
+        total = await ProjectService.count_user_projects(db, current_user.id)
+        page = None
+
+    return model_response(ProjectListResponse(
         total=total,
-        page=skip // limit + 1,
+        page=page,
         limit=limit,
-        projects=projects,
-    )
+        projects=[ProjectOut.from_row(project) for project in projects],
+        next_cursor=encode_cursor(projects[-1]) if len(projects) == limit else None,
+    ))
 
 
-@router.get("/{project_id}", response_model=ProjectResponse)
+@router.get("/{project_id}", response_model=ProjectOut)
 async def get_project(
     project_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
-    """Get project by ID"""
-    project = ProjectService.get_project_by_id(db, project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    # Check ownership or admin
-    if project.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Unauthorized")
-
+    """Get project by ID (honours If-None-Match)"""
+    if "if-none-match" in request.headers:
+        # Revalidation reads one column; the full row only when it changed
+        not_modified = await _check_project_etag(db, project_id, current_user, request, response)
+        if not_modified:
+            return not_modified
+        return await _load_owned(db, project_id, current_user)
+
+    project = await _load_owned(db, project_id, current_user)
+    check_not_modified(request, response, weak_etag(project.id, project.updated_at))
     return project
 
 
-@router.put("/{project_id}", response_model=ProjectResponse)
+@router.put("/{project_id}", response_model=ProjectOut)
 async def update_project(
     project_id: str,
     update_data: ProjectUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """Update project"""
-    project = ProjectService.get_project_by_id(db, project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    if project.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Unauthorized")
-
-    success, message, updated_project = ProjectService.update_project(
-        db, project_id, update_data
+    success, message, updated_project = await ProjectService.update_project(
+        db, project_id, current_user.id, current_user.is_admin, update_data
     )
     if not success:
-        raise HTTPException(status_code=400, detail=message)
+        _raise_project_error(message)
 
     return updated_project
 
@@ -117,20 +173,15 @@ async def update_project(
 @router.delete("/{project_id}")
 async def delete_project(
     project_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """Delete project"""
-    project = ProjectService.get_project_by_id(db, project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    if project.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Unauthorized")
-
-    success, message = ProjectService.delete_project(db, project_id)
+    success, message = await ProjectService.delete_project(
+        db, project_id, current_user.id, current_user.is_admin
+    )
     if not success:
-        raise HTTPException(status_code=400, detail=message)
+        _raise_project_error(message)
 
     return {"message": message}
 
@@ -139,22 +190,15 @@ async def delete_project(
 async def generate_project_code(
     project_id: str,
     request: ProjectGenerateCodeRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """Generate project code using AI"""
-    project = ProjectService.get_project_by_id(db, project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    if project.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Unauthorized")
-
-    success, message, generated_code = ProjectService.generate_project_code(
-        db, project_id, request.vibe_description
+    success, message, generated_code = await ProjectService.generate_project_code(
+        db, project_id, current_user.id, current_user.is_admin, request.vibe_description
     )
     if not success:
-        raise HTTPException(status_code=400, detail=message)
+        _raise_project_error(message)
 
     return ProjectGenerateCodeResponse(
         project_id=project_id,
@@ -169,20 +213,15 @@ async def generate_project_code(
 async def publish_project(
     project_id: str,
     request: ProjectPublishRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """Publish project"""
-    project = ProjectService.get_project_by_id(db, project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    if project.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Unauthorized")
-
-    success, message = ProjectService.publish_project(db, project_id)
+    success, message, project = await ProjectService.publish_project(
+        db, project_id, current_user.id, current_user.is_admin
+    )
     if not success:
-        raise HTTPException(status_code=400, detail=message)
+        _raise_project_error(message)
 
     return ProjectPublishResponse(
         project_id=project_id,
@@ -195,20 +234,15 @@ async def publish_project(
 @router.post("/{project_id}/archive")
 async def archive_project(
     project_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """Archive project"""
-    project = ProjectService.get_project_by_id(db, project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    if project.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Unauthorized")
-
-    success, message = ProjectService.archive_project(db, project_id)
+    success, message = await ProjectService.archive_project(
+        db, project_id, current_user.id, current_user.is_admin
+    )
     if not success:
-        raise HTTPException(status_code=400, detail=message)
+        _raise_project_error(message)
 
     return {"message": message}
 
@@ -216,22 +250,15 @@ async def archive_project(
 @router.post("/{project_id}/duplicate", response_model=ProjectDuplicateResponse)
 async def duplicate_project(
     project_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """Duplicate project"""
-    project = ProjectService.get_project_by_id(db, project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    if project.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Unauthorized")
-
-    success, message, new_project = ProjectService.duplicate_project(
-        db, project_id, current_user.id
+    success, message, new_project = await ProjectService.duplicate_project(
+        db, project_id, current_user.id, current_user.is_admin
     )
     if not success:
-        raise HTTPException(status_code=400, detail=message)
+        _raise_project_error(message)
 
     return ProjectDuplicateResponse(
         original_id=project_id,
@@ -244,18 +271,13 @@ async def duplicate_project(
 async def export_project(
     project_id: str,
     request: ProjectExportRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """Export project"""
-    project = ProjectService.get_project_by_id(db, project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    if project.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Unauthorized")
+    project = await _load_owned(db, project_id, current_user)
 
-    success, message, export_data = ProjectService.export_project(db, project_id)
+    success, message, export_data = await ProjectService.export_project(db, project_id)
     if not success:
         raise HTTPException(status_code=400, detail=message)
 
@@ -270,13 +292,13 @@ async def export_project(
 
 @router.get("/stats/overview", response_model=ProjectStatsResponse)
 async def get_project_stats(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """Get project statistics"""
     # TODO: Implement statistics calculation
     return ProjectStatsResponse(
-        total_projects=ProjectService.count_user_projects(db, current_user.id),
+        total_projects=await ProjectService.count_user_projects(db, current_user.id),
         published_projects=0,
         draft_projects=0,
         archived_projects=0,
@@ -288,11 +310,11 @@ async def get_project_stats(
 
 @router.get("/search/query", response_model=ProjectSearchResponse)
 async def search_projects(
+    current_user: CurrentUser,
     q: str = Query(..., min_length=1, max_length=100),
     status: str = Query(None),
     limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
     """Search user's projects"""
     # TODO: Implement project search
@@ -302,16 +324,15 @@ async def search_projects(
 @router.get("/{project_id}/versions", response_model=list[ProjectVersionResponse])
 async def get_project_versions(
     project_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """Get project versions"""
-    project = ProjectService.get_project_by_id(db, project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    if project.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Unauthorized")
+    not_modified = await _check_project_etag(db, project_id, current_user, request, response)
+    if not_modified:
+        return not_modified
 
     # TODO: Implement version retrieval
     return []
@@ -320,16 +341,15 @@ async def get_project_versions(
 @router.get("/{project_id}/collaborators", response_model=list[ProjectCollaboratorResponse])
 async def get_project_collaborators(
     project_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """Get project collaborators"""
-    project = ProjectService.get_project_by_id(db, project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    if project.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Unauthorized")
+    not_modified = await _check_project_etag(db, project_id, current_user, request, response)
+    if not_modified:
+        return not_modified
 
     # TODO: Implement collaborators retrieval
     return []
@@ -339,16 +359,11 @@ async def get_project_collaborators(
 async def add_project_collaborator(
     project_id: str,
     request: ProjectAddCollaboratorRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """Add project collaborator"""
-    project = ProjectService.get_project_by_id(db, project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    if project.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Unauthorized")
+    await _load_owned(db, project_id, current_user)
 
     # TODO: Implement add collaborator
     raise HTTPException(status_code=501, detail="Not implemented")
@@ -358,16 +373,11 @@ async def add_project_collaborator(
 async def remove_project_collaborator(
     project_id: str,
     user_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """Remove project collaborator"""
-    project = ProjectService.get_project_by_id(db, project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    if project.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Unauthorized")
+    await _load_owned(db, project_id, current_user)
 
     # TODO: Implement remove collaborator
     return {"message": "Collaborator removed"}
@@ -378,16 +388,11 @@ async def update_project_collaborator_role(
     project_id: str,
     user_id: str,
     request: ProjectUpdateCollaboratorRoleRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """Update project collaborator role"""
-    project = ProjectService.get_project_by_id(db, project_id)
-    if not project:
-        raise HTTPException(status_code=404, detail="Project not found")
-
-    if project.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Unauthorized")
+    await _load_owned(db, project_id, current_user)
 
     # TODO: Implement update collaborator role
     return {"message": "Collaborator role updated"}
@@ -1,10 +1,15 @@
 """
 User management API routes
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
 from services import UserService
+from utils.security import averify_password
+from utils.pagination import encode_cursor, decode_cursor
+from utils.http_cache import weak_etag, check_not_modified
+from utils.responses import model_response
+from typing import Optional
 from schemas import (
     UserResponse,
     UserDetailResponse,
@@ -19,62 +24,90 @@ from schemas import (
     UserPreferencesResponse,
     UserPreferencesUpdate,
 )
-from middleware.auth_middleware import get_current_user
-from models import User
+from middleware import CurrentUser
+from utils.routing import ORJSONRoute
 import logging
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api/users", tags=["users"])
+router = APIRouter(prefix="/api/users", tags=["users"], route_class=ORJSONRoute)
 
 
 @router.get("/me", response_model=UserDetailResponse)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    current_user: CurrentUser,
 ):
-    """Get current user information"""
+    """Get current user information (honours If-None-Match)"""
+    not_modified = check_not_modified(
+        request,
+        response,
+        weak_etag(current_user.id, current_user.updated_at),
+        cache_control="private, max-age=5",
+    )
+    if not_modified:
+        return not_modified
     return current_user
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user(user_id: str, db: Session = Depends(get_db)):
-    """Get user by ID"""
-    user = UserService.get_user_by_id(db, user_id)
+async def get_user(
+    user_id: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+):
+    """Get user by ID (honours If-None-Match)"""
+    user = await UserService.get_user_by_id(db, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    not_modified = check_not_modified(request, response, weak_etag(user.id, user.updated_at))
+    if not_modified:
+        return not_modified
     return user
 
 
 @router.get("", response_model=UserListResponse)
 async def list_users(
+    current_user: CurrentUser,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    after: Optional[str] = Query(None, description="Cursor from the previous page"),
+    db: AsyncSession = Depends(get_db),
 ):
-    """List all users (admin only)"""
+    """List all users (admin only, newest first), by offset or by cursor"""
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Only admins can list users")
 
-    users = UserService.get_all_users(db, skip, limit)
-    total = UserService.count_users(db)
-
-    return UserListResponse(
+    if after is None:
+        users, total = await UserService.get_all_users_with_count(db, skip, limit)
+        page = skip // limit + 1
+    else:
+        cursor = decode_cursor(after)
+        if cursor is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        users = await UserService.get_users_after(db, cursor, limit)
+        total = await UserService.count_users(db)
+        page = None
+
+    return model_response(UserListResponse(
         total=total,
-        page=skip // limit + 1,
+        page=page,
         limit=limit,
         users=users,
-    )
+        next_cursor=encode_cursor(users[-1]) if len(users) == limit else None,
+    ))
 
 
 @router.put("/me", response_model=UserResponse)
 async def update_current_user(
     update_data: UserUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """Update current user information"""
-    success, message, user = UserService.update_user(db, current_user.id, update_data)
+    success, message, user = await UserService.update_user(db, current_user.id, update_data)
     if not success:
         raise HTTPException(status_code=400, detail=message)
     return user
@@ -84,14 +117,14 @@ async def update_current_user(
 async def update_user(
     user_id: str,
     update_data: UserUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """Update user information (admin or self)"""
     if current_user.id != user_id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Unauthorized")
 
-    success, message, user = UserService.update_user(db, user_id, update_data)
+    success, message, user = await UserService.update_user(db, user_id, update_data)
     if not success:
         raise HTTPException(status_code=400, detail=message)
     return user
@@ -100,14 +133,20 @@ async def update_user(
 @router.post("/me/change-password")
 async def change_password(
     request: ChangePasswordRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """Change current user password"""
+    # Reject cheap-to-detect mistakes before spending two password hashes
     if request.new_password != request.confirm_password:
         raise HTTPException(status_code=400, detail="Passwords do not match")
+    if request.new_password == request.old_password:
+        raise HTTPException(
+            status_code=400,
+            detail="New password must be different from the old password",
+        )
 
-    success, message = UserService.change_password(
+    success, message = await UserService.change_password(
         db,
         current_user.id,
         request.old_password,
@@ -122,16 +161,16 @@ async def change_password(
 @router.post("/me/deactivate")
 async def deactivate_account(
     request: DeactivateAccountRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """Deactivate current user account"""
-    from utils.security import verify_password
-
-    if not verify_password(request.password, current_user.password_hash):
+    # current_user is a snapshot without the password hash
+    user = await UserService.get_user_by_id(db, current_user.id)
+    if not user or not await averify_password(request.password, user.password_hash):
         raise HTTPException(status_code=400, detail="Password is incorrect")
 
-    success, message = UserService.deactivate_user(db, current_user.id)
+    success, message = await UserService.deactivate_user(db, current_user.id)
     if not success:
         raise HTTPException(status_code=400, detail=message)
 
@@ -141,16 +180,16 @@ async def deactivate_account(
 @router.post("/me/delete")
 async def delete_account(
     request: DeleteAccountRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """Delete current user account"""
-    from utils.security import verify_password
-
-    if not verify_password(request.password, current_user.password_hash):
+    # current_user is a snapshot without the password hash
+    user = await UserService.get_user_by_id(db, current_user.id)
+    if not user or not await averify_password(request.password, user.password_hash):
         raise HTTPException(status_code=400, detail="Password is incorrect")
 
-    success, message = UserService.delete_user(db, current_user.id)
+    success, message = await UserService.delete_user(db, current_user.id)
     if not success:
         raise HTTPException(status_code=400, detail=message)
 
@@ -160,14 +199,14 @@ async def delete_account(
 @router.post("/{user_id}/deactivate")
 async def deactivate_user_admin(
     user_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """Deactivate user (admin only)"""
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Only admins can deactivate users")
 
-    success, message = UserService.deactivate_user(db, user_id)
+    success, message = await UserService.deactivate_user(db, user_id)
     if not success:
         raise HTTPException(status_code=400, detail=message)
 
@@ -177,14 +216,14 @@ async def deactivate_user_admin(
 @router.post("/{user_id}/activate")
 async def activate_user_admin(
     user_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """Activate user (admin only)"""
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Only admins can activate users")
 
-    success, message = UserService.activate_user(db, user_id)
+    success, message = await UserService.activate_user(db, user_id)
     if not success:
         raise HTTPException(status_code=400, detail=message)
 
@@ -194,14 +233,14 @@ async def activate_user_admin(
 @router.post("/{user_id}/delete")
 async def delete_user_admin(
     user_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """Delete user (admin only)"""
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Only admins can delete users")
 
-    success, message = UserService.delete_user(db, user_id)
+    success, message = await UserService.delete_user(db, user_id)
     if not success:
         raise HTTPException(status_code=400, detail=message)
 
@@ -210,30 +249,29 @@ async def delete_user_admin(
 
 @router.get("/search/query", response_model=UserSearchResponse)
 async def search_users(
+    current_user: CurrentUser,
     q: str = Query(..., min_length=1, max_length=100),
     limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ):
     """Search users by email or name"""
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Only admins can search users")
 
-    results = UserService.search_users(db, q, limit)
+    results = await UserService.search_users(db, q, limit)
     return UserSearchResponse(total=len(results), results=results)
 
 
 @router.get("/stats/overview", response_model=UserStatsResponse)
 async def get_user_stats(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
+    db: AsyncSession = Depends(get_db),
 ):
     """Get user statistics (admin only)"""
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Only admins can view stats")
 
-    total = UserService.count_users(db)
-    active = UserService.count_active_users(db)
+    total, active = await UserService.get_user_counts(db)
 
     return UserStatsResponse(
         total_users=total,
@@ -247,9 +285,17 @@ async def get_user_stats(
 
 @router.get("/me/preferences", response_model=UserPreferencesResponse)
 async def get_user_preferences(
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    response: Response,
+    current_user: CurrentUser,
 ):
-    """Get current user preferences"""
+    """Get current user preferences (honours If-None-Match)"""
+    not_modified = check_not_modified(
+        request, response, weak_etag(current_user.id, current_user.updated_at)
+    )
+    if not_modified:
+        return not_modified
+
     return UserPreferencesResponse(
         email_notifications=True,  # TODO: Implement
         push_notifications=True,  # TODO: Implement
@@ -262,7 +308,7 @@ async def get_user_preferences(
 @router.put("/me/preferences", response_model=UserPreferencesResponse)
 async def update_user_preferences(
     preferences: UserPreferencesUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser,
 ):
     """Update current user preferences"""
     # TODO: Implement preferences storage
@@ -7,23 +7,10 @@ from schemas.user import (
     UserUpdate,
     UserResponse,
     UserProfileResponse,
+    UserOut,
     PasswordChangeRequest,
     PasswordResetRequest,
     PasswordResetConfirm,
-)
-from schemas.auth import (
-    TokenResponse,
-    TokenRefreshRequest,
-    LoginRequest,
-    RegisterRequest,
-    ForgotPasswordRequest,
-    ResetPasswordRequest,
-    VerifyEmailRequest,
-    LogoutRequest,
-    AuthResponse,
-    SessionResponse,
-)
-from schemas.user_schema import (
     ChangePasswordRequest,
     UserDetailResponse,
     UserListResponse,
@@ -39,11 +26,25 @@ from schemas.user_schema import (
     UserPreferencesResponse,
     UserPreferencesUpdate,
 )
+from schemas.auth import (
+    TokenResponse,
+    TokenRefreshRequest,
+    LoginRequest,
+    RegisterRequest,
+    ForgotPasswordRequest,
+    ResetPasswordRequest,
+    VerifyEmailRequest,
+    LogoutRequest,
+    AuthResponse,
+    SessionResponse,
+    SessionOut,
+)
 from schemas.project_schema import (
     ProjectBase,
     ProjectCreate,
     ProjectUpdate,
     ProjectResponse,
+    ProjectOut,
     ProjectListResponse,
     ProjectDetailResponse,
     ProjectGenerateCodeRequest,
@@ -70,6 +71,7 @@ __all__ = [
     "UserUpdate",
     "UserResponse",
     "UserProfileResponse",
+    "UserOut",
     "PasswordChangeRequest",
     "PasswordResetRequest",
     "PasswordResetConfirm",
@@ -83,6 +85,7 @@ __all__ = [
     "LogoutRequest",
     "AuthResponse",
     "SessionResponse",
+    "SessionOut",
     "ChangePasswordRequest",
     "UserDetailResponse",
     "UserListResponse",
@@ -101,6 +104,7 @@ __all__ = [
     "ProjectCreate",
     "ProjectUpdate",
     "ProjectResponse",
+    "ProjectOut",
     "ProjectListResponse",
     "ProjectDetailResponse",
     "ProjectGenerateCodeRequest",
@@ -120,3 +124,17 @@ __all__ = [
     "ProjectRemoveCollaboratorRequest",
     "ProjectUpdateCollaboratorRoleRequest",
 ]
+
+
+def build_deferred_schemas() -> None:
+    """
+    Compile the response schemas whose build was deferred
+
+    FastAPI compiles its own adapters for response_model but leaves the
+    models themselves unbuilt, so without this the first request to
+    construct each one pays its build. Called once at startup.
+    """
+    for name in __all__:
+        model = globals()[name]
+        if not model.__pydantic_complete__:
+            model.model_rebuild(force=True)
@@ -1,12 +1,19 @@
 """
 Authentication Pydantic schemas
 """
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, Field
+from datetime import datetime
 from typing import Optional
+from uuid import UUID
+from schemas.base import ResponseModel, RowOut
+from schemas.types import CachedEmailStr
 
 
-class TokenResponse(BaseModel):
+class TokenResponse(ResponseModel):
     """Token response schema"""
+    # Built with model_construct (see RowOut), so compiled eagerly
+    model_config = ConfigDict(defer_build=False)
+
     access_token: str
     refresh_token: str
     token_type: str = "bearer"
@@ -20,13 +27,13 @@ class TokenRefreshRequest(BaseModel):
 
 class LoginRequest(BaseModel):
     """Login request schema"""
-    email: EmailStr
+    email: CachedEmailStr
     password: str
 
 
 class RegisterRequest(BaseModel):
     """Registration request schema"""
-    email: EmailStr
+    email: CachedEmailStr
     password: str = Field(..., min_length=8)
     confirm_password: str
     first_name: Optional[str] = None
@@ -35,7 +42,7 @@ class RegisterRequest(BaseModel):
 
 class ForgotPasswordRequest(BaseModel):
     """Forgot password request schema"""
-    email: EmailStr
+    email: CachedEmailStr
 
 
 class ResetPasswordRequest(BaseModel):
@@ -55,14 +62,14 @@ class LogoutRequest(BaseModel):
     refresh_token: Optional[str] = None
 
 
-class AuthResponse(BaseModel):
+class AuthResponse(ResponseModel):
     """Generic auth response schema"""
     success: bool
     message: str
     data: Optional[dict] = None
 
 
-class SessionResponse(BaseModel):
+class SessionResponse(ResponseModel):
     """Session response schema"""
     id: str
     user_agent: Optional[str]
@@ -71,3 +78,15 @@ class SessionResponse(BaseModel):
     created_at: str
     expires_at: str
     last_used_at: Optional[str]
+
+
+class SessionOut(RowOut):
+    """Serialized session (replaces Session.to_dict)"""
+    id: UUID
+    user_id: UUID
+    user_agent: Optional[str] = None
+    ip_address: Optional[str] = None
+    is_active: bool
+    created_at: datetime
+    expires_at: datetime
+    last_used_at: Optional[datetime] = None
@@ -0,0 +1,33 @@
+"""
+Shared bases for response schemas
+"""
+from pydantic import BaseModel, ConfigDict
+from typing import Any
+
+# Rows from our own database already match their column types, so output
+# schemas skip re-validating them. Set False to validate every row again.
+TRUSTED_DB = True
+
+
+# Response schemas are never mutated after construction. Deferring the
+# core-schema build means models no route serves are never compiled.
+RESPONSE_CONFIG = ConfigDict(defer_build=True, from_attributes=True, frozen=True)
+
+
+class ResponseModel(BaseModel):
+    """Base for response schemas"""
+    model_config = RESPONSE_CONFIG
+
+
+class RowOut(ResponseModel):
+    """Output schema built from an ORM row"""
+    # model_construct never triggers a deferred build, and serializing an
+    # unbuilt model fails, so these are compiled at import
+    model_config = ConfigDict(defer_build=False)
+
+    @classmethod
+    def from_row(cls, row: Any):
+        """Build from a row, skipping validation when the DB is trusted"""
+        if not TRUSTED_DB:
+            return cls.model_validate(row)
+        return cls.model_construct(**{name: getattr(row, name) for name in cls.model_fields})
@@ -2,8 +2,14 @@
 Project schemas for request/response validation
 """
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Literal, Optional
 from datetime import datetime
+from uuid import UUID
+from schemas.base import RESPONSE_CONFIG, ResponseModel, RowOut
+
+# Closed value sets are Literals: a lookup in pydantic-core, not a regex
+ProjectLanguage = Literal["html", "react", "vue", "svelte"]
+CollaboratorRole = Literal["editor", "viewer"]
 
 
 class ProjectBase(BaseModel):
@@ -43,17 +49,44 @@ class ProjectResponse(ProjectBase):
     updated_at: datetime
     published_at: Optional[datetime]
 
-    class Config:
-        from_attributes = True
+    model_config = RESPONSE_CONFIG
+
+
+class ProjectOut(RowOut):
+    """Serialized project (replaces Project.to_dict)"""
+
+    id: UUID
+    user_id: UUID
+    name: str
+    description: Optional[str] = None
+    slug: Optional[str] = None
+    vibe_description: str
+    status: str
+    generated_code: Optional[str] = None
+    preview_url: Optional[str] = None
+    live_url: Optional[str] = None
+    language: str
+    framework: Optional[str] = None
+    tags: list[str] = []
+    collaborators: list[str] = []
+    views_count: int = 0
+    likes_count: int = 0
+    comments_count: int = 0
+    published_at: Optional[datetime] = None
+    is_public: bool = False
+    enable_analytics: bool = True
+    created_at: datetime
+    updated_at: datetime
 
 
-class ProjectListResponse(BaseModel):
+class ProjectListResponse(ResponseModel):
     """Project list response schema"""
 
     total: int
-    page: int
+    page: Optional[int] = None  # None when paging by cursor
     limit: int
-    projects: list[ProjectResponse]
+    projects: list[ProjectOut]
+    next_cursor: Optional[str] = None
 
 
 class ProjectDetailResponse(ProjectResponse):
@@ -70,11 +103,11 @@ class ProjectGenerateCodeRequest(BaseModel):
     """Generate code request schema"""
 
     vibe_description: str = Field(..., min_length=10, max_length=2000)
-    language: str = Field("html", pattern="^(html|react|vue|svelte)$")
+    language: ProjectLanguage = "html"
     framework: Optional[str] = None
 
 
-class ProjectGenerateCodeResponse(BaseModel):
+class ProjectGenerateCodeResponse(ResponseModel):
     """Generate code response schema"""
 
     project_id: str
@@ -82,6 +115,7 @@ class ProjectGenerateCodeResponse(BaseModel):
     generated_code: str
     preview_url: Optional[str]
     estimated_time: float  # in seconds
+    error: Optional[str] = None
 
 
 class ProjectPublishRequest(BaseModel):
@@ -91,7 +125,7 @@ class ProjectPublishRequest(BaseModel):
     enable_analytics: bool = True
 
 
-class ProjectPublishResponse(BaseModel):
+class ProjectPublishResponse(ResponseModel):
     """Publish project response schema"""
 
     project_id: str
@@ -103,11 +137,11 @@ class ProjectPublishResponse(BaseModel):
 class ProjectExportRequest(BaseModel):
     """Export project request schema"""
 
-    format: str = Field("json", pattern="^(json|zip|tar)$")
+    format: Literal["json", "zip", "tar"] = "json"
     include_assets: bool = True
 
 
-class ProjectExportResponse(BaseModel):
+class ProjectExportResponse(ResponseModel):
     """Export project response schema"""
 
     project_id: str
@@ -117,15 +151,15 @@ class ProjectExportResponse(BaseModel):
     created_at: datetime
 
 
-class ProjectDuplicateResponse(BaseModel):
+class ProjectDuplicateResponse(ResponseModel):
     """Duplicate project response schema"""
 
-    original_id: str
-    new_id: str
-    new_project: ProjectResponse
+    original_id: UUID
+    new_id: UUID
+    new_project: ProjectOut
 
 
-class ProjectStatsResponse(BaseModel):
+class ProjectStatsResponse(ResponseModel):
     """Project statistics response schema"""
 
     total_projects: int
@@ -145,14 +179,14 @@ class ProjectSearchRequest(BaseModel):
     limit: int = Field(10, ge=1, le=100)
 
 
-class ProjectSearchResponse(BaseModel):
+class ProjectSearchResponse(ResponseModel):
     """Project search response schema"""
 
     total: int
-    results: list[ProjectResponse]
+    results: list[ProjectOut]
 
 
-class ProjectActivityResponse(BaseModel):
+class ProjectActivityResponse(ResponseModel):
     """Project activity response schema"""
 
     id: str
@@ -162,7 +196,7 @@ class ProjectActivityResponse(BaseModel):
     created_at: datetime
 
 
-class ProjectVersionResponse(BaseModel):
+class ProjectVersionResponse(ResponseModel):
     """Project version response schema"""
 
     id: str
@@ -173,7 +207,7 @@ class ProjectVersionResponse(BaseModel):
     created_by: str
 
 
-class ProjectCollaboratorResponse(BaseModel):
+class ProjectCollaboratorResponse(ResponseModel):
     """Project collaborator response schema"""
 
     user_id: str
@@ -188,7 +222,7 @@ class ProjectAddCollaboratorRequest(BaseModel):
     """Add collaborator request schema"""
 
     email: str
-    role: str = Field("editor", pattern="^(editor|viewer)$")
+    role: CollaboratorRole = "editor"
 
 
 class ProjectRemoveCollaboratorRequest(BaseModel):
@@ -201,4 +235,4 @@ class ProjectUpdateCollaboratorRoleRequest(BaseModel):
     """Update collaborator role request schema"""
 
     user_id: str
-    role: str = Field(..., pattern="^(editor|viewer)$")
+    role: CollaboratorRole
@@ -0,0 +1,26 @@
+"""
+Shared field types for schemas
+"""
+from functools import lru_cache
+from pydantic import AfterValidator, WithJsonSchema
+from pydantic.networks import validate_email
+from typing import Annotated
+
+
+@lru_cache(maxsize=10_000)
+def _normalize_email(value: str) -> str:
+    """
+    Validate and normalize an email address, memoized per raw string
+
+    Same rules as pydantic's EmailStr (email-validator, no DNS lookups);
+    invalid addresses raise and are never cached.
+    """
+    return validate_email(value)[1]
+
+
+# Drop-in for EmailStr; the same few addresses are validated on every login
+CachedEmailStr = Annotated[
+    str,
+    AfterValidator(_normalize_email),
+    WithJsonSchema({"type": "string", "format": "email"}),
+]
@@ -1,15 +1,17 @@
 """
 User Pydantic schemas
 """
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, Literal, Optional
 from uuid import UUID
+from schemas.base import RESPONSE_CONFIG, ResponseModel, RowOut
+from schemas.types import CachedEmailStr
 
 
 class UserBase(BaseModel):
     """Base user schema"""
-    email: EmailStr
+    email: CachedEmailStr
     first_name: Optional[str] = None
     last_name: Optional[str] = None
     phone: Optional[str] = None
@@ -42,8 +44,7 @@ class UserResponse(UserBase):
     updated_at: datetime
     last_login_at: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
+    model_config = RESPONSE_CONFIG
 
 
 class UserProfileResponse(UserResponse):
@@ -51,6 +52,25 @@ class UserProfileResponse(UserResponse):
     avatar_url: Optional[str] = None
 
 
+class UserOut(RowOut):
+    """Serialized user (replaces User.to_dict)"""
+    id: UUID
+    email: str
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    avatar_url: Optional[str] = None
+    email_verified: bool
+    is_active: bool
+    phone: Optional[str] = None
+    country: Optional[str] = None
+    timezone: Optional[str] = None
+    language: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    last_login_at: Optional[datetime] = None
+    user_metadata: Optional[Dict[str, Any]] = None
+
+
 class PasswordChangeRequest(BaseModel):
     """Password change request schema"""
     old_password: str
@@ -60,7 +80,7 @@ class PasswordChangeRequest(BaseModel):
 
 class PasswordResetRequest(BaseModel):
     """Password reset request schema"""
-    email: EmailStr
+    email: CachedEmailStr
 
 
 class PasswordResetConfirm(BaseModel):
@@ -68,3 +88,119 @@ class PasswordResetConfirm(BaseModel):
     token: str
     new_password: str = Field(..., min_length=8)
     confirm_password: str
+
+
+class ChangePasswordRequest(BaseModel):
+    """Change password request schema"""
+    old_password: str = Field(..., min_length=8)
+    new_password: str = Field(..., min_length=8, max_length=100)
+    confirm_password: str = Field(..., min_length=8, max_length=100)
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "old_password": "currentPassword123",
+                "new_password": "newPassword456",
+                "confirm_password": "newPassword456",
+            }
+        }
+
+
+class UserDetailResponse(UserProfileResponse):
+    """Detailed user response schema"""
+    two_factor_enabled: Optional[bool] = None
+    # Not stored on User yet; None until billing and usage tracking land
+    subscription_tier: Optional[str] = None
+    subscription_status: Optional[str] = None
+    projects_count: Optional[int] = None
+    storage_used: Optional[float] = None
+    storage_limit: Optional[float] = None
+
+
+class UserListResponse(ResponseModel):
+    """User list response schema"""
+    total: int
+    page: Optional[int] = None  # None when paging by cursor
+    limit: int
+    users: list[UserResponse]
+    next_cursor: Optional[str] = None
+
+
+class UserStatsResponse(ResponseModel):
+    """User statistics response schema"""
+    total_users: int
+    active_users: int
+    inactive_users: int
+    verified_emails: int
+    two_factor_enabled: int
+    average_projects: float
+
+
+class Enable2FARequest(BaseModel):
+    """Enable 2FA request schema"""
+    password: str = Field(..., min_length=8)
+
+
+class Enable2FAResponse(ResponseModel):
+    """Enable 2FA response schema"""
+    secret: str
+    qr_code: str
+    backup_codes: list[str]
+
+
+class Verify2FARequest(BaseModel):
+    """Verify 2FA request schema"""
+    code: str = Field(..., pattern=r"^[0-9]{6}$")  # ASCII only; \d admits any Unicode digit
+
+
+class DeactivateAccountRequest(BaseModel):
+    """Deactivate account request schema"""
+    password: str = Field(..., min_length=8)
+    reason: Optional[str] = Field(None, max_length=500)
+
+
+class DeleteAccountRequest(BaseModel):
+    """Delete account request schema"""
+    password: str = Field(..., min_length=8)
+    confirmation: Literal["DELETE"]
+    reason: Optional[str] = Field(None, max_length=500)
+
+
+class UserSearchRequest(BaseModel):
+    """User search request schema"""
+    query: str = Field(..., min_length=1, max_length=100)
+    limit: int = Field(10, ge=1, le=100)
+
+
+class UserSearchResponse(ResponseModel):
+    """User search response schema"""
+    total: int
+    results: list[UserResponse]
+
+
+class UserActivityResponse(ResponseModel):
+    """User activity response schema"""
+    id: str
+    action: str
+    description: str
+    ip_address: str
+    user_agent: str
+    created_at: datetime
+
+
+class UserPreferencesResponse(ResponseModel):
+    """User preferences response schema"""
+    email_notifications: bool
+    push_notifications: bool
+    marketing_emails: bool
+    theme: str  # "light" or "dark"
+    language: str  # "en", "ar", etc.
+
+
+class UserPreferencesUpdate(BaseModel):
+    """User preferences update schema"""
+    email_notifications: Optional[bool] = None
+    push_notifications: Optional[bool] = None
+    marketing_emails: Optional[bool] = None
+    theme: Optional[str] = None
+    language: Optional[str] = None
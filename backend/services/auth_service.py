@@ -1,29 +1,58 @@
 """
 Authentication service
 """
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only
 from models import User, Session as SessionModel
 from schemas import LoginRequest, RegisterRequest, TokenResponse
 from utils.security import (
-    hash_password,
-    verify_password,
+    ahash_password,
+    averify_and_update_password,
     create_access_token,
-    create_refresh_token,
+    get_access_token_claims,
+    create_token_pair,
+    REFRESH_TOKEN_LIFETIME,
     verify_token,
+    parse_user_id,
 )
-from datetime import datetime, timedelta
+from utils.user_cache import invalidate_user, revoke_tokens
+from utils.count_cache import invalidate_count
+from cachetools import TTLCache
+from threading import Lock
+from datetime import datetime, timezone
 from config import settings
+import hashlib
 import logging
 from typing import Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+UTC = timezone.utc
+
+# Passwords that just failed for a user; an identical retry within the TTL
+# is rejected without another hashing round. Keyed by the stored hash too,
+# so a password change never matches an old entry.
+FAILED_LOGIN_TTL = 2
+_failed_logins: TTLCache = TTLCache(maxsize=10_000, ttl=FAILED_LOGIN_TTL)
+_failed_lock = Lock()
+_FINGERPRINT_KEY = hashlib.sha256(b"login-failure:" + settings.JWT_SECRET_KEY.encode()).digest()
+
+
+def _failed_login_key(user: User, password: str) -> tuple:
+    """Cache key for a (user, password) attempt; the password is never stored"""
+    fingerprint = hashlib.blake2b(
+        password.encode(), digest_size=16, key=_FINGERPRINT_KEY
+    ).digest()
+    return str(user.id), user.password_hash, fingerprint
+
 
 class AuthService:
     """Authentication service"""
 
     @staticmethod
-    def register(db: Session, request: RegisterRequest) -> Tuple[bool, str, Optional[User]]:
+    async def register(db: AsyncSession, request: RegisterRequest) -> Tuple[bool, str, Optional[User]]:
         """
         Register a new user
         """
@@ -31,32 +60,34 @@ class AuthService:
         if request.password != request.confirm_password:
             return False, "Passwords do not match", None
 
-        # Check if user already exists
-        existing_user = db.query(User).filter(User.email == request.email).first()
-        if existing_user:
-            return False, "User with this email already exists", None
-
+        # No existence pre-check: the unique email constraint rejects a
+        # duplicate on INSERT, saving a round trip on every registration
         try:
             # Create new user
             user = User(
                 email=request.email,
-                password_hash=hash_password(request.password),
+                password_hash=await ahash_password(request.password),
                 first_name=request.first_name,
                 last_name=request.last_name,
             )
             db.add(user)
-            db.commit()
-            db.refresh(user)
-            logger.info(f"User registered: {user.email}")
+            # The INSERT returns the server-generated id and client-side
+            # defaults are set at flush, so no refresh SELECT is needed
+            await db.commit()
+            invalidate_count("users")
+            logger.info("User registered: %s", user.email)
             return True, "User registered successfully", user
+        except IntegrityError:
+            await db.rollback()
+            return False, "User with this email already exists", None
         except Exception as e:
-            db.rollback()
-            logger.error(f"Error registering user: {e}")
+            await db.rollback()
+            logger.error("Error registering user: %s", e)
             return False, "Error registering user", None
 
     @staticmethod
-    def login(
-        db: Session,
+    async def login(
+        db: AsyncSession,
         request: LoginRequest,
         user_agent: Optional[str] = None,
         ip_address: Optional[str] = None,
@@ -64,57 +95,83 @@ class AuthService:
         """
         Login user
         """
-        # Find user by email
-        user = db.query(User).filter(User.email == request.email).first()
+        # Find user by email, loading only the columns idx_users_email_login
+        # covers; last_login_at is only written, which needs no load
+        user = await db.scalar(
+            select(User)
+            .options(
+                load_only(
+                    User.id,
+                    User.email,
+                    User.password_hash,
+                    User.is_active,
+                    User.is_admin,
+                    raiseload=True,
+                )
+            )
+            .where(User.email == request.email)
+        )
         if not user:
-            logger.warning(f"Login attempt with non-existent email: {request.email}")
+            logger.warning("Login attempt with non-existent email: %s", request.email)
             return False, "Invalid email or password", None
 
         # Check if user is active
         if not user.is_active:
-            logger.warning(f"Login attempt with inactive user: {user.email}")
+            logger.warning("Login attempt with inactive user: %s", user.email)
             return False, "User account is inactive", None
 
-        # Verify password
-        if not verify_password(request.password, user.password_hash):
-            logger.warning(f"Failed login attempt for user: {user.email}")
+        # Verify password (an identical recent failure skips hashing)
+        failure_key = _failed_login_key(user, request.password)
+        with _failed_lock:
+            recently_failed = failure_key in _failed_logins
+        valid, new_hash = (False, None) if recently_failed else await averify_and_update_password(
+            request.password, user.password_hash
+        )
+        if not valid:
+            with _failed_lock:
+                _failed_logins[failure_key] = True
+            logger.warning("Failed login attempt for user: %s", user.email)
             return False, "Invalid email or password", None
 
         try:
             # Create tokens
-            access_token = create_access_token({"sub": str(user.id)})
-            refresh_token = create_refresh_token({"sub": str(user.id)})
+            access_token, refresh_token = create_token_pair(user)
 
             # Create session
+            now = datetime.now(UTC)
             session = SessionModel(
                 user_id=user.id,
                 access_token=access_token,
                 refresh_token=refresh_token,
                 user_agent=user_agent,
                 ip_address=ip_address,
-                expires_at=datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+                expires_at=now + REFRESH_TOKEN_LIFETIME,
             )
             db.add(session)
 
-            # Update last login
-            user.last_login_at = datetime.utcnow()
-            db.commit()
-            db.refresh(user)
+            # Update last login; flushed with the session INSERT in one commit.
+            # Nothing below needs server-side values, so skip the refresh.
+            user.last_login_at = now
+            if new_hash:
+                # Upgrade a legacy (bcrypt) hash now that the password is known
+                user.password_hash = new_hash
+            await db.commit()
+            await invalidate_user(user.id)
 
-            logger.info(f"User logged in: {user.email}")
+            logger.info("User logged in: %s", user.email)
 
-            return True, "Login successful", TokenResponse(
+            return True, "Login successful", TokenResponse.model_construct(
                 access_token=access_token,
                 refresh_token=refresh_token,
                 expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
             )
         except Exception as e:
-            db.rollback()
-            logger.error(f"Error logging in user: {e}")
+            await db.rollback()
+            logger.error("Error logging in user: %s", e)
             return False, "Error logging in", None
 
     @staticmethod
-    def refresh_token(db: Session, refresh_token: str) -> Tuple[bool, str, Optional[TokenResponse]]:
+    async def refresh_token(db: AsyncSession, refresh_token: str) -> Tuple[bool, str, Optional[TokenResponse]]:
         """
         Refresh access token
         """
@@ -127,46 +184,68 @@ class AuthService:
         if payload.get("type") != "refresh":
             return False, "Invalid token type", None
 
-        # Get user
-        user_id = payload.get("sub")
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user:
+        user_id = parse_user_id(payload.get("sub"))
+        if user_id is None:
             return False, "User not found", None
 
+        # The token's session must still be active: logout, revoke-all and
+        # account deletion end it in the database, so a forced logout can't
+        # be undone by refreshing, on any worker and after the marker expires
+        user = await db.scalar(
+            select(User)
+            .options(load_only(User.id, User.email, User.is_active, User.is_admin, raiseload=True))
+            .join(SessionModel, SessionModel.user_id == User.id)
+            .where(
+                User.id == user_id,
+                SessionModel.refresh_token == refresh_token,
+                SessionModel.is_active == True,
+            )
+            .limit(1)
+        )
+        if not user:
+            return False, "Session has been revoked", None
+
+        if not user.is_active:
+            return False, "User account is inactive", None
+
         try:
             # Create new access token
-            new_access_token = create_access_token({"sub": str(user.id)})
+            new_access_token = create_access_token(get_access_token_claims(user), owned=True)
 
-            logger.info(f"Token refreshed for user: {user.email}")
+            logger.info("Token refreshed for user: %s", user.email)
 
-            return True, "Token refreshed successfully", TokenResponse(
+            return True, "Token refreshed successfully", TokenResponse.model_construct(
                 access_token=new_access_token,
                 refresh_token=refresh_token,
                 expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
             )
         except Exception as e:
-            logger.error(f"Error refreshing token: {e}")
+            logger.error("Error refreshing token: %s", e)
             return False, "Error refreshing token", None
 
     @staticmethod
-    def logout(db: Session, session_id: str) -> Tuple[bool, str]:
+    async def logout(db: AsyncSession, session_id: str) -> Tuple[bool, str]:
         """
         Logout user
         """
         try:
-            session = db.query(SessionModel).filter(SessionModel.id == session_id).first()
-            if session:
-                session.is_active = False
-                db.commit()
-                logger.info(f"User logged out: session {session_id}")
+            result = await db.execute(
+                update(SessionModel)
+                .where(SessionModel.id == session_id, SessionModel.is_active == True)
+                .values(is_active=False)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+            if result.rowcount:
+                logger.info("User logged out: session %s", session_id)
             return True, "Logged out successfully"
         except Exception as e:
-            db.rollback()
-            logger.error(f"Error logging out: {e}")
+            await db.rollback()
+            logger.error("Error logging out: %s", e)
             return False, "Error logging out"
 
     @staticmethod
-    def get_user_from_token(db: Session, token: str) -> Optional[User]:
+    async def get_user_from_token(db: AsyncSession, token: str) -> Optional[User]:
         """
         Get user from access token
         """
@@ -174,35 +253,56 @@ class AuthService:
         if payload is None:
             return None
 
-        user_id = payload.get("sub")
-        user = db.query(User).filter(User.id == user_id).first()
-        return user
+        user_id = parse_user_id(payload.get("sub"))
+        return await db.get(User, user_id) if user_id else None
 
     @staticmethod
-    def get_active_sessions(db: Session, user_id: str) -> list:
+    async def get_active_sessions(db: AsyncSession, user_id: str) -> list:
         """
         Get all active sessions for a user
+
+        Returns rows of the listed columns only; the stored tokens are
+        never needed here and are the bulk of each session row.
         """
-        sessions = (
-            db.query(SessionModel)
-            .filter(SessionModel.user_id == user_id, SessionModel.is_active == True)
-            .all()
+        result = await db.execute(
+            select(
+                SessionModel.id,
+                SessionModel.user_id,
+                SessionModel.user_agent,
+                SessionModel.ip_address,
+                SessionModel.is_active,
+                SessionModel.created_at,
+                SessionModel.expires_at,
+                SessionModel.last_used_at,
+            ).where(
+                SessionModel.user_id == user_id, SessionModel.is_active == True
+            )
         )
-        return sessions
+        return list(result.all())
 
     @staticmethod
-    def revoke_all_sessions(db: Session, user_id: str) -> Tuple[bool, str]:
+    async def revoke_all_sessions(db: AsyncSession, user_id: str) -> Tuple[bool, str]:
         """
         Revoke all sessions for a user
         """
         try:
-            db.query(SessionModel).filter(SessionModel.user_id == user_id).update(
-                {"is_active": False}
+            result = await db.execute(
+                update(SessionModel)
+                .where(
+                    SessionModel.user_id == user_id,
+                    SessionModel.is_active == True,
+                )
+                .values(is_active=False)
+                .execution_options(synchronize_session=False)
             )
-            db.commit()
-            logger.info(f"All sessions revoked for user: {user_id}")
+            await db.commit()
+            # Outstanding access tokens are revoked even without active sessions
+            await revoke_tokens(user_id)
+            if result.rowcount == 0:
+                return True, "No active sessions"
+            logger.info("All sessions revoked for user: %s", user_id)
             return True, "All sessions revoked"
         except Exception as e:
-            db.rollback()
-            logger.error(f"Error revoking sessions: {e}")
+            await db.rollback()
+            logger.error("Error revoking sessions: %s", e)
             return False, "Error revoking sessions"
@@ -3,35 +3,60 @@ Google Gemini API service for AI-powered code generation
 """
 import google.generativeai as genai
 from config import settings
-from typing import Optional, Tuple
+from typing import AsyncIterator, Optional, Tuple
 import logging
-import json
+import orjson
+import re
 
 logger = logging.getLogger(__name__)
 
+# A leading ```lang line and a trailing ``` around generated code
+_FENCE_RE = re.compile(r"\A\s*```[\w+-]*[^\S\n]*\n?|\n?```\s*\Z")
+# Trailing text that may be the start of a closing fence
+_FENCE_TAIL_RE = re.compile(r"\s*`{0,3}\s*\Z")
+
+
+def _strip_code_fences(text: str) -> str:
+    """Strip markdown code fences and surrounding whitespace"""
+    return _FENCE_RE.sub("", text).strip()
+
 
 class GeminiService:
     """Google Gemini API service for code generation"""
 
+    # Shared models; the SDK keeps one gRPC channel per process behind them
+    _model: Optional[genai.GenerativeModel] = None
+    _fast_model: Optional[genai.GenerativeModel] = None
+
     @staticmethod
     def initialize():
         """Initialize Gemini API"""
         if settings.GOOGLE_GEMINI_API_KEY:
             genai.configure(api_key=settings.GOOGLE_GEMINI_API_KEY)
+            GeminiService._model = genai.GenerativeModel(settings.GEMINI_MODEL)
+            GeminiService._fast_model = genai.GenerativeModel(settings.GEMINI_FAST_MODEL)
             logger.info("Gemini API initialized successfully")
         else:
             logger.warning("GOOGLE_GEMINI_API_KEY not set")
 
     @staticmethod
-    def generate_html_code(vibe_description: str) -> Tuple[bool, str, Optional[str]]:
-        """Generate HTML code based on vibe description"""
-        try:
-            if not settings.GOOGLE_GEMINI_API_KEY:
-                return False, "Gemini API key not configured", None
+    def get_model() -> genai.GenerativeModel:
+        """Get the shared model, initializing the API on first use"""
+        if GeminiService._model is None:
+            GeminiService.initialize()
+        return GeminiService._model
 
-            model = genai.GenerativeModel("gemini-pro")
+    @staticmethod
+    def get_fast_model() -> genai.GenerativeModel:
+        """Get the shared fast model used for CSS and code optimization"""
+        if GeminiService._fast_model is None:
+            GeminiService.initialize()
+        return GeminiService._fast_model
 
-            prompt = f"""You are an expert web developer. Based on the following vibe description, generate a complete, modern HTML website with embedded CSS and JavaScript.
+    @staticmethod
+    def _html_prompt(vibe_description: str) -> str:
+        """Build the HTML generation prompt"""
+        return f"""You are an expert web developer. Based on the following vibe description, generate a complete, modern HTML website with embedded CSS and JavaScript.
 
 Vibe Description:
 {vibe_description}
@@ -50,34 +75,15 @@ Requirements:
 
 Please generate only the HTML code, no explanations. Start with <!DOCTYPE html> and end with </html>."""
 
-            response = model.generate_content(prompt)
-            generated_code = response.text
-
-            # Clean up the response if it contains markdown code blocks
-            if generated_code.startswith("```html"):
-                generated_code = generated_code[7:]
-            if generated_code.endswith("```"):
-                generated_code = generated_code[:-3]
-
-            generated_code = generated_code.strip()
-
-            logger.info("HTML code generated successfully")
-            return True, "HTML code generated successfully", generated_code
-
-        except Exception as e:
-            logger.error(f"Error generating HTML code: {e}")
-            return False, f"Error generating code: {str(e)}", None
-
     @staticmethod
-    def generate_react_code(vibe_description: str) -> Tuple[bool, str, Optional[str]]:
-        """Generate React component code based on vibe description"""
-        try:
-            if not settings.GOOGLE_GEMINI_API_KEY:
-                return False, "Gemini API key not configured", None
-
-            model = genai.GenerativeModel("gemini-pro")
+    def clean_html_code(generated_code: str) -> str:
+        """Strip markdown fences from generated HTML"""
+        return _strip_code_fences(generated_code)
 
-            prompt = f"""You are an expert React developer. Based on the following vibe description, generate a complete React component with Tailwind CSS.
+    @staticmethod
+    def _react_prompt(vibe_description: str) -> str:
+        """Build the React generation prompt"""
+        return f"""You are an expert React developer. Based on the following vibe description, generate a complete React component with Tailwind CSS.
 
 Vibe Description:
 {vibe_description}
@@ -96,36 +102,117 @@ Requirements:
 
 Please generate only the React component code. Use TypeScript. Include the necessary imports."""
 
-            response = model.generate_content(prompt)
-            generated_code = response.text
+    @staticmethod
+    def clean_react_code(generated_code: str) -> str:
+        """Strip markdown fences from generated React code"""
+        return _strip_code_fences(generated_code)
 
-            # Clean up the response if it contains markdown code blocks
-            if generated_code.startswith("```typescript") or generated_code.startswith("```tsx"):
-                generated_code = generated_code.split("\n", 1)[1]
-            if generated_code.startswith("```jsx") or generated_code.startswith("```javascript"):
-                generated_code = generated_code.split("\n", 1)[1]
-            if generated_code.endswith("```"):
-                generated_code = generated_code[:-3]
+    @staticmethod
+    async def agenerate_html_code(vibe_description: str) -> Tuple[bool, str, Optional[str]]:
+        """Generate HTML code without blocking the event loop"""
+        try:
+            if not settings.GOOGLE_GEMINI_API_KEY:
+                return False, "Gemini API key not configured", None
 
-            generated_code = generated_code.strip()
+            model = GeminiService.get_model()
+            response = await model.generate_content_async(
+                GeminiService._html_prompt(vibe_description)
+            )
+            generated_code = GeminiService.clean_html_code(response.text)
 
-            logger.info("React code generated successfully")
-            return True, "React code generated successfully", generated_code
+            logger.info("HTML code generated successfully")
+            return True, "HTML code generated successfully", generated_code
 
         except Exception as e:
-            logger.error(f"Error generating React code: {e}")
+            logger.error("Error generating HTML code: %s", e)
             return False, f"Error generating code: {str(e)}", None
 
     @staticmethod
-    def generate_project_structure(vibe_description: str) -> Tuple[bool, str, Optional[dict]]:
-        """Generate project structure and components based on vibe description"""
+    async def agenerate_react_code(vibe_description: str) -> Tuple[bool, str, Optional[str]]:
+        """Generate React component code without blocking the event loop"""
         try:
             if not settings.GOOGLE_GEMINI_API_KEY:
                 return False, "Gemini API key not configured", None
 
-            model = genai.GenerativeModel("gemini-pro")
+            model = GeminiService.get_model()
+            response = await model.generate_content_async(
+                GeminiService._react_prompt(vibe_description)
+            )
+            generated_code = GeminiService.clean_react_code(response.text)
+
+            logger.info("React code generated successfully")
+            return True, "React code generated successfully", generated_code
+
+        except Exception as e:
+            logger.error("Error generating React code: %s", e)
+            return False, f"Error generating code: {str(e)}", None
+
+    @staticmethod
+    async def _strip_fences(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+        """
+        Drop a leading ```lang line and a trailing ``` from streamed text
+
+        Only the first line and a possible closing fence are ever held back,
+        so the rest of the code is passed through as it arrives.
+        """
+        head = ""
+        started = False
+        tail = ""
+        async for text in chunks:
+            if not started:
+                # Leading whitespace is dropped, as in the non-streaming path
+                head = (head + text).lstrip()
+                if head.startswith("```"):
+                    if "\n" not in head:
+                        continue
+                    head = head.split("\n", 1)[1]
+                elif "```".startswith(head):
+                    continue
+                text, head, started = head, "", True
+
+            pending = tail + text
+            # Hold back anything that could still turn out to be a closing fence
+            keep = _FENCE_TAIL_RE.search(pending).start()
+            if keep > 0:
+                yield pending[:keep]
+                tail = pending[keep:]
+            else:
+                tail = pending
+
+        tail = (tail + head).rstrip()
+        if tail.endswith("```"):
+            tail = tail[:-3].rstrip()
+        if tail:
+            yield tail
+
+    @staticmethod
+    async def _stream(prompt: str) -> AsyncIterator[str]:
+        """Stream text chunks as Gemini produces them"""
+        model = GeminiService.get_model()
+        if model is None:
+            raise RuntimeError("Gemini API key not configured")
+        response = await model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            yield chunk.text
+
+    @staticmethod
+    def stream_html_code(vibe_description: str) -> AsyncIterator[str]:
+        """Stream HTML code chunks, without markdown fences"""
+        return GeminiService._strip_fences(
+            GeminiService._stream(GeminiService._html_prompt(vibe_description))
+        )
 
-            prompt = f"""You are an expert web architect. Based on the following vibe description, generate a project structure and component breakdown.
+    @staticmethod
+    def stream_react_code(vibe_description: str) -> AsyncIterator[str]:
+        """Stream React component code chunks, without markdown fences"""
+        return GeminiService._strip_fences(
+            GeminiService._stream(GeminiService._react_prompt(vibe_description))
+        )
+
+    @staticmethod
+    def _structure_prompt(vibe_description: str) -> str:
+        """Build the project structure prompt"""
+        return f"""You are an expert web architect. Based on the following vibe description, generate a project structure and component breakdown.
 
 Vibe Description:
 {vibe_description}
@@ -155,40 +242,46 @@ Format the response as JSON with the following structure:
   "compatibility": [...]
 }}"""
 
-            response = model.generate_content(prompt)
-            response_text = response.text
-
-            # Clean up the response if it contains markdown code blocks
-            if response_text.startswith("```json"):
-                response_text = response_text[7:]
-            if response_text.endswith("```"):
-                response_text = response_text[:-3]
+    @staticmethod
+    def parse_project_structure(response_text: str) -> dict:
+        """Parse generated project structure JSON, stripping markdown fences"""
+        text = _strip_code_fences(response_text)
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            # The model sometimes wraps the object in prose; keep the outer braces
+            start, end = text.find("{"), text.rfind("}")
+            if start < 0 or end < start:
+                raise
+            return orjson.loads(text[start:end + 1])
 
-            response_text = response_text.strip()
+    @staticmethod
+    async def agenerate_project_structure(vibe_description: str) -> Tuple[bool, str, Optional[dict]]:
+        """Generate project structure without blocking the event loop"""
+        try:
+            if not settings.GOOGLE_GEMINI_API_KEY:
+                return False, "Gemini API key not configured", None
 
-            # Parse JSON
-            structure = json.loads(response_text)
+            model = GeminiService.get_model()
+            response = await model.generate_content_async(
+                GeminiService._structure_prompt(vibe_description)
+            )
+            structure = GeminiService.parse_project_structure(response.text)
 
             logger.info("Project structure generated successfully")
             return True, "Project structure generated successfully", structure
 
-        except json.JSONDecodeError as e:
-            logger.error(f"Error parsing JSON response: {e}")
+        except orjson.JSONDecodeError as e:
+            logger.error("Error parsing JSON response: %s", e)
             return False, "Error parsing generated structure", None
         except Exception as e:
-            logger.error(f"Error generating project structure: {e}")
+            logger.error("Error generating project structure: %s", e)
             return False, f"Error generating structure: {str(e)}", None
 
     @staticmethod
-    def optimize_code(code: str, language: str = "html") -> Tuple[bool, str, Optional[str]]:
-        """Optimize generated code for performance and best practices"""
-        try:
-            if not settings.GOOGLE_GEMINI_API_KEY:
-                return False, "Gemini API key not configured", None
-
-            model = genai.GenerativeModel("gemini-pro")
-
-            prompt = f"""You are an expert code optimizer. Optimize the following {language} code for:
+    def _optimize_prompt(code: str, language: str) -> str:
+        """Build the code optimization prompt"""
+        return f"""You are an expert code optimizer. Optimize the following {language} code for:
 1. Performance
 2. Best practices
 3. Accessibility
@@ -202,34 +295,35 @@ Code:
 
 Please provide only the optimized code, no explanations."""
 
-            response = model.generate_content(prompt)
-            optimized_code = response.text
+    @staticmethod
+    def clean_optimized_code(optimized_code: str) -> str:
+        """Strip markdown fences from optimized code"""
+        return _strip_code_fences(optimized_code)
 
-            # Clean up the response if it contains markdown code blocks
-            if optimized_code.startswith(f"```{language}"):
-                optimized_code = optimized_code.split("\n", 1)[1]
-            if optimized_code.endswith("```"):
-                optimized_code = optimized_code[:-3]
+    @staticmethod
+    async def aoptimize_code(code: str, language: str = "html") -> Tuple[bool, str, Optional[str]]:
+        """Optimize code without blocking the event loop"""
+        try:
+            if not settings.GOOGLE_GEMINI_API_KEY:
+                return False, "Gemini API key not configured", None
 
-            optimized_code = optimized_code.strip()
+            model = GeminiService.get_fast_model()
+            response = await model.generate_content_async(
+                GeminiService._optimize_prompt(code, language)
+            )
+            optimized_code = GeminiService.clean_optimized_code(response.text)
 
             logger.info("Code optimized successfully")
             return True, "Code optimized successfully", optimized_code
 
         except Exception as e:
-            logger.error(f"Error optimizing code: {e}")
+            logger.error("Error optimizing code: %s", e)
             return False, f"Error optimizing code: {str(e)}", None
 
     @staticmethod
-    def generate_css_from_vibe(vibe_description: str) -> Tuple[bool, str, Optional[str]]:
-        """Generate CSS based on vibe description"""
-        try:
-            if not settings.GOOGLE_GEMINI_API_KEY:
-                return False, "Gemini API key not configured", None
-
-            model = genai.GenerativeModel("gemini-pro")
-
-            prompt = f"""You are an expert CSS designer. Based on the following vibe description, generate modern CSS that captures the essence of the design.
+    def _css_prompt(vibe_description: str) -> str:
+        """Build the CSS generation prompt"""
+        return f"""You are an expert CSS designer. Based on the following vibe description, generate modern CSS that captures the essence of the design.
 
 Vibe Description:
 {vibe_description}
@@ -246,20 +340,27 @@ Requirements:
 
 Please generate only the CSS code, no explanations. Start with /* CSS */ or directly with selectors."""
 
-            response = model.generate_content(prompt)
-            generated_css = response.text
+    @staticmethod
+    def clean_css_code(generated_css: str) -> str:
+        """Strip markdown fences from generated CSS"""
+        return _strip_code_fences(generated_css)
 
-            # Clean up the response if it contains markdown code blocks
-            if generated_css.startswith("```css"):
-                generated_css = generated_css[6:]
-            if generated_css.endswith("```"):
-                generated_css = generated_css[:-3]
+    @staticmethod
+    async def agenerate_css_from_vibe(vibe_description: str) -> Tuple[bool, str, Optional[str]]:
+        """Generate CSS without blocking the event loop"""
+        try:
+            if not settings.GOOGLE_GEMINI_API_KEY:
+                return False, "Gemini API key not configured", None
 
-            generated_css = generated_css.strip()
+            model = GeminiService.get_fast_model()
+            response = await model.generate_content_async(
+                GeminiService._css_prompt(vibe_description)
+            )
+            generated_css = GeminiService.clean_css_code(response.text)
 
             logger.info("CSS generated successfully")
             return True, "CSS generated successfully", generated_css
 
         except Exception as e:
-            logger.error(f"Error generating CSS: {e}")
+            logger.error("Error generating CSS: %s", e)
             return False, f"Error generating CSS: {str(e)}", None
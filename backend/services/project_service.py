@@ -1,30 +1,33 @@
 """
 Project service for project management
 """
-from sqlalchemy.orm import Session
+from sqlalchemy import select, insert, update, delete, func, literal, tuple_, false
+from sqlalchemy.ext.asyncio import AsyncSession
 from models import Project, User
 from schemas import ProjectCreate, ProjectUpdate
-from typing import Optional, Tuple, List
+from utils.count_cache import cached_count, invalidate_count
+from typing import Any, Dict, Optional, Tuple, List
+from uuid import UUID
 import logging
-from datetime import datetime
-import uuid
+from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 
+UTC = timezone.utc
+
 
 class ProjectService:
     """Project service"""
 
     @staticmethod
-    def create_project(
-        db: Session,
+    async def create_project(
+        db: AsyncSession,
         user_id: str,
         project_data: ProjectCreate,
     ) -> Tuple[bool, str, Optional[Project]]:
         """Create a new project"""
         try:
             project = Project(
-                id=str(uuid.uuid4()),
                 user_id=user_id,
                 name=project_data.name,
                 description=project_data.description,
@@ -32,190 +35,354 @@ class ProjectService:
                 status="draft",
             )
             db.add(project)
-            db.commit()
-            db.refresh(project)
-            logger.info(f"Project created: {project.id} by user {user_id}")
+            # The INSERT returns the server-generated id; no refresh needed
+            await db.commit()
+            invalidate_count(f"projects:{user_id}")
+            logger.info("Project created: %s by user %s", project.id, user_id)
             return True, "Project created successfully", project
         except Exception as e:
-            db.rollback()
-            logger.error(f"Error creating project: {e}")
+            await db.rollback()
+            logger.error("Error creating project: %s", e)
             return False, "Error creating project", None
 
     @staticmethod
-    def get_project_by_id(db: Session, project_id: str) -> Optional[Project]:
+    def _parse_id(project_id: str) -> Optional[UUID]:
+        """Parse a project ID, or None when it isn't a UUID"""
+        try:
+            return project_id if isinstance(project_id, UUID) else UUID(project_id)
+        except ValueError:
+            return None
+
+    @staticmethod
+    async def get_project_by_id(db: AsyncSession, project_id: str) -> Optional[Project]:
         """Get project by ID"""
-        return db.query(Project).filter(Project.id == project_id).first()
+        key = ProjectService._parse_id(project_id)
+        return await db.get(Project, key) if key else None
+
+    @staticmethod
+    def _authorized(project_id: str, user_id: str, is_admin: bool) -> list:
+        """WHERE clauses matching a project the user owns (any project for admins)"""
+        key = ProjectService._parse_id(project_id)
+        # A malformed ID matches nothing rather than failing in the driver
+        clauses = [Project.id == key if key else false()]
+        if not is_admin:
+            clauses.append(Project.user_id == user_id)
+        return clauses
 
     @staticmethod
-    def get_user_projects(
-        db: Session,
+    async def _missing_reason(db: AsyncSession, project_id: str) -> str:
+        """Explain why an authorized statement matched no row"""
+        key = ProjectService._parse_id(project_id)
+        if key is None:
+            return "Project not found"
+        exists = await db.scalar(select(Project.id).where(Project.id == key))
+        return "Unauthorized" if exists else "Project not found"
+
+    @staticmethod
+    async def get_project_authorized(
+        db: AsyncSession,
+        project_id: str,
+        user_id: str,
+        is_admin: bool,
+    ) -> Tuple[bool, str, Optional[Project]]:
+        """Get a project the user may access, checking ownership in the query"""
+        project = await db.scalar(
+            select(Project).where(*ProjectService._authorized(project_id, user_id, is_admin))
+        )
+        if project is None:
+            return False, await ProjectService._missing_reason(db, project_id), None
+        return True, "Project retrieved successfully", project
+
+    @staticmethod
+    async def get_project_updated_at(
+        db: AsyncSession,
+        project_id: str,
+        user_id: str,
+        is_admin: bool,
+    ) -> Tuple[bool, str, Optional[datetime]]:
+        """Get only the updated_at of a project the user may access (for ETags)"""
+        updated_at = await db.scalar(
+            select(Project.updated_at).where(
+                *ProjectService._authorized(project_id, user_id, is_admin)
+            )
+        )
+        if updated_at is None:
+            return False, await ProjectService._missing_reason(db, project_id), None
+        return True, "Project retrieved successfully", updated_at
+
+    @staticmethod
+    async def update_project_authorized(
+        db: AsyncSession,
+        project_id: str,
+        user_id: str,
+        is_admin: bool,
+        patch: Dict[str, Any],
+    ) -> Tuple[bool, str, Optional[Project]]:
+        """
+        Update a project the user may modify in one UPDATE ... RETURNING
+
+        Ownership is checked in the WHERE clause; only a miss costs a second query.
+        """
+        try:
+            project = await db.scalar(
+                update(Project)
+                .where(*ProjectService._authorized(project_id, user_id, is_admin))
+                .values(**patch, updated_at=datetime.now(UTC))
+                .returning(Project)
+            )
+            if project is None:
+                await db.rollback()
+                return False, await ProjectService._missing_reason(db, project_id), None
+
+            await db.commit()
+            return True, "Project updated successfully", project
+        except Exception as e:
+            await db.rollback()
+            logger.error("Error updating project: %s", e)
+            return False, "Error updating project", None
+
+    @staticmethod
+    async def get_user_projects(
+        db: AsyncSession,
         user_id: str,
         skip: int = 0,
         limit: int = 50,
+        after: Optional[Tuple[datetime, UUID]] = None,
     ) -> List[Project]:
-        """Get all projects for a user"""
-        return (
-            db.query(Project)
-            .filter(Project.user_id == user_id)
+        """Get a page of a user's projects, newest first, by offset or by cursor"""
+        if after is not None:
+            return await ProjectService.get_user_projects_after(db, user_id, after, limit)
+
+        # Same order as idx_projects_user_created, so the page is read off the index
+        result = await db.scalars(
+            select(Project)
+            .where(Project.user_id == user_id)
+            .order_by(Project.created_at.desc(), Project.id.desc())
+            .offset(skip)
+            .limit(limit)
+        )
+        return list(result.all())
+
+    @staticmethod
+    async def get_user_projects_with_count(
+        db: AsyncSession,
+        user_id: str,
+        skip: int = 0,
+        limit: int = 50,
+    ) -> Tuple[List[Project], int]:
+        """Get a page of a user's projects and their total count in one query"""
+        result = await db.execute(
+            select(Project, func.count().over().label("total"))
+            .where(Project.user_id == user_id)
+            .order_by(Project.created_at.desc(), Project.id.desc())
             .offset(skip)
             .limit(limit)
-            .all()
         )
+        rows = result.all()
+        if not rows:
+            # Past the last page the window has no rows to report the total on
+            return [], await ProjectService.count_user_projects(db, user_id) if skip else 0
+        return [row.Project for row in rows], rows[0].total
+
+    @staticmethod
+    async def get_user_projects_after(
+        db: AsyncSession,
+        user_id: str,
+        after: Tuple[datetime, UUID],
+        limit: int = 50,
+    ) -> List[Project]:
+        """Get the user's projects following a (created_at, id) cursor, newest first"""
+        result = await db.scalars(
+            select(Project)
+            .where(
+                Project.user_id == user_id,
+                tuple_(Project.created_at, Project.id) < tuple_(*after),
+            )
+            .order_by(Project.created_at.desc(), Project.id.desc())
+            .limit(limit)
+        )
+        return list(result.all())
 
     @staticmethod
-    def update_project(
-        db: Session,
+    async def update_project(
+        db: AsyncSession,
         project_id: str,
+        user_id: str,
+        is_admin: bool,
         update_data: ProjectUpdate,
     ) -> Tuple[bool, str, Optional[Project]]:
         """Update project"""
-        try:
-            project = ProjectService.get_project_by_id(db, project_id)
-            if not project:
-                return False, "Project not found", None
-
-            update_dict = update_data.dict(exclude_unset=True)
-            for key, value in update_dict.items():
-                setattr(project, key, value)
-
-            project.updated_at = datetime.utcnow()
-            db.commit()
-            db.refresh(project)
-            logger.info(f"Project updated: {project.id}")
-            return True, "Project updated successfully", project
-        except Exception as e:
-            db.rollback()
-            logger.error(f"Error updating project: {e}")
-            return False, "Error updating project", None
+        success, message, project = await ProjectService.update_project_authorized(
+            db, project_id, user_id, is_admin, update_data.model_dump(exclude_unset=True)
+        )
+        if success:
+            logger.info("Project updated: %s", project_id)
+        return success, message, project
 
     @staticmethod
-    def delete_project(db: Session, project_id: str) -> Tuple[bool, str]:
+    async def delete_project(
+        db: AsyncSession,
+        project_id: str,
+        user_id: str,
+        is_admin: bool,
+    ) -> Tuple[bool, str]:
         """Delete project"""
         try:
-            project = ProjectService.get_project_by_id(db, project_id)
-            if not project:
-                return False, "Project not found"
+            owner_id = await db.scalar(
+                delete(Project)
+                .where(*ProjectService._authorized(project_id, user_id, is_admin))
+                .returning(Project.user_id)
+            )
+            if owner_id is None:
+                await db.rollback()
+                return False, await ProjectService._missing_reason(db, project_id)
 
-            db.delete(project)
-            db.commit()
-            logger.info(f"Project deleted: {project_id}")
+            await db.commit()
+            invalidate_count(f"projects:{owner_id}")
+            logger.info("Project deleted: %s", project_id)
             return True, "Project deleted successfully"
         except Exception as e:
-            db.rollback()
-            logger.error(f"Error deleting project: {e}")
+            await db.rollback()
+            logger.error("Error deleting project: %s", e)
             return False, "Error deleting project"
 
     @staticmethod
-    def generate_project_code(
-        db: Session,
+    async def generate_project_code(
+        db: AsyncSession,
         project_id: str,
+        user_id: str,
+        is_admin: bool,
         vibe_description: str,
     ) -> Tuple[bool, str, Optional[str]]:
         """Generate project code using AI"""
-        try:
-            project = ProjectService.get_project_by_id(db, project_id)
-            if not project:
-                return False, "Project not found", None
+        # TODO: Integrate with Google Gemini API
+        # For now, return a placeholder
+        generated_code = f"<!-- Generated code for: {vibe_description} -->"
 
-            # TODO: Integrate with Google Gemini API
-            # For now, return a placeholder
-            generated_code = f"<!-- Generated code for: {vibe_description} -->"
-
-            project.generated_code = generated_code
-            project.status = "generated"
-            project.updated_at = datetime.utcnow()
-            db.commit()
-            db.refresh(project)
-            logger.info(f"Code generated for project: {project_id}")
-            return True, "Code generated successfully", generated_code
-        except Exception as e:
-            db.rollback()
-            logger.error(f"Error generating code: {e}")
-            return False, "Error generating code", None
+        success, message, _ = await ProjectService.update_project_authorized(
+            db,
+            project_id,
+            user_id,
+            is_admin,
+            {"generated_code": generated_code, "status": "generated"},
+        )
+        if not success:
+            return False, message, None
+
+        logger.info("Code generated for project: %s", project_id)
+        return True, "Code generated successfully", generated_code
 
     @staticmethod
-    def publish_project(db: Session, project_id: str) -> Tuple[bool, str]:
+    async def publish_project(
+        db: AsyncSession,
+        project_id: str,
+        user_id: str,
+        is_admin: bool,
+    ) -> Tuple[bool, str, Optional[Project]]:
         """Publish project"""
-        try:
-            project = ProjectService.get_project_by_id(db, project_id)
-            if not project:
-                return False, "Project not found"
-
-            project.status = "published"
-            project.published_at = datetime.utcnow()
-            project.updated_at = datetime.utcnow()
-            db.commit()
-            logger.info(f"Project published: {project_id}")
-            return True, "Project published successfully"
-        except Exception as e:
-            db.rollback()
-            logger.error(f"Error publishing project: {e}")
-            return False, "Error publishing project"
+        success, message, project = await ProjectService.update_project_authorized(
+            db,
+            project_id,
+            user_id,
+            is_admin,
+            {"status": "published", "published_at": datetime.now(UTC)},
+        )
+        if not success:
+            return False, message, None
+
+        logger.info("Project published: %s", project_id)
+        return True, "Project published successfully", project
 
     @staticmethod
-    def archive_project(db: Session, project_id: str) -> Tuple[bool, str]:
+    async def archive_project(
+        db: AsyncSession,
+        project_id: str,
+        user_id: str,
+        is_admin: bool,
+    ) -> Tuple[bool, str]:
         """Archive project"""
-        try:
-            project = ProjectService.get_project_by_id(db, project_id)
-            if not project:
-                return False, "Project not found"
+        success, message, _ = await ProjectService.update_project_authorized(
+            db, project_id, user_id, is_admin, {"status": "archived"}
+        )
+        if not success:
+            return False, message
 
-            project.status = "archived"
-            project.updated_at = datetime.utcnow()
-            db.commit()
-            logger.info(f"Project archived: {project_id}")
-            return True, "Project archived successfully"
-        except Exception as e:
-            db.rollback()
-            logger.error(f"Error archiving project: {e}")
-            return False, "Error archiving project"
+        logger.info("Project archived: %s", project_id)
+        return True, "Project archived successfully"
 
     @staticmethod
-    def count_user_projects(db: Session, user_id: str) -> int:
-        """Count projects for a user"""
-        return db.query(Project).filter(Project.user_id == user_id).count()
+    async def count_user_projects(db: AsyncSession, user_id: str) -> int:
+        """Count projects for a user (cached briefly; writes here invalidate it)"""
+        return await cached_count(
+            f"projects:{user_id}",
+            lambda: db.scalar(
+                select(func.count()).select_from(Project).where(Project.user_id == user_id)
+            ),
+        )
 
     @staticmethod
-    def get_project_by_slug(db: Session, slug: str) -> Optional[Project]:
+    async def get_project_by_slug(db: AsyncSession, slug: str) -> Optional[Project]:
         """Get project by slug"""
-        return db.query(Project).filter(Project.slug == slug).first()
+        return await db.scalar(select(Project).where(Project.slug == slug))
 
     @staticmethod
-    def duplicate_project(
-        db: Session,
+    async def duplicate_project(
+        db: AsyncSession,
         project_id: str,
         user_id: str,
+        is_admin: bool = False,
     ) -> Tuple[bool, str, Optional[Project]]:
-        """Duplicate a project"""
+        """
+        Duplicate a project the user may access with one INSERT ... SELECT
+
+        Ownership is checked in the SELECT, and the generated code is copied
+        inside the database without passing through the application.
+        """
         try:
-            original_project = ProjectService.get_project_by_id(db, project_id)
-            if not original_project:
-                return False, "Project not found", None
+            source = select(
+                literal(user_id, Project.user_id.type),
+                Project.name + " (Copy)",
+                Project.description,
+                Project.vibe_description,
+                Project.generated_code,
+                Project.language,
+            ).where(*ProjectService._authorized(project_id, user_id, is_admin))
 
-            new_project = Project(
-                id=str(uuid.uuid4()),
-                user_id=user_id,
-                name=f"{original_project.name} (Copy)",
-                description=original_project.description,
-                vibe_description=original_project.vibe_description,
-                generated_code=original_project.generated_code,
-                status="draft",
+            # Omitted columns (id, status, counters, flags, timestamps) get
+            # their server and model defaults, as for a new project
+            new_project = await db.scalar(
+                insert(Project)
+                .from_select(
+                    [
+                        Project.user_id,
+                        Project.name,
+                        Project.description,
+                        Project.vibe_description,
+                        Project.generated_code,
+                        Project.language,
+                    ],
+                    source,
+                )
+                .returning(Project)
             )
-            db.add(new_project)
-            db.commit()
-            db.refresh(new_project)
-            logger.info(f"Project duplicated: {project_id} -> {new_project.id}")
+            if new_project is None:
+                await db.rollback()
+                return False, await ProjectService._missing_reason(db, project_id), None
+
+            await db.commit()
+            invalidate_count(f"projects:{user_id}")
+            logger.info("Project duplicated: %s -> %s", project_id, new_project.id)
             return True, "Project duplicated successfully", new_project
         except Exception as e:
-            db.rollback()
-            logger.error(f"Error duplicating project: {e}")
+            await db.rollback()
+            logger.error("Error duplicating project: %s", e)
             return False, "Error duplicating project", None
 
     @staticmethod
-    def export_project(db: Session, project_id: str) -> Tuple[bool, str, Optional[dict]]:
+    async def export_project(db: AsyncSession, project_id: str) -> Tuple[bool, str, Optional[dict]]:
         """Export project as JSON"""
         try:
-            project = ProjectService.get_project_by_id(db, project_id)
+            project = await ProjectService.get_project_by_id(db, project_id)
             if not project:
                 return False, "Project not found", None
 
@@ -229,8 +396,8 @@ class ProjectService:
                 "created_at": project.created_at.isoformat(),
                 "updated_at": project.updated_at.isoformat(),
             }
-            logger.info(f"Project exported: {project_id}")
+            logger.info("Project exported: %s", project_id)
             return True, "Project exported successfully", export_data
         except Exception as e:
-            logger.error(f"Error exporting project: {e}")
+            logger.error("Error exporting project: %s", e)
             return False, "Error exporting project", None
@@ -1,219 +1,332 @@
 """
 User service for user management
 """
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from models import User
 from schemas import UserUpdate, UserCreate
-from utils.security import hash_password, verify_password
+from utils.security import ahash_password, averify_password
+from utils.user_cache import invalidate_user, revoke_tokens
+from utils.count_cache import cached_count, invalidate_count
 from typing import Optional, Tuple, List
+from uuid import UUID
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 
+UTC = timezone.utc
+
 
 class UserService:
     """User service"""
 
     @staticmethod
-    def get_user_by_id(db: Session, user_id: str) -> Optional[User]:
-        """Get user by ID"""
-        return db.query(User).filter(User.id == user_id).first()
+    async def get_user_by_id(db: AsyncSession, user_id: str) -> Optional[User]:
+        """Get user by ID, from the session's identity map when already loaded"""
+        try:
+            key = user_id if isinstance(user_id, UUID) else UUID(user_id)
+        except ValueError:
+            return None
+        return await db.get(User, key)
 
     @staticmethod
-    def get_user_by_email(db: Session, email: str) -> Optional[User]:
+    async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
         """Get user by email"""
-        return db.query(User).filter(User.email == email).first()
+        return await db.scalar(select(User).where(User.email == email))
+
+    @staticmethod
+    async def get_all_users(
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+        after: Optional[Tuple[datetime, UUID]] = None,
+    ) -> List[User]:
+        """Get a page of users, newest first, by offset or by cursor"""
+        if after is not None:
+            return await UserService.get_users_after(db, after, limit)
+
+        # Same order as idx_users_created, so the page is read off the index
+        result = await db.scalars(
+            select(User)
+            .order_by(User.created_at.desc(), User.id.desc())
+            .offset(skip)
+            .limit(limit)
+        )
+        return list(result.all())
+
+    @staticmethod
+    async def get_all_users_with_count(
+        db: AsyncSession,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> Tuple[List[User], int]:
+        """Get a page of users and the total count in one query"""
+        result = await db.execute(
+            select(User, func.count().over().label("total"))
+            .order_by(User.created_at.desc(), User.id.desc())
+            .offset(skip)
+            .limit(limit)
+        )
+        rows = result.all()
+        if not rows:
+            # Past the last page the window has no rows to report the total on
+            return [], await UserService.count_users(db) if skip else 0
+        return [row.User for row in rows], rows[0].total
 
     @staticmethod
-    def get_all_users(db: Session, skip: int = 0, limit: int = 100) -> List[User]:
-        """Get all users with pagination"""
-        return db.query(User).offset(skip).limit(limit).all()
+    async def get_users_after(
+        db: AsyncSession,
+        after: Tuple[datetime, UUID],
+        limit: int = 100,
+    ) -> List[User]:
+        """Get users following a (created_at, id) cursor, newest first"""
+        result = await db.scalars(
+            select(User)
+            .where(tuple_(User.created_at, User.id) < tuple_(*after))
+            .order_by(User.created_at.desc(), User.id.desc())
+            .limit(limit)
+        )
+        return list(result.all())
 
     @staticmethod
-    def update_user(
-        db: Session,
+    async def update_user(
+        db: AsyncSession,
         user_id: str,
         update_data: UserUpdate,
     ) -> Tuple[bool, str, Optional[User]]:
-        """Update user information"""
+        """Update user information in one UPDATE ... RETURNING"""
+        # The schema's fields are flat scalars, so the set fields are read
+        # directly instead of serializing the model with model_dump()
+        values = {key: getattr(update_data, key) for key in update_data.model_fields_set}
         try:
-            user = UserService.get_user_by_id(db, user_id)
-            if not user:
+            user = await db.scalar(
+                update(User)
+                .where(User.id == user_id)
+                .values(**values, updated_at=datetime.now(UTC))
+                .returning(User)
+            )
+            if user is None:
+                await db.rollback()
                 return False, "User not found", None
 
-            # Update fields
-            update_dict = update_data.dict(exclude_unset=True)
-            for key, value in update_dict.items():
-                setattr(user, key, value)
-
-            user.updated_at = datetime.utcnow()
-            db.commit()
-            db.refresh(user)
-            logger.info(f"User updated: {user.email}")
+            await db.commit()
+            await invalidate_user(user_id)
+            logger.info("User updated: %s", user.email)
             return True, "User updated successfully", user
         except Exception as e:
-            db.rollback()
-            logger.error(f"Error updating user: {e}")
+            await db.rollback()
+            logger.error("Error updating user: %s", e)
             return False, "Error updating user", None
 
     @staticmethod
-    def change_password(
-        db: Session,
+    async def _set_user_fields(db: AsyncSession, user_id: str, **values) -> Optional[str]:
+        """
+        Set columns on one user in a single UPDATE ... RETURNING and commit
+
+        Returns the user's email for logging, or None (rolled back) if no row matched.
+        """
+        try:
+            key = user_id if isinstance(user_id, UUID) else UUID(user_id)
+        except ValueError:
+            return None
+        email = await db.scalar(
+            update(User)
+            .where(User.id == key)
+            .values(**values, updated_at=datetime.now(UTC))
+            .returning(User.email)
+        )
+        if email is None:
+            await db.rollback()
+            return None
+        await db.commit()
+        return email
+
+    @staticmethod
+    async def change_password(
+        db: AsyncSession,
         user_id: str,
         old_password: str,
         new_password: str,
     ) -> Tuple[bool, str]:
         """Change user password"""
         try:
-            user = UserService.get_user_by_id(db, user_id)
-            if not user:
+            # Only the stored hash is needed; skip hydrating the full row
+            password_hash = await db.scalar(
+                select(User.password_hash).where(User.id == user_id)
+            )
+            if password_hash is None:
                 return False, "User not found"
 
             # Verify old password
-            if not verify_password(old_password, user.password_hash):
+            if not await averify_password(old_password, password_hash):
                 return False, "Old password is incorrect"
 
             # Update password
-            user.password_hash = hash_password(new_password)
-            user.updated_at = datetime.utcnow()
-            db.commit()
-            logger.info(f"Password changed for user: {user.email}")
+            email = await UserService._set_user_fields(
+                db, user_id, password_hash=await ahash_password(new_password)
+            )
+            if email is None:
+                return False, "User not found"
+
+            await invalidate_user(user_id)
+            logger.info("Password changed for user: %s", email)
             return True, "Password changed successfully"
         except Exception as e:
-            db.rollback()
-            logger.error(f"Error changing password: {e}")
+            await db.rollback()
+            logger.error("Error changing password: %s", e)
             return False, "Error changing password"
 
     @staticmethod
-    def delete_user(db: Session, user_id: str) -> Tuple[bool, str]:
+    async def delete_user(db: AsyncSession, user_id: str) -> Tuple[bool, str]:
         """Delete user account"""
         try:
-            user = UserService.get_user_by_id(db, user_id)
+            user = await UserService.get_user_by_id(db, user_id)
             if not user:
                 return False, "User not found"
 
-            db.delete(user)
-            db.commit()
-            logger.info(f"User deleted: {user.email}")
+            await db.delete(user)
+            await db.commit()
+            invalidate_count("users")
+            await revoke_tokens(user_id)
+            logger.info("User deleted: %s", user.email)
             return True, "User deleted successfully"
         except Exception as e:
-            db.rollback()
-            logger.error(f"Error deleting user: {e}")
+            await db.rollback()
+            logger.error("Error deleting user: %s", e)
             return False, "Error deleting user"
 
     @staticmethod
-    def deactivate_user(db: Session, user_id: str) -> Tuple[bool, str]:
+    async def deactivate_user(db: AsyncSession, user_id: str) -> Tuple[bool, str]:
         """Deactivate user account"""
         try:
-            user = UserService.get_user_by_id(db, user_id)
-            if not user:
+            email = await UserService._set_user_fields(db, user_id, is_active=False)
+            if email is None:
                 return False, "User not found"
 
-            user.is_active = False
-            user.updated_at = datetime.utcnow()
-            db.commit()
-            logger.info(f"User deactivated: {user.email}")
+            invalidate_count("users")
+            await revoke_tokens(user_id)
+            logger.info("User deactivated: %s", email)
             return True, "User deactivated successfully"
         except Exception as e:
-            db.rollback()
-            logger.error(f"Error deactivating user: {e}")
+            await db.rollback()
+            logger.error("Error deactivating user: %s", e)
             return False, "Error deactivating user"
 
     @staticmethod
-    def activate_user(db: Session, user_id: str) -> Tuple[bool, str]:
+    async def activate_user(db: AsyncSession, user_id: str) -> Tuple[bool, str]:
         """Activate user account"""
         try:
-            user = UserService.get_user_by_id(db, user_id)
-            if not user:
+            email = await UserService._set_user_fields(db, user_id, is_active=True)
+            if email is None:
                 return False, "User not found"
 
-            user.is_active = True
-            user.updated_at = datetime.utcnow()
-            db.commit()
-            logger.info(f"User activated: {user.email}")
+            invalidate_count("users")
+            await invalidate_user(user_id)
+            logger.info("User activated: %s", email)
             return True, "User activated successfully"
         except Exception as e:
-            db.rollback()
-            logger.error(f"Error activating user: {e}")
+            await db.rollback()
+            logger.error("Error activating user: %s", e)
             return False, "Error activating user"
 
     @staticmethod
-    def verify_email(db: Session, user_id: str) -> Tuple[bool, str]:
+    async def verify_email(db: AsyncSession, user_id: str) -> Tuple[bool, str]:
         """Verify user email"""
         try:
-            user = UserService.get_user_by_id(db, user_id)
-            if not user:
+            email = await UserService._set_user_fields(db, user_id, email_verified=True)
+            if email is None:
                 return False, "User not found"
 
-            user.email_verified = True
-            user.updated_at = datetime.utcnow()
-            db.commit()
-            logger.info(f"Email verified for user: {user.email}")
+            await invalidate_user(user_id)
+            logger.info("Email verified for user: %s", email)
             return True, "Email verified successfully"
         except Exception as e:
-            db.rollback()
-            logger.error(f"Error verifying email: {e}")
+            await db.rollback()
+            logger.error("Error verifying email: %s", e)
             return False, "Error verifying email"
 
     @staticmethod
-    def enable_2fa(db: Session, user_id: str, secret: str) -> Tuple[bool, str]:
+    async def enable_2fa(db: AsyncSession, user_id: str, secret: str) -> Tuple[bool, str]:
         """Enable 2FA for user"""
         try:
-            user = UserService.get_user_by_id(db, user_id)
-            if not user:
+            email = await UserService._set_user_fields(
+                db, user_id, two_factor_enabled=True, two_factor_secret=secret
+            )
+            if email is None:
                 return False, "User not found"
 
-            user.two_factor_enabled = True
-            user.two_factor_secret = secret
-            user.updated_at = datetime.utcnow()
-            db.commit()
-            logger.info(f"2FA enabled for user: {user.email}")
+            await invalidate_user(user_id)
+            logger.info("2FA enabled for user: %s", email)
             return True, "2FA enabled successfully"
         except Exception as e:
-            db.rollback()
-            logger.error(f"Error enabling 2FA: {e}")
+            await db.rollback()
+            logger.error("Error enabling 2FA: %s", e)
             return False, "Error enabling 2FA"
 
     @staticmethod
-    def disable_2fa(db: Session, user_id: str) -> Tuple[bool, str]:
+    async def disable_2fa(db: AsyncSession, user_id: str) -> Tuple[bool, str]:
         """Disable 2FA for user"""
         try:
-            user = UserService.get_user_by_id(db, user_id)
-            if not user:
+            email = await UserService._set_user_fields(
+                db, user_id, two_factor_enabled=False, two_factor_secret=None
+            )
+            if email is None:
                 return False, "User not found"
 
-            user.two_factor_enabled = False
-            user.two_factor_secret = None
-            user.updated_at = datetime.utcnow()
-            db.commit()
-            logger.info(f"2FA disabled for user: {user.email}")
+            await invalidate_user(user_id)
+            logger.info("2FA disabled for user: %s", email)
             return True, "2FA disabled successfully"
         except Exception as e:
-            db.rollback()
-            logger.error(f"Error disabling 2FA: {e}")
+            await db.rollback()
+            logger.error("Error disabling 2FA: %s", e)
             return False, "Error disabling 2FA"
 
     @staticmethod
-    def count_users(db: Session) -> int:
-        """Count total users"""
-        return db.query(User).count()
+    async def _load_user_counts(db: AsyncSession) -> Tuple[int, int]:
+        """Count total and active users in a single scan"""
+        row = (
+            await db.execute(
+                select(func.count(), func.count().filter(User.is_active == True))
+                .select_from(User)
+            )
+        ).one()
+        return row[0], row[1]
 
     @staticmethod
-    def count_active_users(db: Session) -> int:
-        """Count active users"""
-        return db.query(User).filter(User.is_active == True).count()
+    async def get_user_counts(db: AsyncSession) -> Tuple[int, int]:
+        """Get (total, active) user counts (cached briefly; user writes invalidate it)"""
+        return await cached_count("users", lambda: UserService._load_user_counts(db))
 
     @staticmethod
-    def search_users(db: Session, query: str, limit: int = 10) -> List[User]:
-        """Search users by email or name"""
-        return (
-            db.query(User)
-            .filter(
-                (User.email.ilike(f"%{query}%"))
-                | (User.first_name.ilike(f"%{query}%"))
-                | (User.last_name.ilike(f"%{query}%"))
+    async def count_users(db: AsyncSession) -> int:
+        """Count total users (cached briefly; user writes invalidate it)"""
+        total, _ = await UserService.get_user_counts(db)
+        return total
+
+    @staticmethod
+    async def count_active_users(db: AsyncSession) -> int:
+        """Count active users (cached briefly; user writes invalidate it)"""
+        _, active = await UserService.get_user_counts(db)
+        return active
+
+    @staticmethod
+    async def search_users(db: AsyncSession, query: str, limit: int = 10) -> List[User]:
+        """
+        Search users by email or name
+
+        Substring matches are served by the pg_trgm GIN indexes (migration 008).
+        """
+        # Match the query literally; % and _ in it are not wildcards
+        escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        pattern = f"%{escaped}%"
+        result = await db.scalars(
+            select(User)
+            .where(
+                User.email.ilike(pattern, escape="\\")
+                | User.first_name.ilike(pattern, escape="\\")
+                | User.last_name.ilike(pattern, escape="\\")
             )
             .limit(limit)
-            .all()
         )
+        return list(result.all())
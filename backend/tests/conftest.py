@@ -0,0 +1,95 @@
+"""
+Shared test fixtures
+"""
+import pytest
+import uuid
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import cache
+from services import auth_service
+from utils import count_cache, generation_cache, security, user_cache
+
+
+@event.listens_for(Engine, "connect")
+def _register_sqlite_functions(dbapi_connection, connection_record):
+    """Provide gen_random_uuid() for the models' server defaults on SQLite"""
+    if hasattr(dbapi_connection, "create_function"):
+        dbapi_connection.create_function("gen_random_uuid", 0, lambda: uuid.uuid4().hex)
+
+
+@pytest.fixture(autouse=True)
+def clear_process_caches():
+    """Start every test with empty in-process caches"""
+    caches = [
+        security._claims_cache,
+        security._rejected_tokens,
+        user_cache._revoked_before,
+        user_cache._revocation_checked,
+        count_cache._counts,
+        generation_cache._generation_cache,
+        auth_service._failed_logins,
+    ]
+    for cache in caches:
+        cache.clear()
+    yield
+    for cache in caches:
+        cache.clear()
+
+
+class FakeRedis:
+    """In-memory stand-in for the redis.asyncio calls cache.py makes"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        return [self.data.get(key) for key in keys]
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value.encode() if isinstance(value, str) else value
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+    async def aclose(self):
+        pass
+
+
+class _FakePipeline:
+    """Queued INCR/EXPIRE commands, run on execute()"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.keys = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def incr(self, key):
+        self.keys.append(key)
+        return self
+
+    def expire(self, key, ttl):
+        return self
+
+    async def execute(self):
+        for key in self.keys:
+            self.redis.data[key] = str(int(self.redis.data.get(key, b"0")) + 1).encode()
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Route the cache helpers to an in-memory Redis"""
+    redis = FakeRedis()
+    monkeypatch.setattr(cache, "redis_client", redis)
+    return redis
@@ -1,28 +1,36 @@
 """
 Authentication API tests
 """
+import os
 import pytest
 from fastapi.testclient import TestClient
 from main import app
 from database import get_db, Base
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from models import User
-from utils.security import hash_password
+from services import auth_service
+from utils.security import hash_password, pwd_context, verify_password
 import json
 
 # Test database
-SQLALCHEMY_TEST_DATABASE_URL = "sqlite:///./test.db"
+# One database file per pytest-xdist worker so parallel runs don't share locks
+TEST_DB_PATH = f"./test_{os.environ.get('PYTEST_XDIST_WORKER', 'main')}.db"
+SQLALCHEMY_TEST_DATABASE_URL = f"sqlite:///{TEST_DB_PATH}"
 engine = create_engine(SQLALCHEMY_TEST_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The app runs on AsyncSession; fixtures keep using the sync session above
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DB_PATH}")
+AsyncTestingSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
 
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
+
+async def override_get_db():
+    async with AsyncTestingSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 app.dependency_overrides[get_db] = override_get_db
@@ -34,8 +42,10 @@ client = TestClient(app)
 @pytest.fixture(autouse=True)
 def cleanup():
     """Clean up database before each test"""
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
+    # The schema is created once above; emptying the tables is much cheaper
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
     yield
 
 
@@ -46,12 +56,13 @@ def test_register_user():
         json={
             "email": "test@example.com",
             "password": "password123",
+            "confirm_password": "password123",
             "first_name": "Test",
             "last_name": "User",
         },
     )
-    assert response.status_code == 201
-    data = response.json()
+    assert response.status_code == 200
+    data = response.json()["data"]["user"]
     assert data["email"] == "test@example.com"
     assert data["first_name"] == "Test"
     assert "id" in data
@@ -65,6 +76,7 @@ def test_register_user_duplicate_email():
         json={
             "email": "test@example.com",
             "password": "password123",
+            "confirm_password": "password123",
             "first_name": "Test",
             "last_name": "User",
         },
@@ -76,6 +88,7 @@ def test_register_user_duplicate_email():
         json={
             "email": "test@example.com",
             "password": "password456",
+            "confirm_password": "password456",
             "first_name": "Another",
             "last_name": "User",
         },
@@ -91,6 +104,7 @@ def test_register_user_invalid_email():
         json={
             "email": "invalid-email",
             "password": "password123",
+            "confirm_password": "password123",
             "first_name": "Test",
             "last_name": "User",
         },
@@ -105,6 +119,7 @@ def test_register_user_weak_password():
         json={
             "email": "test@example.com",
             "password": "weak",
+            "confirm_password": "weak",
             "first_name": "Test",
             "last_name": "User",
         },
@@ -120,6 +135,7 @@ def test_login_user():
         json={
             "email": "test@example.com",
             "password": "password123",
+            "confirm_password": "password123",
             "first_name": "Test",
             "last_name": "User",
         },
@@ -134,10 +150,10 @@ def test_login_user():
         },
     )
     assert response.status_code == 200
-    data = response.json()
+    data = response.json()["data"]
     assert "access_token" in data
     assert "refresh_token" in data
-    assert data["user"]["email"] == "test@example.com"
+    assert data["token_type"] == "bearer"
 
 
 def test_login_user_invalid_password():
@@ -148,6 +164,7 @@ def test_login_user_invalid_password():
         json={
             "email": "test@example.com",
             "password": "password123",
+            "confirm_password": "password123",
             "first_name": "Test",
             "last_name": "User",
         },
@@ -162,7 +179,7 @@ def test_login_user_invalid_password():
         },
     )
     assert response.status_code == 401
-    assert "Invalid credentials" in response.json()["detail"]
+    assert "Invalid email or password" in response.json()["detail"]
 
 
 def test_login_user_not_found():
@@ -185,6 +202,7 @@ def test_refresh_token():
         json={
             "email": "test@example.com",
             "password": "password123",
+            "confirm_password": "password123",
             "first_name": "Test",
             "last_name": "User",
         },
@@ -197,7 +215,7 @@ def test_refresh_token():
             "password": "password123",
         },
     )
-    refresh_token = login_response.json()["refresh_token"]
+    refresh_token = login_response.json()["data"]["refresh_token"]
 
     # Refresh token
     response = client.post(
@@ -205,7 +223,7 @@ def test_refresh_token():
         json={"refresh_token": refresh_token},
     )
     assert response.status_code == 200
-    data = response.json()
+    data = response.json()["data"]
     assert "access_token" in data
     assert "refresh_token" in data
 
@@ -227,6 +245,7 @@ def test_get_current_user():
         json={
             "email": "test@example.com",
             "password": "password123",
+            "confirm_password": "password123",
             "first_name": "Test",
             "last_name": "User",
         },
@@ -239,7 +258,7 @@ def test_get_current_user():
             "password": "password123",
         },
     )
-    access_token = login_response.json()["access_token"]
+    access_token = login_response.json()["data"]["access_token"]
 
     # Get current user
     response = client.get(
@@ -247,7 +266,7 @@ def test_get_current_user():
         headers={"Authorization": f"Bearer {access_token}"},
     )
     assert response.status_code == 200
-    data = response.json()
+    data = response.json()["data"]["user"]
     assert data["email"] == "test@example.com"
 
 
@@ -265,6 +284,7 @@ def test_logout_user():
         json={
             "email": "test@example.com",
             "password": "password123",
+            "confirm_password": "password123",
             "first_name": "Test",
             "last_name": "User",
         },
@@ -277,7 +297,7 @@ def test_logout_user():
             "password": "password123",
         },
     )
-    access_token = login_response.json()["access_token"]
+    access_token = login_response.json()["data"]["access_token"]
 
     # Logout
     response = client.post(
@@ -287,6 +307,40 @@ def test_logout_user():
     assert response.status_code == 200
 
 
+def test_token_rejected_after_logout():
+    """Test access token is rejected after logout"""
+    client.post(
+        "/api/auth/register",
+        json={
+            "email": "test@example.com",
+            "password": "password123",
+            "confirm_password": "password123",
+            "first_name": "Test",
+            "last_name": "User",
+        },
+    )
+
+    login_response = client.post(
+        "/api/auth/login",
+        json={
+            "email": "test@example.com",
+            "password": "password123",
+        },
+    )
+    access_token = login_response.json()["data"]["access_token"]
+
+    client.post(
+        "/api/auth/logout",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+
+    response = client.get(
+        "/api/auth/me",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    assert response.status_code == 401
+
+
 def test_get_sessions():
     """Test getting user sessions"""
     # Register and login
@@ -295,6 +349,7 @@ def test_get_sessions():
         json={
             "email": "test@example.com",
             "password": "password123",
+            "confirm_password": "password123",
             "first_name": "Test",
             "last_name": "User",
         },
@@ -307,7 +362,7 @@ def test_get_sessions():
             "password": "password123",
         },
     )
-    access_token = login_response.json()["access_token"]
+    access_token = login_response.json()["data"]["access_token"]
 
     # Get sessions
     response = client.get(
@@ -315,7 +370,7 @@ def test_get_sessions():
         headers={"Authorization": f"Bearer {access_token}"},
     )
     assert response.status_code == 200
-    data = response.json()
+    data = response.json()["data"]
     assert "sessions" in data
     assert len(data["sessions"]) > 0
 
@@ -328,6 +383,7 @@ def test_revoke_all_sessions():
         json={
             "email": "test@example.com",
             "password": "password123",
+            "confirm_password": "password123",
             "first_name": "Test",
             "last_name": "User",
         },
@@ -340,7 +396,7 @@ def test_revoke_all_sessions():
             "password": "password123",
         },
     )
-    access_token = login_response.json()["access_token"]
+    access_token = login_response.json()["data"]["access_token"]
 
     # Revoke all sessions
     response = client.post(
@@ -348,3 +404,84 @@ def test_revoke_all_sessions():
         headers={"Authorization": f"Bearer {access_token}"},
     )
     assert response.status_code == 200
+
+
+@pytest.fixture
+def verify_calls(monkeypatch):
+    """Count the password verifications login runs"""
+    calls = []
+    verify = auth_service.averify_and_update_password
+
+    async def counting_verify(password, password_hash):
+        calls.append(password)
+        return await verify(password, password_hash)
+
+    monkeypatch.setattr(auth_service, "averify_and_update_password", counting_verify)
+    return calls
+
+
+def _register(email="test@example.com"):
+    client.post(
+        "/api/auth/register",
+        json={
+            "email": email,
+            "password": "password123",
+            "confirm_password": "password123",
+            "first_name": "Test",
+            "last_name": "User",
+        },
+    )
+
+
+def test_repeated_wrong_password_skips_hashing(verify_calls):
+    """Test an identical failed login is rejected without verifying again"""
+    _register()
+    for _ in range(3):
+        response = client.post(
+            "/api/auth/login",
+            json={"email": "test@example.com", "password": "wrongpassword"},
+        )
+        assert response.status_code == 401
+    assert verify_calls == ["wrongpassword"]
+
+
+def test_correct_password_after_failure(verify_calls):
+    """Test a failed attempt doesn't block the right password straight after"""
+    _register()
+    response = client.post(
+        "/api/auth/login",
+        json={"email": "test@example.com", "password": "wrongpassword"},
+    )
+    assert response.status_code == 401
+
+    response = client.post(
+        "/api/auth/login",
+        json={"email": "test@example.com", "password": "password123"},
+    )
+    assert response.status_code == 200
+    assert verify_calls == ["wrongpassword", "password123"]
+
+
+def test_login_upgrades_bcrypt_hash():
+    """Test a legacy bcrypt hash is replaced with Argon2id on login"""
+    db = TestingSessionLocal()
+    user = User(
+        email="legacy@example.com",
+        password_hash=pwd_context.handler("bcrypt").hash("password123"),
+        is_active=True,
+    )
+    db.add(user)
+    db.commit()
+    db.close()
+
+    response = client.post(
+        "/api/auth/login",
+        json={"email": "legacy@example.com", "password": "password123"},
+    )
+    assert response.status_code == 200
+
+    db = TestingSessionLocal()
+    password_hash = db.query(User.password_hash).filter_by(email="legacy@example.com").scalar()
+    db.close()
+    assert password_hash.startswith("$argon2id$")
+    assert verify_password("password123", password_hash)
@@ -0,0 +1,326 @@
+"""
+Code generation API tests, with the Gemini calls replaced
+"""
+import asyncio
+import json
+import os
+import pytest
+from fastapi.testclient import TestClient
+from main import app
+from database import get_db, Base
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from config import settings
+from models import User
+from routes import codegen_routes
+from services.gemini_service import GeminiService
+from utils.security import create_access_token
+
+# Test database
+# One database file per pytest-xdist worker so parallel runs don't share locks
+TEST_DB_PATH = f"./test_{os.environ.get('PYTEST_XDIST_WORKER', 'main')}.db"
+SQLALCHEMY_TEST_DATABASE_URL = f"sqlite:///{TEST_DB_PATH}"
+engine = create_engine(SQLALCHEMY_TEST_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# The app runs on AsyncSession; fixtures keep using the sync session above
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DB_PATH}")
+AsyncTestingSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+
+async def override_get_db():
+    async with AsyncTestingSessionLocal() as db:
+        yield db
+
+
+app.dependency_overrides[get_db] = override_get_db
+Base.metadata.create_all(bind=engine)
+
+client = TestClient(app)
+
+VIBE = "Calm landing page with soft pastel colors"
+
+# GeminiService method behind each generation kind
+GENERATORS = {
+    "html": "agenerate_html_code",
+    "react": "agenerate_react_code",
+    "css": "agenerate_css_from_vibe",
+    "structure": "agenerate_project_structure",
+}
+
+
+@pytest.fixture(autouse=True)
+def cleanup():
+    """Clean up database before each test"""
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    yield
+
+
+@pytest.fixture
+def headers():
+    """Create a user and return its auth headers"""
+    db = TestingSessionLocal()
+    user = User(email="test@example.com", password_hash="x", is_active=True)
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+
+@pytest.fixture
+def gemini(monkeypatch):
+    """
+    Replace the Gemini generations with canned results
+
+    Returns the (kind, vibe_description) calls made, in order.
+    """
+    calls = []
+    monkeypatch.setattr(settings, "GEMINI_PREFETCH_VARIANTS", False)
+    # Each TestClient request runs on its own event loop
+    monkeypatch.setattr(codegen_routes, "_gemini_semaphore", asyncio.Semaphore(2))
+    for kind in GENERATORS:
+        async def generate(vibe_description, kind=kind):
+            calls.append((kind, vibe_description))
+            return True, "Code generated successfully", f"{kind}: {vibe_description}"
+
+        use_generator(monkeypatch, kind, generate)
+    return calls
+
+
+def use_generator(monkeypatch, kind, generate):
+    """Route one generation kind to generate"""
+    monkeypatch.setattr(GeminiService, GENERATORS[kind], staticmethod(generate))
+    # The batch and bundle tables hold the functions they were built with
+    if kind in codegen_routes._ASYNC_GENERATORS:
+        monkeypatch.setitem(codegen_routes._ASYNC_GENERATORS, kind, generate)
+    monkeypatch.setitem(codegen_routes._BUNDLE_GENERATORS, kind, generate)
+
+
+def test_multi_generates_html_and_react(gemini, headers):
+    """Test /multi returns both generations"""
+    response = client.post("/api/codegen/multi", headers=headers, json={"vibe_description": VIBE})
+    assert response.status_code == 200
+    assert response.json() == {
+        "status": "generated",
+        "html": f"html: {VIBE}",
+        "react": f"react: {VIBE}",
+    }
+    assert sorted(gemini) == [("html", VIBE), ("react", VIBE)]
+
+
+def test_multi_runs_generations_concurrently(gemini, headers, monkeypatch):
+    """Test /multi starts the React generation before HTML finishes"""
+    started = set()
+    both_started = asyncio.Event()
+
+    def waiting(kind):
+        async def generate(vibe_description):
+            started.add(kind)
+            if len(started) == 2:
+                both_started.set()
+            # Run one after the other, the first call would never see the second
+            await asyncio.wait_for(both_started.wait(), 1)
+            return True, "Code generated successfully", kind
+
+        return generate
+
+    use_generator(monkeypatch, "html", waiting("html"))
+    use_generator(monkeypatch, "react", waiting("react"))
+    response = client.post("/api/codegen/multi", headers=headers, json={"vibe_description": VIBE})
+    assert response.status_code == 200
+    assert started == {"html", "react"}
+
+
+def test_multi_reports_failed_generation(gemini, headers, monkeypatch):
+    """Test /multi fails when one of the generations fails"""
+    async def fail(vibe_description):
+        return False, "Error generating React code", None
+
+    use_generator(monkeypatch, "react", fail)
+    response = client.post("/api/codegen/multi", headers=headers, json={"vibe_description": VIBE})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Error generating React code"
+
+
+def test_multi_serves_repeats_from_cache(gemini, headers):
+    """Test a repeated /multi request makes no new Gemini calls"""
+    for _ in range(2):
+        response = client.post(
+            "/api/codegen/multi", headers=headers, json={"vibe_description": VIBE}
+        )
+        assert response.status_code == 200
+    assert len(gemini) == 2
+
+
+def test_batch_generates_each_item_in_order(gemini, headers):
+    """Test /batch returns one result per item, in request order"""
+    items = [
+        {"vibe_description": f"{VIBE} {i}", "language": language}
+        for i, language in enumerate(["html", "react", "html"])
+    ]
+    response = client.post("/api/codegen/batch", headers=headers, json=items)
+    assert response.status_code == 200
+    assert [r["generated_code"] for r in response.json()] == [
+        f"{item['language']}: {item['vibe_description']}" for item in items
+    ]
+    assert {r["status"] for r in response.json()} == {"generated"}
+
+
+def test_batch_at_size_limit(gemini, headers):
+    """Test a batch of exactly MAX_BATCH_SIZE items is accepted"""
+    items = [{"vibe_description": f"{VIBE} {i}"} for i in range(codegen_routes.MAX_BATCH_SIZE)]
+    response = client.post("/api/codegen/batch", headers=headers, json=items)
+    assert response.status_code == 200
+    assert len(response.json()) == codegen_routes.MAX_BATCH_SIZE
+
+
+def test_batch_over_size_limit(gemini, headers):
+    """Test a batch over MAX_BATCH_SIZE is rejected before generating anything"""
+    items = [{"vibe_description": f"{VIBE} {i}"} for i in range(codegen_routes.MAX_BATCH_SIZE + 1)]
+    response = client.post("/api/codegen/batch", headers=headers, json=items)
+    assert response.status_code == 400
+    assert gemini == []
+
+
+def test_batch_isolates_failed_items(gemini, headers, monkeypatch):
+    """Test one failing item doesn't fail the rest of the batch"""
+    async def fail(vibe_description):
+        raise RuntimeError("Gemini unavailable")
+
+    use_generator(monkeypatch, "react", fail)
+    items = [
+        {"vibe_description": VIBE, "language": "html"},
+        {"vibe_description": VIBE, "language": "react"},
+    ]
+    response = client.post("/api/codegen/batch", headers=headers, json=items)
+    assert response.status_code == 200
+    html, react = response.json()
+    assert html["status"] == "generated"
+    assert react["status"] == "failed"
+    assert react["error"] == "Error generating code"
+
+
+def _events(body: bytes):
+    """Parse a server-sent event stream into (event, data) pairs"""
+    events = []
+    for block in body.decode().split("\n\n"):
+        if not block:
+            continue
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields.get("event", "message"), json.loads(fields["data"])))
+    return events
+
+
+@pytest.fixture
+def gemini_stream(monkeypatch):
+    """Replace the Gemini stream with fenced chunks; returns the prompts streamed"""
+    prompts = []
+    monkeypatch.setattr(settings, "GOOGLE_GEMINI_API_KEY", "test-key")
+
+    async def stream(prompt):
+        prompts.append(prompt)
+        for chunk in ["```html\n<main>", "<p>hi</p>", "</main>\n```"]:
+            yield chunk
+
+    monkeypatch.setattr(GeminiService, "_stream", staticmethod(stream))
+    return prompts
+
+
+@pytest.mark.parametrize("path", ["/api/codegen/html/stream", "/api/codegen/react/stream"])
+def test_stream_frames_chunks_and_done(gemini_stream, headers, path):
+    """Test a stream sends fence-free chunks and ends with a done event"""
+    response = client.post(path, headers=headers, json={"vibe_description": VIBE})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.content.endswith(b"\n\n")
+
+    *chunks, done = _events(response.content)
+    assert {event for event, _ in chunks} == {"message"}
+    assert "".join(data["chunk"] for _, data in chunks) == "<main><p>hi</p></main>"
+    assert done == ("done", {"cached": False})
+
+
+def test_stream_repeat_is_served_from_cache(gemini_stream, headers):
+    """Test a repeated stream sends the cached code in one chunk"""
+    for _ in range(2):
+        response = client.post(
+            "/api/codegen/html/stream", headers=headers, json={"vibe_description": VIBE}
+        )
+    assert _events(response.content) == [
+        ("message", {"chunk": "<main><p>hi</p></main>"}),
+        ("done", {"cached": True}),
+    ]
+    assert len(gemini_stream) == 1
+
+
+def test_stream_error_ends_with_error_event(gemini_stream, headers, monkeypatch):
+    """Test a failing stream ends with an error event instead of done"""
+    async def stream(prompt):
+        yield "<main>"
+        raise RuntimeError("Gemini unavailable")
+
+    monkeypatch.setattr(GeminiService, "_stream", staticmethod(stream))
+    response = client.post(
+        "/api/codegen/html/stream", headers=headers, json={"vibe_description": VIBE}
+    )
+    assert _events(response.content) == [
+        ("message", {"chunk": "<main>"}),
+        ("error", {"detail": "Error generating code"}),
+    ]
+
+
+def test_stream_without_api_key(gemini_stream, headers, monkeypatch):
+    """Test streaming is rejected up front when Gemini isn't configured"""
+    monkeypatch.setattr(settings, "GOOGLE_GEMINI_API_KEY", "")
+    response = client.post(
+        "/api/codegen/html/stream", headers=headers, json={"vibe_description": VIBE}
+    )
+    assert response.status_code == 400
+
+
+def test_bundle_generates_every_kind(gemini, headers):
+    """Test /bundle returns HTML, React, CSS and structure together"""
+    response = client.post("/api/codegen/bundle", headers=headers, json={"vibe_description": VIBE})
+    assert response.status_code == 200
+    assert response.json() == {
+        "status": "generated",
+        **{kind: f"{kind}: {VIBE}" for kind in GENERATORS},
+        "errors": {},
+    }
+    assert sorted(kind for kind, _ in gemini) == sorted(GENERATORS)
+
+
+def test_bundle_keeps_partial_results(gemini, headers, monkeypatch):
+    """Test a failed kind is reported without losing the others"""
+    async def fail(vibe_description):
+        return False, "Error generating CSS", None
+
+    async def crash(vibe_description):
+        raise RuntimeError("Gemini unavailable")
+
+    use_generator(monkeypatch, "css", fail)
+    use_generator(monkeypatch, "structure", crash)
+    response = client.post("/api/codegen/bundle", headers=headers, json={"vibe_description": VIBE})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "partial"
+    assert data["html"] == f"html: {VIBE}"
+    assert data["react"] == f"react: {VIBE}"
+    assert data["errors"] == {"css": "Error generating CSS", "structure": "Error generating code"}
+
+
+def test_bundle_fails_when_every_kind_fails(gemini, headers, monkeypatch):
+    """Test /bundle is an error when nothing was generated"""
+    async def fail(vibe_description):
+        return False, "Gemini API key not configured", None
+
+    for kind in GENERATORS:
+        use_generator(monkeypatch, kind, fail)
+    response = client.post("/api/codegen/bundle", headers=headers, json={"vibe_description": VIBE})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Gemini API key not configured"
@@ -0,0 +1,35 @@
+"""
+Gemini service tests
+"""
+import asyncio
+import pytest
+from services.gemini_service import GeminiService
+
+
+def _strip_streamed(text: str, size: int) -> str:
+    """Run text through the streaming fence stripper in chunks of size"""
+    async def chunks():
+        for i in range(0, len(text), size):
+            yield text[i:i + size]
+
+    async def collect():
+        return "".join([part async for part in GeminiService._strip_fences(chunks())])
+
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize("size", [1, 2, 5, 1000])
+@pytest.mark.parametrize("text", [
+    "\n```html\n<p>a</p>\n```",
+    "```html\n<p>a</p>\n```\n",
+    "  <p>a</p>  ",
+    "```\nconst s = `x`\n```",
+])
+def test_streamed_fences_match_non_streaming(text, size):
+    """Test streamed output is stripped like the complete response"""
+    assert _strip_streamed(text, size) == GeminiService.clean_html_code(text)
+
+
+def test_streamed_fence_after_leading_newline():
+    """Test a fence preceded by whitespace is still stripped"""
+    assert _strip_streamed("\n```html\n<p>a</p>\n```", 1) == "<p>a</p>"
@@ -0,0 +1,104 @@
+"""
+OAuth service tests, with the provider calls replaced
+"""
+import asyncio
+import os
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from database import Base
+from models import User, Session as SessionModel
+from services.oauth_service import OAuthService
+
+# Test database
+# One database file per pytest-xdist worker so parallel runs don't share locks
+TEST_DB_PATH = f"./test_{os.environ.get('PYTEST_XDIST_WORKER', 'main')}.db"
+engine = create_engine(f"sqlite:///{TEST_DB_PATH}", connect_args={"check_same_thread": False})
+Base.metadata.create_all(bind=engine)
+
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DB_PATH}")
+AsyncTestingSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+EMAIL = "octocat@example.com"
+
+
+@pytest.fixture(autouse=True)
+def cleanup():
+    """Clean up database before each test"""
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    yield
+
+
+@pytest.fixture
+def github(monkeypatch):
+    """Answer the GitHub API calls with a fixed account"""
+    async def get_access_token(code):
+        return "gho_test"
+
+    async def get_user(access_token):
+        return {"name": "Mona Octocat", "avatar_url": "https://example.com/a.png"}
+
+    async def get_user_email(access_token):
+        return EMAIL
+
+    monkeypatch.setattr(OAuthService, "get_github_access_token", staticmethod(get_access_token))
+    monkeypatch.setattr(OAuthService, "get_github_user", staticmethod(get_user))
+    monkeypatch.setattr(OAuthService, "get_github_user_email", staticmethod(get_user_email))
+
+
+async def _sign_in():
+    async with AsyncTestingSessionLocal() as db:
+        return await OAuthService.authenticate_github_user(db, "code")
+
+
+async def _counts():
+    async with AsyncTestingSessionLocal() as db:
+        users = await db.scalar(select(func.count()).select_from(User))
+        sessions = await db.scalar(select(func.count()).select_from(SessionModel))
+        return users, sessions
+
+
+def test_first_sign_in_creates_user(github):
+    """Test a first GitHub sign-in creates the user and a session"""
+    success, message, data = asyncio.run(_sign_in())
+    assert success, message
+    assert data["email"] == EMAIL
+    assert data["access_token"]
+    assert asyncio.run(_counts()) == (1, 1)
+
+    async def load():
+        async with AsyncTestingSessionLocal() as db:
+            return await db.scalar(select(User).where(User.email == EMAIL))
+
+    user = asyncio.run(load())
+    assert user.id == data["user_id"]
+    assert (user.first_name, user.last_name) == ("Mona", "Octocat")
+    assert user.last_login_at is not None
+
+
+def test_returning_sign_in_reuses_user(github):
+    """Test a second sign-in logs into the same user"""
+    _, _, first = asyncio.run(_sign_in())
+    success, _, second = asyncio.run(_sign_in())
+    assert success
+    assert second["user_id"] == first["user_id"]
+    assert asyncio.run(_counts()) == (1, 2)
+
+
+def test_concurrent_first_sign_in(github, monkeypatch):
+    """Test a sign-in that lost the race to create the user still succeeds"""
+    _, _, first = asyncio.run(_sign_in())
+
+    # As if the lookup ran before the other sign-in committed its INSERT
+    async def not_found(db, email):
+        return None
+
+    monkeypatch.setattr(OAuthService, "_get_login_user", staticmethod(not_found))
+    success, message, second = asyncio.run(_sign_in())
+    assert success, message
+    assert second["user_id"] == first["user_id"]
+    assert asyncio.run(_counts()) == (1, 2)
@@ -1,28 +1,38 @@
 """
 Project API tests
 """
+import os
 import pytest
 from fastapi.testclient import TestClient
 from main import app
 from database import get_db, Base
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from models import User, Project
 from utils.security import hash_password, create_access_token
-import uuid
 
 # Test database
-SQLALCHEMY_TEST_DATABASE_URL = "sqlite:///./test.db"
+# One database file per pytest-xdist worker so parallel runs don't share locks
+TEST_DB_PATH = f"./test_{os.environ.get('PYTEST_XDIST_WORKER', 'main')}.db"
+SQLALCHEMY_TEST_DATABASE_URL = f"sqlite:///{TEST_DB_PATH}"
 engine = create_engine(SQLALCHEMY_TEST_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The app runs on AsyncSession; fixtures keep using the sync session above
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DB_PATH}")
+AsyncTestingSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
 
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
+# Hashed once per module; hashing is deliberately slow
+PASSWORD_HASH = hash_password("password123")
+
+
+async def override_get_db():
+    async with AsyncTestingSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 app.dependency_overrides[get_db] = override_get_db
@@ -34,8 +44,10 @@ client = TestClient(app)
 @pytest.fixture(autouse=True)
 def cleanup():
     """Clean up database before each test"""
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
+    # The schema is created once above; emptying the tables is much cheaper
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
     yield
 
 
@@ -44,9 +56,8 @@ def test_user():
     """Create test user"""
     db = TestingSessionLocal()
     user = User(
-        id=str(uuid.uuid4()),
         email="test@example.com",
-        password_hash=hash_password("password123"),
+        password_hash=PASSWORD_HASH,
         first_name="Test",
         last_name="User",
         is_active=True,
@@ -61,7 +72,7 @@ def test_user():
 @pytest.fixture
 def test_token(test_user):
     """Create test token"""
-    return create_access_token(test_user.id)
+    return create_access_token({"sub": str(test_user.id)})
 
 
 def test_create_project(test_token):
@@ -316,9 +327,8 @@ def test_unauthorized_access(test_token):
     # Create another user
     db = TestingSessionLocal()
     user2 = User(
-        id=str(uuid.uuid4()),
         email="user2@example.com",
-        password_hash=hash_password("password123"),
+        password_hash=PASSWORD_HASH,
         first_name="User",
         last_name="Two",
         is_active=True,
@@ -326,7 +336,7 @@ def test_unauthorized_access(test_token):
     )
     db.add(user2)
     db.commit()
-    token2 = create_access_token(user2.id)
+    token2 = create_access_token({"sub": str(user2.id)})
 
     # Try to access project with second user
     response = client.get(
@@ -334,3 +344,123 @@ def test_unauthorized_access(test_token):
         headers={"Authorization": f"Bearer {token2}"},
     )
     assert response.status_code == 403
+
+
+def _create_project(token, name="Test Project"):
+    response = client.post(
+        "/api/projects",
+        headers={"Authorization": f"Bearer {token}"},
+        json={
+            "name": name,
+            "description": "A test project",
+            "vibe_description": "Modern design with vibrant colors",
+        },
+    )
+    return response.json()["id"]
+
+
+def test_get_project_not_modified(test_token):
+    """Test a matching If-None-Match gets a bodyless 304 without loading the row"""
+    project_id = _create_project(test_token)
+    headers = {"Authorization": f"Bearer {test_token}"}
+    etag = client.get(f"/api/projects/{project_id}", headers=headers).headers["etag"]
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        response = client.get(
+            f"/api/projects/{project_id}", headers={**headers, "If-None-Match": etag}
+        )
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    project_reads = [sql for sql in statements if "FROM projects" in sql]
+    assert project_reads
+    assert not any("generated_code" in sql for sql in project_reads)
+
+
+def test_get_project_modified_after_update(test_token):
+    """Test a stale ETag gets the full project and a new ETag"""
+    project_id = _create_project(test_token)
+    headers = {"Authorization": f"Bearer {test_token}"}
+    etag = client.get(f"/api/projects/{project_id}", headers=headers).headers["etag"]
+
+    client.put(f"/api/projects/{project_id}", headers=headers, json={"name": "Renamed"})
+    response = client.get(
+        f"/api/projects/{project_id}", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.json()["name"] == "Renamed"
+    assert response.headers["etag"] != etag
+
+
+def test_project_versions_not_modified(test_token):
+    """Test the versions listing revalidates against the project ETag"""
+    project_id = _create_project(test_token)
+    headers = {"Authorization": f"Bearer {test_token}"}
+    etag = client.get(f"/api/projects/{project_id}/versions", headers=headers).headers["etag"]
+    response = client.get(
+        f"/api/projects/{project_id}/versions", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+def test_list_projects_cursor_walk(test_token):
+    """Test following next_cursor visits every project once, newest first"""
+    created = [_create_project(test_token, name=f"Project {i}") for i in range(5)]
+    headers = {"Authorization": f"Bearer {test_token}"}
+
+    newest_first = [p["id"] for p in client.get("/api/projects", headers=headers).json()["projects"]]
+    seen = []
+    response = client.get("/api/projects?limit=2", headers=headers).json()
+    while True:
+        assert response["total"] == 5
+        seen += [project["id"] for project in response["projects"]]
+        if not response["next_cursor"]:
+            break
+        response = client.get(
+            f"/api/projects?limit=2&after={response['next_cursor']}", headers=headers
+        ).json()
+        assert response["page"] is None
+
+    assert seen == newest_first
+    assert sorted(seen) == sorted(created)
+
+
+def test_list_projects_invalid_cursor(test_token):
+    """Test a malformed cursor is rejected"""
+    response = client.get(
+        "/api/projects?after=not-a-cursor",
+        headers={"Authorization": f"Bearer {test_token}"},
+    )
+    assert response.status_code == 400
+
+
+def test_project_totals_follow_create_and_delete(test_token):
+    """Test cached project totals reflect creates and deletes straight away"""
+    headers = {"Authorization": f"Bearer {test_token}"}
+
+    def totals():
+        stats = client.get("/api/projects/stats/overview", headers=headers).json()
+        cursor = client.get("/api/projects?limit=1", headers=headers).json()["next_cursor"]
+        # Cursor pages take their total from the cached count
+        page = client.get(f"/api/projects?after={cursor}", headers=headers).json()
+        return stats["total_projects"], page["total"]
+
+    first = _create_project(test_token, name="First")
+    _create_project(test_token, name="Second")
+    assert totals() == (2, 2)
+
+    _create_project(test_token, name="Third")
+    assert totals() == (3, 3)
+
+    assert client.delete(f"/api/projects/{first}", headers=headers).status_code == 200
+    assert totals() == (2, 2)
@@ -0,0 +1,87 @@
+"""
+Security utility tests
+"""
+from datetime import datetime, timedelta, timezone
+from jose import jwt
+import time
+from utils.security import (
+    create_access_token,
+    _encode_token,
+    verify_token,
+    create_oauth_state,
+    verify_oauth_state,
+    JWT_SECRET_KEY,
+    ALGORITHM,
+)
+
+
+def test_verify_token_matches_jose():
+    """Test verified claims match python-jose's decoding"""
+    token = create_access_token({"sub": "user-1", "email": "test@example.com"})
+    payload = verify_token(token)
+    assert payload == jwt.decode(token, JWT_SECRET_KEY, algorithms=[ALGORITHM])
+    assert payload["sub"] == "user-1"
+
+
+def test_encode_token_matches_jose():
+    """Test pre-keyed encoding produces python-jose's exact token"""
+    now = datetime.now(timezone.utc)
+    claims = {"sub": "user-1", "exp": now + timedelta(minutes=5), "iat": now.timestamp()}
+    expected = jwt.encode(dict(claims), JWT_SECRET_KEY, algorithm=ALGORITHM)
+    assert _encode_token(dict(claims)) == expected
+
+
+def test_verify_token_tampered_signature():
+    """Test token with a modified signature is rejected"""
+    token = create_access_token({"sub": "user-1"})
+    header, payload, signature = token.split(".")
+    tampered = f"{header}.{payload}.{signature[::-1]}"
+    assert verify_token(tampered) is None
+
+
+def test_verify_token_wrong_key():
+    """Test token signed with another key is rejected"""
+    token = jwt.encode({"sub": "user-1"}, "another-secret", algorithm=ALGORITHM)
+    assert verify_token(token) is None
+
+
+def test_verify_token_wrong_algorithm():
+    """Test token signed with a different algorithm is rejected"""
+    token = jwt.encode({"sub": "user-1"}, JWT_SECRET_KEY, algorithm="HS512")
+    assert verify_token(token) is None
+
+
+def test_verify_token_expired():
+    """Test expired token is rejected"""
+    token = create_access_token({"sub": "user-1"}, timedelta(seconds=-1))
+    assert verify_token(token) is None
+
+
+def test_verify_token_not_yet_valid_is_not_remembered(monkeypatch):
+    """Test a token rejected by "nbf" verifies once it becomes valid"""
+    now = time.time()
+    token = _encode_token({"sub": "user-1", "nbf": now + 30, "exp": now + 60})
+    assert verify_token(token) is None
+    monkeypatch.setattr(time, "time", lambda: now + 45)
+    assert verify_token(token)["sub"] == "user-1"
+
+
+def test_verify_token_malformed():
+    """Test malformed token is rejected"""
+    assert verify_token("not-a-jwt") is None
+    assert verify_token("a.b.c") is None
+
+
+def test_oauth_state_round_trip():
+    """Test OAuth state verifies only for the provider it was issued to"""
+    state = create_oauth_state("github")
+    assert verify_oauth_state(state, "github")
+    assert not verify_oauth_state(state, "google")
+
+
+def test_oauth_state_tampered():
+    """Test tampered or malformed OAuth state is rejected"""
+    state = create_oauth_state("google")
+    assert not verify_oauth_state(state[:-2] + ("AA" if state[-2:] != "AA" else "BB"), "google")
+    assert not verify_oauth_state("vividly_google_oauth", "google")
+    assert not verify_oauth_state("", "google")
@@ -1,28 +1,41 @@
 """
 User API tests
 """
+import asyncio
+import os
 import pytest
 from fastapi.testclient import TestClient
 from main import app
-from database import get_db
+from database import get_db, Base
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from models import Base, User
-from utils.security import hash_password
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from models import User
+from services.user_service import UserService
+from utils.security import hash_password, create_access_token
 from datetime import datetime
 
 # Test database
-SQLALCHEMY_TEST_DATABASE_URL = "sqlite:///./test.db"
+# One database file per pytest-xdist worker so parallel runs don't share locks
+TEST_DB_PATH = f"./test_{os.environ.get('PYTEST_XDIST_WORKER', 'main')}.db"
+SQLALCHEMY_TEST_DATABASE_URL = f"sqlite:///{TEST_DB_PATH}"
 engine = create_engine(SQLALCHEMY_TEST_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# The app runs on AsyncSession; fixtures keep using the sync session above
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DB_PATH}")
+AsyncTestingSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
 
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
+# Hashed once per module; hashing is deliberately slow
+PASSWORD_HASH = hash_password("password123")
+ADMIN_PASSWORD_HASH = hash_password("admin123")
+
+
+async def override_get_db():
+    async with AsyncTestingSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 app.dependency_overrides[get_db] = override_get_db
@@ -31,14 +44,22 @@ Base.metadata.create_all(bind=engine)
 client = TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def cleanup():
+    """Clean up database before each test"""
+    with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    yield
+
+
 @pytest.fixture
 def test_user():
     """Create test user"""
     db = TestingSessionLocal()
     user = User(
-        id="test-user-1",
         email="test@example.com",
-        password_hash=hash_password("password123"),
+        password_hash=PASSWORD_HASH,
         first_name="Test",
         last_name="User",
         is_active=True,
@@ -56,9 +77,8 @@ def test_admin():
     """Create test admin"""
     db = TestingSessionLocal()
     admin = User(
-        id="test-admin-1",
         email="admin@example.com",
-        password_hash=hash_password("admin123"),
+        password_hash=ADMIN_PASSWORD_HASH,
         first_name="Admin",
         last_name="User",
         is_active=True,
@@ -144,3 +164,117 @@ def test_update_user_preferences(test_user):
     """Test updating user preferences"""
     # TODO: Implement after auth endpoints are tested
     pass
+
+
+def _auth_headers(user):
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+
+
+@pytest.mark.parametrize("path", ["/api/users/me", "/api/users/me/preferences"])
+def test_current_user_not_modified(test_user, path):
+    """Test a matching If-None-Match gets a bodyless 304"""
+    headers = _auth_headers(test_user)
+    etag = client.get(path, headers=headers).headers["etag"]
+    response = client.get(path, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+
+def test_get_user_by_id_not_modified(test_user):
+    """Test conditional GET of a user by ID"""
+    etag = client.get(f"/api/users/{test_user.id}").headers["etag"]
+    response = client.get(f"/api/users/{test_user.id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    response = client.get(f"/api/users/{test_user.id}", headers={"If-None-Match": 'W/"stale"'})
+    assert response.status_code == 200
+    assert response.json()["email"] == test_user.email
+
+
+def test_list_users_cursor_walk(test_admin):
+    """Test following next_cursor visits every user once, newest first"""
+    db = TestingSessionLocal()
+    for i in range(4):
+        db.add(User(email=f"user{i}@example.com", password_hash=PASSWORD_HASH))
+    db.commit()
+    headers = _auth_headers(test_admin)
+
+    newest_first = [u["id"] for u in client.get("/api/users", headers=headers).json()["users"]]
+    seen = []
+    response = client.get("/api/users?limit=2", headers=headers).json()
+    while True:
+        assert response["total"] == 5
+        seen += [user["id"] for user in response["users"]]
+        if not response["next_cursor"]:
+            break
+        response = client.get(
+            f"/api/users?limit=2&after={response['next_cursor']}", headers=headers
+        ).json()
+
+    assert len(newest_first) == 5
+    assert seen == newest_first
+
+
+def test_list_users_invalid_cursor(test_admin):
+    """Test a malformed cursor is rejected"""
+    response = client.get("/api/users?after=%25%25", headers=_auth_headers(test_admin))
+    assert response.status_code == 400
+
+
+def test_get_users_after_breaks_ties_by_id():
+    """Test users sharing a created_at are split across pages by id"""
+    created_at = datetime(2026, 1, 1)
+    db = TestingSessionLocal()
+    for i in range(5):
+        db.add(User(
+            email=f"user{i}@example.com", password_hash=PASSWORD_HASH, created_at=created_at
+        ))
+    db.commit()
+
+    async def walk():
+        async with AsyncTestingSessionLocal() as session:
+            page = await UserService.get_all_users(session, limit=2)
+            seen = list(page)
+            while page:
+                page = await UserService.get_users_after(
+                    session, (page[-1].created_at, page[-1].id), limit=2
+                )
+                seen += page
+            return seen
+
+    seen = asyncio.run(walk())
+    assert [user.id for user in seen] == sorted((user.id for user in seen), reverse=True)
+    assert len(seen) == 5
+
+
+def test_user_totals_follow_writes(test_admin, test_user):
+    """Test cached user totals reflect registrations, deactivations and deletes"""
+    headers = _auth_headers(test_admin)
+
+    def totals():
+        stats = client.get("/api/users/stats/overview", headers=headers).json()
+        return stats["total_users"], stats["active_users"]
+
+    assert totals() == (2, 2)
+
+    client.post(
+        "/api/auth/register",
+        json={
+            "email": "new@example.com",
+            "password": "password123",
+            "confirm_password": "password123",
+            "first_name": "New",
+            "last_name": "User",
+        },
+    )
+    assert totals() == (3, 3)
+
+    client.post(f"/api/users/{test_user.id}/deactivate", headers=headers)
+    assert totals() == (3, 2)
+
+    client.post(f"/api/users/{test_user.id}/activate", headers=headers)
+    assert totals() == (3, 3)
+
+    client.post(f"/api/users/{test_user.id}/delete", headers=headers)
+    assert totals() == (2, 2)
@@ -0,0 +1,93 @@
+"""
+Authenticated user cache tests
+"""
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from starlette.requests import Request
+from middleware.auth_middleware import get_current_user, load_user
+from models import User
+from utils.security import create_access_token
+from utils.user_cache import cache_user, get_cached_user, invalidate_user
+
+
+class CountingSession:
+    """Stands in for AsyncSession.get, counting primary-key loads"""
+
+    def __init__(self, user):
+        self.user = user
+        self.loads = 0
+
+    async def get(self, model, key):
+        self.loads += 1
+        return self.user if key == self.user.id else None
+
+
+def _user(**values) -> User:
+    now = datetime.now(timezone.utc)
+    return User(
+        id=uuid.uuid4(),
+        email="test@example.com",
+        first_name="Test",
+        is_active=True,
+        is_admin=False,
+        created_at=now,
+        updated_at=now,
+        **values,
+    )
+
+
+def test_cached_snapshot_is_reused(fake_redis):
+    """Test a second load is served from the cache"""
+    db = CountingSession(_user())
+    first = asyncio.run(load_user(db, str(db.user.id)))
+    second = asyncio.run(load_user(db, str(db.user.id)))
+    assert db.loads == 1
+    assert second == first
+    assert second.email == "test@example.com"
+
+
+def test_invalidate_user_forces_reload(fake_redis):
+    """Test invalidation makes the next load read the row again"""
+    db = CountingSession(_user())
+    asyncio.run(load_user(db, str(db.user.id)))
+
+    db.user.first_name = "Changed"
+    asyncio.run(invalidate_user(str(db.user.id)))
+    reloaded = asyncio.run(load_user(db, str(db.user.id)))
+    assert db.loads == 2
+    assert reloaded.first_name == "Changed"
+
+
+def test_write_under_old_version_is_ignored(fake_redis):
+    """Test an entry loaded before an invalidation is never served"""
+    user = _user()
+    _, version = asyncio.run(get_cached_user(str(user.id)))
+    asyncio.run(invalidate_user(str(user.id)))
+    asyncio.run(cache_user(user, version))
+    cached, _ = asyncio.run(get_cached_user(str(user.id)))
+    assert cached is None
+
+
+def test_corrupt_entry_is_a_miss(fake_redis):
+    """Test an unreadable cache entry is reloaded instead of failing"""
+    db = CountingSession(_user())
+    fake_redis.data[f"u:{db.user.id}"] = b'{"version": 0, "user": {"id": "x"}}'
+    user = asyncio.run(load_user(db, str(db.user.id)))
+    assert db.loads == 1
+    assert user.id == db.user.id
+
+
+def test_current_user_is_resolved_once_per_request(fake_redis):
+    """Test repeated dependencies in one request reuse the first result"""
+    db = CountingSession(_user())
+    token = create_access_token({"sub": str(db.user.id)})
+    request = Request({
+        "type": "http",
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+    })
+    first = asyncio.run(get_current_user(request, db))
+    fake_redis.data.clear()
+    second = asyncio.run(get_current_user(request, db))
+    assert second is first
+    assert db.loads == 1
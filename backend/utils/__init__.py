@@ -4,19 +4,41 @@ Utility modules
 from utils.security import (
     hash_password,
     verify_password,
+    ahash_password,
+    averify_password,
+    averify_and_update_password,
+    warm_password_hashing,
+    shutdown_password_hashing,
     create_access_token,
+    get_access_token_claims,
     create_refresh_token,
+    create_token_pair,
     verify_token,
+    verify_token_cached,
     get_user_id_from_token,
+    parse_user_id,
     is_token_expired,
+    create_oauth_state,
+    verify_oauth_state,
 )
 
 __all__ = [
     "hash_password",
     "verify_password",
+    "ahash_password",
+    "averify_password",
+    "averify_and_update_password",
+    "warm_password_hashing",
+    "shutdown_password_hashing",
     "create_access_token",
+    "get_access_token_claims",
     "create_refresh_token",
+    "create_token_pair",
     "verify_token",
+    "verify_token_cached",
     "get_user_id_from_token",
+    "parse_user_id",
     "is_token_expired",
+    "create_oauth_state",
+    "verify_oauth_state",
 ]
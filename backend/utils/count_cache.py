@@ -0,0 +1,37 @@
+"""
+Short-lived in-process cache of COUNT(*) results for stats and list totals
+"""
+from cachetools import TTLCache
+from threading import Lock
+from typing import Awaitable, Callable, TypeVar
+
+# Totals may lag writes by up to a minute (except where invalidated)
+COUNT_CACHE_TTL = 60
+
+_counts: TTLCache = TTLCache(maxsize=10_000, ttl=COUNT_CACHE_TTL)
+_lock = Lock()
+
+T = TypeVar("T")
+
+
+async def cached_count(key: str, load: Callable[[], Awaitable[T]]) -> T:
+    """
+    Get a cached count (or tuple of counts), running the loader on a miss
+    """
+    with _lock:
+        count = _counts.get(key)
+    if count is not None:
+        return count
+
+    count = await load()
+    with _lock:
+        _counts[key] = count
+    return count
+
+
+def invalidate_count(key: str) -> None:
+    """
+    Drop a cached count after a write that changes it
+    """
+    with _lock:
+        _counts.pop(key, None)
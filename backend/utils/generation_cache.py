@@ -0,0 +1,80 @@
+"""
+Content-addressed cache of Gemini generations: in-process layer over Redis
+"""
+from cachetools import TTLCache
+from threading import Lock
+from typing import Any, Dict, Optional
+from cache import cache_get, cache_set
+from config import settings
+import hashlib
+import orjson
+
+# Bump when prompts change so stale generations stop matching
+PROMPT_VERSION = 1
+
+GENERATION_CACHE_TTL = 24 * 60 * 60
+
+# Generated pages run to tens of KB; Redis holds the long tail
+_generation_cache: TTLCache = TTLCache(maxsize=1_000, ttl=GENERATION_CACHE_TTL)
+_lock = Lock()
+
+# Lookup outcomes since startup, per process
+_stats = {"hits": 0, "misses": 0}
+
+
+def generation_key(kind: str, *inputs: str) -> str:
+    """
+    Build a cache key from the generation kind and its textual inputs
+
+    The model names are part of the key, so switching GEMINI_MODEL or
+    GEMINI_FAST_MODEL never serves another model's output.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(
+        f"{kind}\0{PROMPT_VERSION}\0{settings.GEMINI_MODEL}\0{settings.GEMINI_FAST_MODEL}".encode()
+    )
+    for value in inputs:
+        digest.update(b"\0")
+        digest.update(value.encode())
+    return f"gen:{digest.hexdigest()}"
+
+
+async def get_cached_generation(key: str) -> Optional[Any]:
+    """
+    Get a cached generation (code string or structure dict)
+    """
+    with _lock:
+        result = _generation_cache.get(key)
+        if result is not None:
+            _stats["hits"] += 1
+    if result is not None:
+        return result
+
+    raw = await cache_get(key)
+    if raw is None:
+        with _lock:
+            _stats["misses"] += 1
+        return None
+
+    result = orjson.loads(raw)
+    with _lock:
+        _generation_cache[key] = result
+        _stats["hits"] += 1
+    return result
+
+
+async def cache_generation(key: str, result: Any) -> None:
+    """
+    Cache a successful generation
+    """
+    with _lock:
+        _generation_cache[key] = result
+    await cache_set(key, orjson.dumps(result), GENERATION_CACHE_TTL)
+
+
+def generation_cache_stats() -> Dict[str, int]:
+    """
+    Get hit/miss counts and the in-process cache size
+    """
+    with _lock:
+        return {**_stats, "size": len(_generation_cache)}
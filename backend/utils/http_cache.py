@@ -0,0 +1,46 @@
+"""
+Conditional GET helpers: weak ETags derived from updated_at
+"""
+from datetime import datetime
+from fastapi import Request, Response
+from typing import Any, Optional
+
+# Per-user data must not land in shared caches; clients revalidate every time
+PRIVATE_REVALIDATE = "private, no-cache"
+
+
+def weak_etag(resource_id: Any, updated_at: datetime) -> str:
+    """
+    Build a weak ETag for a row; updated_at changes on every mutation
+    """
+    return f'W/"{resource_id}-{updated_at.timestamp():.6f}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Check If-None-Match against an ETag (weak comparison, per RFC 9110)
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def check_not_modified(
+    request: Request,
+    response: Response,
+    etag: str,
+    cache_control: str = PRIVATE_REVALIDATE,
+) -> Optional[Response]:
+    """
+    Return a bodyless 304 if the client's copy is current, otherwise
+    attach the validators to the outgoing response and return None
+    """
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
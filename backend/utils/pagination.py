@@ -0,0 +1,27 @@
+"""
+Keyset pagination cursors
+"""
+from datetime import datetime
+from typing import Any, Optional, Tuple
+from uuid import UUID
+import base64
+
+
+def encode_cursor(row: Any) -> str:
+    """
+    Encode a row's (created_at, id) sort key as an opaque cursor
+    """
+    raw = f"{row.created_at.isoformat()}|{row.id}".encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[datetime, UUID]]:
+    """
+    Decode a cursor into its (created_at, id) sort key, or None if malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), UUID(row_id)
+    except ValueError:
+        return None
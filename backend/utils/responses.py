@@ -0,0 +1,16 @@
+"""
+Pre-serialized JSON responses for hot endpoints
+"""
+from fastapi import Response
+from pydantic import BaseModel
+
+
+def model_response(model: BaseModel) -> Response:
+    """
+    Serialize a response model straight to JSON bytes in pydantic-core
+
+    Returning a Response skips FastAPI's response_model pass (re-validating
+    the model, dumping it to dicts, then orjson-encoding those). Keep
+    response_model on the route so the OpenAPI schema is unchanged.
+    """
+    return Response(model.model_dump_json(), media_type="application/json")
@@ -3,20 +3,83 @@ Security utilities for authentication and encryption
 """
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from jose import JWTError, jwt
+from jose.exceptions import ExpiredSignatureError, JWTClaimsError
+from cachetools import TTLCache
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
 from config import settings
+import asyncio
+import base64
+import calendar
+import hashlib
+import hmac
 import logging
+import orjson
+import os
+import secrets
+import time
+import uuid
 
 logger = logging.getLogger(__name__)
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# JWT parameters resolved once instead of per encode/verify
+JWT_SECRET_KEY = settings.JWT_SECRET_KEY
+ALGORITHM = settings.ALGORITHM
+_ALGORITHMS = [ALGORITHM]
+
+# Refresh tokens and the sessions holding them share one lifetime
+REFRESH_TOKEN_LIFETIME = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+
+# Token lifetimes in seconds; "exp" is computed from time.time() directly
+_ACCESS_TTL_S = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+_REFRESH_TTL_S = int(REFRESH_TOKEN_LIFETIME.total_seconds())
+
+# HMAC keyed once; verify_token copies it instead of re-keying per call
+_HMAC_DIGESTS = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+_HMAC = (
+    hmac.new(JWT_SECRET_KEY.encode(), digestmod=_HMAC_DIGESTS[ALGORITHM])
+    if ALGORITHM in _HMAC_DIGESTS
+    else None
+)
+
+# Header segment is identical for every HMAC token; encode it once
+_HMAC_HEADER_B64 = base64.urlsafe_b64encode(
+    orjson.dumps({"alg": ALGORITHM, "typ": "JWT"})
+).rstrip(b"=")
+_HMAC_HEADER_SEGMENT = _HMAC_HEADER_B64.decode()
+
+# OAuth state is signed with a key derived from, not equal to, the JWT secret
+OAUTH_STATE_TTL = 600
+_OAUTH_STATE_KEY = hashlib.sha256(b"oauth-state:" + JWT_SECRET_KEY.encode()).digest()
+_OAUTH_PAYLOAD_BYTES = 24  # 16-byte nonce + 8-byte issue time
+_OAUTH_MAC_BYTES = 32
+
+# Password hashing context: new hashes use Argon2id (19 MiB, 2 passes);
+# bcrypt hashes still verify and are replaced on the next successful login
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__type="ID",
+    argon2__memory_cost=19456,
+    argon2__time_cost=2,
+    argon2__parallelism=1,
+)
+
+# Hashing is CPU-bound and releases the GIL; a pool sized to the cores keeps
+# login bursts from exhausting the default executor and bounds Argon2 memory
+_HASH_POOL = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix="passwords")
+
+
+async def _run_hash(func, *args):
+    """Run a password hashing call in the dedicated pool"""
+    return await asyncio.get_running_loop().run_in_executor(_HASH_POOL, func, *args)
 
 
 def hash_password(password: str) -> str:
     """
-    Hash a password using bcrypt
+    Hash a password using Argon2id
     """
     return pwd_context.hash(password)
 
@@ -28,64 +91,296 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
+async def ahash_password(password: str) -> str:
+    """
+    Hash a password in the hashing pool (hashing blocks for tens of ms)
+    """
+    return await _run_hash(pwd_context.hash, password)
+
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a password in the hashing pool (hashing blocks for tens of ms)
+    """
+    return await _run_hash(pwd_context.verify, plain_password, hashed_password)
+
+
+async def averify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password in the hashing pool and rehash it if the scheme is outdated
+
+    Returns (valid, new_hash); new_hash is None unless the stored hash should be replaced.
+    """
+    return await _run_hash(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+async def warm_password_hashing() -> None:
+    """
+    Hash once at startup so the first login doesn't load the backend
+
+    Also fails fast on invalid hashing parameters and touches the Argon2
+    memory arena in the hashing pool.
+    """
+    await ahash_password("warmup")
+
+
+def shutdown_password_hashing() -> None:
+    """
+    Stop the hashing pool's threads once running hashes finish
+    """
+    _HASH_POOL.shutdown(wait=False)
+
+
+def _b64url_encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _encode_hmac_token(claims: Dict[str, Any]) -> str:
+    """
+    Sign claims with the pre-keyed digest
+
+    Produces the same token as jose.jwt.encode (datetime time claims
+    become integer timestamps).
+    """
+    for claim in ("exp", "iat", "nbf"):
+        value = claims.get(claim)
+        if isinstance(value, datetime):
+            claims[claim] = calendar.timegm(value.utctimetuple())
+
+    signing_input = _HMAC_HEADER_B64 + b"." + _b64url_encode(orjson.dumps(claims))
+    mac = _HMAC.copy()
+    mac.update(signing_input)
+    return (signing_input + b"." + _b64url_encode(mac.digest())).decode()
+
+
+def _encode_token(claims: Dict[str, Any]) -> str:
+    """
+    Encode a JWT, skipping jose's per-call key setup for HMAC algorithms
+    """
+    if _HMAC is not None:
+        return _encode_hmac_token(claims)
+    return jwt.encode(claims, JWT_SECRET_KEY, algorithm=ALGORITHM)
+
+
+def create_access_token(
+    data: Dict[str, Any],
+    expires_delta: Optional[timedelta] = None,
+    *,
+    owned: bool = False,
+) -> str:
     """
     Create a JWT access token
+
+    Pass owned=True when the claims dict is built for this call and may be
+    filled in place instead of copied.
+    """
+    to_encode = data if owned else data.copy()
+    now = time.time()
+    ttl = expires_delta.total_seconds() if expires_delta else _ACCESS_TTL_S
+
+    # Sub-second "iat" so tokens minted just after a forced logout stay valid
+    to_encode.update({"exp": int(now + ttl), "iat": now})
+    return _encode_token(to_encode)
+
+
+def get_access_token_claims(user: Any) -> Dict[str, Any]:
+    """
+    Build the access token claims for a user
+
+    Identity and role travel in the token so claims-only endpoints can
+    authorize requests without loading the user row.
+    """
+    return {
+        "sub": str(user.id),
+        "email": user.email,
+        "active": user.is_active,
+        "admin": user.is_admin,
+    }
+
+
+def create_refresh_token(data: Dict[str, Any], *, owned: bool = False) -> str:
     """
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
+    Create a JWT refresh token (owned=True fills the claims dict in place)
+    """
+    to_encode = data if owned else data.copy()
+    to_encode.update({"exp": int(time.time()) + _REFRESH_TTL_S, "type": "refresh"})
+    return _encode_token(to_encode)
 
 
-def create_refresh_token(data: Dict[str, Any]) -> str:
+def create_token_pair(user: Any) -> Tuple[str, str]:
     """
-    Create a JWT refresh token
+    Create the access and refresh tokens issued at sign-in
+
+    The user ID is stringified once and shared by both tokens.
     """
-    to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
-    encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.ALGORITHM)
-    return encoded_jwt
+    claims = get_access_token_claims(user)
+    sub = claims["sub"]
+    return create_access_token(claims, owned=True), create_refresh_token({"sub": sub}, owned=True)
+
+
+def _b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def _decode_hmac_token(token: str) -> Dict[str, Any]:
+    """
+    Verify an HMAC-signed JWT with the pre-keyed digest
+
+    Raises JWTError like jose.jwt.decode does.
+    """
+    try:
+        header_b64, payload_b64, signature_b64 = token.split(".")
+        signature = _b64url_decode(signature_b64)
+        # Tokens we issue carry exactly our header; only parse foreign ones
+        if header_b64 != _HMAC_HEADER_SEGMENT:
+            header = orjson.loads(_b64url_decode(header_b64))
+            if not isinstance(header, dict) or header.get("alg") != ALGORITHM:
+                raise JWTError("The specified alg value is not allowed")
+    except (ValueError, orjson.JSONDecodeError) as e:
+        raise JWTError(f"Malformed token: {e}")
+
+    mac = _HMAC.copy()
+    mac.update(f"{header_b64}.{payload_b64}".encode())
+    if not hmac.compare_digest(mac.digest(), signature):
+        raise JWTError("Signature verification failed.")
+
+    try:
+        payload = orjson.loads(_b64url_decode(payload_b64))
+    except (ValueError, orjson.JSONDecodeError) as e:
+        raise JWTError(f"Invalid payload: {e}")
+    if not isinstance(payload, dict):
+        raise JWTError("Invalid payload")
+
+    now = time.time()
+    exp = payload.get("exp")
+    if exp is not None:
+        if not isinstance(exp, (int, float)):
+            raise JWTError("Expiration Time claim (exp) must be an integer.")
+        if exp < now:
+            raise ExpiredSignatureError("Signature has expired.")
+    nbf = payload.get("nbf")
+    if isinstance(nbf, (int, float)) and nbf > now:
+        raise JWTClaimsError("The token is not yet valid (nbf)")
+    return payload
+
+
+# Tokens that recently failed verification, by digest, so scanners replaying
+# bad tokens skip the decode and the error log. Only signature and format
+# failures are recorded: those never change for a given token, while a
+# token rejected by "nbf" becomes valid later.
+_rejected_tokens: TTLCache = TTLCache(maxsize=8192, ttl=60)
+_rejected_lock = Lock()
 
 
 def verify_token(token: str) -> Optional[Dict[str, Any]]:
     """
     Verify and decode a JWT token
     """
+    token_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    with _rejected_lock:
+        if token_key in _rejected_tokens:
+            return None
     try:
-        payload = jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
+        if _HMAC is not None:
+            return _decode_hmac_token(token)
+        return jwt.decode(token, JWT_SECRET_KEY, algorithms=_ALGORITHMS)
+    except (ExpiredSignatureError, JWTClaimsError) as e:
+        # Time-based failures depend on when the token is checked
+        logger.error("Token verification failed: %s", e)
+        return None
     except JWTError as e:
-        logger.error(f"Token verification failed: {e}")
+        with _rejected_lock:
+            _rejected_tokens[token_key] = True
+        logger.error("Token verification failed: %s", e)
         return None
 
 
+# Verified claims by token, so repeat verifications skip the signature
+# check and decode. Expiry is re-checked on every hit.
+_claims_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+_claims_lock = Lock()
+
+
+def verify_token_cached(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Verify a token, reusing claims verified within the last minute
+    """
+    with _claims_lock:
+        payload = _claims_cache.get(token)
+    if payload is not None:
+        exp = payload.get("exp")
+        if exp is None or exp > time.time():
+            return payload
+
+    payload = verify_token(token)
+    if payload is not None:
+        with _claims_lock:
+            _claims_cache[token] = payload
+    return payload
+
+
 def get_user_id_from_token(token: str) -> Optional[str]:
     """
     Extract user ID from token
     """
-    payload = verify_token(token)
+    payload = verify_token_cached(token)
     if payload is None:
         return None
     return payload.get("sub")
 
 
+def parse_user_id(user_id: Any) -> Optional[uuid.UUID]:
+    """
+    Parse a user ID (e.g. a token "sub" claim) into a UUID
+    """
+    if isinstance(user_id, uuid.UUID):
+        return user_id
+    try:
+        return uuid.UUID(str(user_id))
+    except ValueError:
+        return None
+
+
 def is_token_expired(token: str) -> bool:
     """
     Check if a token is expired
     """
-    payload = verify_token(token)
-    if payload is None:
-        return True
-    
-    exp = payload.get("exp")
-    if exp is None:
-        return True
-    
-    return datetime.utcfromtimestamp(exp) < datetime.utcnow()
+    # Expired tokens already fail verification
+    payload = verify_token_cached(token)
+    return payload is None or payload.get("exp") is None
+
+
+def _sign_oauth_state(provider: str, payload: bytes) -> bytes:
+    return hmac.new(
+        _OAUTH_STATE_KEY, provider.encode() + b":" + payload, hashlib.sha256
+    ).digest()
+
+
+def create_oauth_state(provider: str) -> str:
+    """
+    Create a signed OAuth state parameter (verified without server storage)
+    """
+    payload = secrets.token_bytes(16) + int(time.time()).to_bytes(8, "big")
+    state = payload + _sign_oauth_state(provider, payload)
+    return base64.urlsafe_b64encode(state).rstrip(b"=").decode()
+
+
+def verify_oauth_state(state: str, provider: str) -> bool:
+    """
+    Verify an OAuth state parameter issued for the provider and not yet expired
+    """
+    try:
+        raw = _b64url_decode(state)
+    except ValueError:
+        return False
+    if len(raw) != _OAUTH_PAYLOAD_BYTES + _OAUTH_MAC_BYTES:
+        return False
+
+    payload, mac = raw[:_OAUTH_PAYLOAD_BYTES], raw[_OAUTH_PAYLOAD_BYTES:]
+    if not hmac.compare_digest(mac, _sign_oauth_state(provider, payload)):
+        return False
+
+    issued_at = int.from_bytes(payload[16:], "big")
+    return time.time() - issued_at <= OAUTH_STATE_TTL
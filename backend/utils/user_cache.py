@@ -0,0 +1,157 @@
+"""
+Cache of authenticated users in Redis, shared by all workers
+"""
+from cachetools import TTLCache
+from pydantic import BaseModel, ConfigDict, ValidationError
+from threading import Lock
+from datetime import datetime
+from typing import Any, Dict, Optional
+from uuid import UUID
+from cache import cache_get, cache_get_many, cache_set, cache_incr
+from config import settings
+from models import User
+import time
+
+# Redis entries; writes bump the user's version instead of relying on expiry
+USER_CACHE_TTL = 300
+# Versions outlive any entry stored under an older version
+USER_VERSION_TTL = USER_CACHE_TTL * 2
+
+# Forced-logout markers: tokens issued before the stored timestamp are
+# rejected. Entries only need to outlive the access tokens they cover.
+REVOCATION_TTL = settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+_revoked_before: TTLCache = TTLCache(maxsize=100_000, ttl=REVOCATION_TTL)
+_lock = Lock()
+
+# Users whose Redis marker was read recently; a revocation on another
+# worker takes effect here within this many seconds
+REVOCATION_CHECK_TTL = 5
+_revocation_checked: TTLCache = TTLCache(maxsize=100_000, ttl=REVOCATION_CHECK_TTL)
+
+
+class UserSnapshot(BaseModel):
+    """
+    Immutable copy of a user's columns for authenticated requests
+
+    Password hash and 2FA secret are excluded; load the User row for those.
+    """
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
+    id: UUID
+    email: str
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    avatar_url: Optional[str] = None
+    github_id: Optional[str] = None
+    google_id: Optional[str] = None
+    email_verified: Optional[bool] = None
+    is_active: Optional[bool] = None
+    is_admin: Optional[bool] = None
+    two_factor_enabled: Optional[bool] = None
+    phone: Optional[str] = None
+    country: Optional[str] = None
+    timezone: Optional[str] = None
+    language: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    last_login_at: Optional[datetime] = None
+    user_metadata: Optional[Dict[str, Any]] = None
+
+
+class _CachedEntry(BaseModel):
+    """A snapshot stored with the user version it was loaded under"""
+    version: int
+    user: UserSnapshot
+
+
+def _user_key(user_id: str) -> str:
+    return f"u:{user_id}"
+
+
+def _version_key(user_id: str) -> str:
+    return f"uv:{user_id}"
+
+
+def _revoked_key(user_id: str) -> str:
+    return f"revoked:{user_id}"
+
+
+async def get_cached_user(user_id: str) -> tuple[Optional[UserSnapshot], int]:
+    """
+    Get a cached user by ID and the user's current version
+
+    The entry and version are read in one round trip; an entry stored under
+    an older version is a miss. Pass the version to cache_user after loading.
+    """
+    raw, raw_version = await cache_get_many(_user_key(user_id), _version_key(user_id))
+    version = int(raw_version) if raw_version is not None else 0
+    if raw is None:
+        return None, version
+
+    try:
+        entry = _CachedEntry.model_validate_json(raw)
+    except ValidationError:
+        # Corrupt, or written by a deploy with a different snapshot shape
+        return None, version
+    if entry.version != version:
+        return None, version
+    return entry.user, version
+
+
+async def cache_user(user: User, version: int) -> UserSnapshot:
+    """
+    Cache a user loaded by the auth middleware under the version read before loading
+
+    Returns the snapshot handed to the request.
+    """
+    snapshot = UserSnapshot.model_validate(user)
+    await cache_set(
+        _user_key(user.id),
+        _CachedEntry(version=version, user=snapshot).model_dump_json(),
+        USER_CACHE_TTL,
+    )
+    return snapshot
+
+
+async def invalidate_user(user_id: str) -> None:
+    """
+    Drop a user from the cache on every worker (logout, deactivation, profile changes)
+    """
+    # A bumped version also discards a stale entry written by a concurrent load
+    await cache_incr(_version_key(user_id), USER_VERSION_TTL)
+
+
+async def revoke_tokens(user_id: str) -> None:
+    """
+    Reject access tokens issued to a user up to now (forced logout)
+    """
+    revoked_at = time.time()
+    with _lock:
+        _revoked_before[str(user_id)] = revoked_at
+    await invalidate_user(user_id)
+    # Other workers only see the marker through Redis
+    await cache_set(_revoked_key(user_id), repr(revoked_at), REVOCATION_TTL)
+
+
+async def is_token_revoked(user_id: str, issued_at: Optional[float]) -> bool:
+    """
+    Check a token's "iat" claim against the user's forced-logout marker
+
+    Redis is read at most once per user every REVOCATION_CHECK_TTL seconds.
+    """
+    key = str(user_id)
+    with _lock:
+        revoked_at = _revoked_before.get(key)
+        checked = key in _revocation_checked
+    if revoked_at is not None and (issued_at is None or issued_at < revoked_at):
+        return True
+    if checked:
+        return False
+
+    # A newer revocation may have happened on another worker
+    raw = await cache_get(_revoked_key(user_id))
+    with _lock:
+        _revocation_checked[key] = True
+        if raw is not None and (revoked_at is None or float(raw) > revoked_at):
+            revoked_at = _revoked_before[key] = float(raw)
+    return revoked_at is not None and (issued_at is None or issued_at < revoked_at)